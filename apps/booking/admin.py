@@ -1,14 +1,49 @@
 from django.contrib import admin
-from .models import MeetingRoom, BookingHistory
+from .models import ArchivedBookingHistory, BookingHold, Equipment, MeetingRoom, BookingHistory, RecurringBooking, RecurringBookingException, WaitlistEntry
+
+@admin.register(Equipment)
+class EquipmentAdmin(admin.ModelAdmin):
+    list_display = ('name', 'code')
+    search_fields = ('name', 'code')
 
 @admin.register(MeetingRoom)
 class MeetingRoomAdmin(admin.ModelAdmin):
-    list_display = ('room_name','id', 'capacity', 'is_active')
-    search_fields = ('room_name',)
-    list_filter = ('is_active',)
+    list_display = ('room_name','id', 'capacity', 'building', 'floor', 'is_active')
+    search_fields = ('room_name', 'building')
+    list_filter = ('is_active', 'building', 'floor', 'equipment')
+    filter_horizontal = ('equipment',)
 
 @admin.register(BookingHistory)
 class BookingHistoryAdmin(admin.ModelAdmin):
     list_display = ('meeting_room', 'id', 'start_time', 'end_time', 'no_of_persons', 'booked_by')
     search_fields = ('meeting_room__room_name', 'booked_by__email')
     list_filter = ('start_time', 'end_time', 'no_of_persons', 'booked_by', 'meeting_room')
+
+@admin.register(ArchivedBookingHistory)
+class ArchivedBookingHistoryAdmin(admin.ModelAdmin):
+    list_display = ('meeting_room', 'id', 'start_time', 'end_time', 'no_of_persons', 'booked_by', 'archived_at')
+    search_fields = ('meeting_room__room_name', 'booked_by__email')
+    list_filter = ('start_time', 'meeting_room')
+
+class RecurringBookingExceptionInline(admin.TabularInline):
+    model = RecurringBookingException
+    extra = 0
+
+@admin.register(RecurringBooking)
+class RecurringBookingAdmin(admin.ModelAdmin):
+    list_display = ('meeting_room', 'id', 'frequency', 'interval', 'start_time', 'ends_at', 'booked_by')
+    search_fields = ('meeting_room__room_name', 'booked_by__email')
+    list_filter = ('frequency', 'meeting_room')
+    inlines = (RecurringBookingExceptionInline,)
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('meeting_room', 'id', 'start_time', 'end_time', 'no_of_persons', 'user', 'status', 'created_at')
+    search_fields = ('meeting_room__room_name', 'user__email')
+    list_filter = ('status', 'meeting_room')
+
+@admin.register(BookingHold)
+class BookingHoldAdmin(admin.ModelAdmin):
+    list_display = ('meeting_room', 'id', 'start_time', 'end_time', 'no_of_persons', 'held_by', 'expires_at')
+    search_fields = ('meeting_room__room_name', 'held_by__email')
+    list_filter = ('meeting_room',)
@@ -0,0 +1,259 @@
+import heapq
+from datetime import timedelta, timezone as dt_timezone
+from functools import reduce
+from itertools import groupby
+from operator import itemgetter, or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from apps.booking.models import ArchivedBookingHistory, BookingHistory, MeetingRoom, RoomUsageRollup
+from apps.core.routers import booking_database
+
+PERIODS = ('hour', 'day', 'week')
+PERIOD_STEPS = {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(weeks=1)}
+ROLLUP_FIELDS = ('booked_seconds', 'person_seconds', 'bookings')
+
+
+def analytics_setting(name, default):
+    return getattr(settings, 'BOOKING_ANALYTICS', {}).get(name, default)
+
+
+def period_floor(moment, period):
+    """
+    Returns the start of the hour, day or week (starting on Monday) holding moment, in the current time zone.
+    """
+    local = timezone.localtime(moment)
+    if period == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+    local = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == 'week':
+        local -= timedelta(days=local.weekday())
+    return local
+
+
+def next_period_start(bucket, period):
+    """
+    Returns the start of the period following the one starting at bucket.
+    """
+    if period == 'hour':
+        # Hours are stepped in UTC, so the repeated hour of a DST change is not skipped
+        return timezone.localtime(bucket.astimezone(dt_timezone.utc) + PERIOD_STEPS[period])
+    # Days and weeks are stepped in wall clock time, so they keep starting at midnight
+    return period_floor(bucket + PERIOD_STEPS[period], period)
+
+
+def period_seconds(bucket, period):
+    return (next_period_start(bucket, period).astimezone(dt_timezone.utc) - bucket.astimezone(dt_timezone.utc)).total_seconds()
+
+
+def period_buckets(start_time, end_time, period):
+    """
+    Yields the (bucket start in UTC, seconds of [start_time, end_time) within the bucket) pairs of a time range.
+    """
+    start_time, end_time = start_time.astimezone(dt_timezone.utc), end_time.astimezone(dt_timezone.utc)
+    bucket = period_floor(start_time, period)
+    while bucket < end_time:
+        next_bucket = next_period_start(bucket, period)
+        overlap = min(end_time, next_bucket.astimezone(dt_timezone.utc)) - max(start_time, bucket.astimezone(dt_timezone.utc))
+        yield bucket.astimezone(dt_timezone.utc), round(overlap.total_seconds())
+        bucket = next_bucket
+
+
+def usage_deltas(rows):
+    """
+    Aggregates bookings into rollup increments.
+
+    Parameters:
+    - rows (iterable): (meeting_room_id, start_time, end_time, no_of_persons) tuples.
+
+    Returns:
+    - dict: (meeting_room_id, period, period_start) to [booked_seconds, person_seconds, bookings].
+    """
+    deltas = {}
+    for room_id, start_time, end_time, no_of_persons in rows:
+        for period in PERIODS:
+            for position, (period_start, seconds) in enumerate(period_buckets(start_time, end_time, period)):
+                delta = deltas.get((room_id, period, period_start))
+                if delta is None:
+                    delta = deltas[(room_id, period, period_start)] = [0, 0, 0]
+                delta[0] += seconds
+                delta[1] += seconds * no_of_persons
+                # A booking is counted once, in the bucket it starts in
+                delta[2] += position == 0
+    return deltas
+
+
+def record_usage(bookings, sign=1):
+    """
+    Adds created bookings to the rollups (sign=1) or removes cancelled ones (sign=-1).
+
+    Called by the booking services inside their transaction. The rollup rows
+    touched by the bookings are read and locked with one query, then updated
+    with bulk_update and the missing ones inserted with bulk_create, so the
+    cost does not depend on the number of buckets. Booking creation holds the
+    room lock, so only one writer can insert the rows of a room at a time.
+
+    Parameters:
+    - bookings (iterable): BookingHistory instances.
+    - sign (int): 1 for created bookings, -1 for cancelled ones.
+    """
+    deltas = usage_deltas(
+        (booking.meeting_room_id, booking.start_time, booking.end_time, booking.no_of_persons) for booking in bookings
+    )
+    if not deltas:
+        return
+
+    starts_by_group = {}
+    for room_id, period, period_start in deltas:
+        starts_by_group.setdefault((room_id, period), []).append(period_start)
+    existing = RoomUsageRollup.objects.select_for_update().filter(reduce(or_, (
+        Q(meeting_room_id=room_id, period=period, period_start__in=starts)
+        for (room_id, period), starts in starts_by_group.items()
+    )))
+
+    updated = []
+    for rollup in existing:
+        delta = deltas.pop((rollup.meeting_room_id, rollup.period, rollup.period_start))
+        for field, value in zip(ROLLUP_FIELDS, delta):
+            setattr(rollup, field, max(0, getattr(rollup, field) + sign * value))
+        updated.append(rollup)
+    if updated:
+        RoomUsageRollup.objects.bulk_update(updated, ROLLUP_FIELDS)
+
+    # Cancelled bookings without rollup rows predate the rollups, which rebuild_rollups fixes
+    if sign > 0 and deltas:
+        RoomUsageRollup.objects.bulk_create([
+            RoomUsageRollup(meeting_room_id=room_id, period=period, period_start=period_start, **dict(zip(ROLLUP_FIELDS, delta)))
+            for (room_id, period, period_start), delta in deltas.items()
+        ])
+
+
+def rebuild_rollups(chunk_size=5000, batch_size=1000):
+    """
+    Recomputes every rollup from the live and archived bookings.
+
+    Bookings are read with chunked values_list iterators ordered by room and
+    start time and merged, so only the buckets of one room are held in memory
+    at a time; they are written with bulk_create in batches. The rebuild runs
+    in a single transaction, so the analytics endpoint keeps answering from
+    the previous rollups until it commits.
+
+    Returns:
+    - int: Number of rollup rows written.
+    """
+    fields = ('meeting_room_id', 'start_time', 'end_time', 'no_of_persons')
+    streams = [
+        model.objects.order_by('meeting_room_id', 'start_time').values_list(*fields).iterator(chunk_size=chunk_size)
+        for model in (BookingHistory, ArchivedBookingHistory)
+    ]
+    written = 0
+    with transaction.atomic(using=booking_database()):
+        RoomUsageRollup.objects.all().delete()
+        pending = []
+        rows = heapq.merge(*streams, key=itemgetter(0, 1))
+        for _, room_rows in groupby(rows, key=itemgetter(0)):
+            for (room_id, period, period_start), delta in usage_deltas(room_rows).items():
+                pending.append(RoomUsageRollup(
+                    meeting_room_id=room_id, period=period, period_start=period_start, **dict(zip(ROLLUP_FIELDS, delta)),
+                ))
+                if len(pending) >= batch_size:
+                    RoomUsageRollup.objects.bulk_create(pending)
+                    written += len(pending)
+                    pending = []
+        RoomUsageRollup.objects.bulk_create(pending)
+        written += len(pending)
+    return written
+
+
+def usage_metrics(booked_seconds, person_seconds, bookings, capacity, range_seconds):
+    """
+    Derives the reported metrics of a room from rollup sums.
+
+    - occupancy: Share of the time range the room was booked.
+    - seat_utilisation: Average share of the seats booked while the room was booked.
+    """
+    return {
+        'booked_minutes': round(booked_seconds / 60, 1),
+        'bookings': bookings,
+        'occupancy': round(booked_seconds / range_seconds, 4) if range_seconds else 0.0,
+        'seat_utilisation': round(person_seconds / (booked_seconds * capacity), 4) if booked_seconds else None,
+    }
+
+
+def room_usage(period, start_time, end_time, room_ids=None, series=False):
+    """
+    Reports the usage of meeting rooms over a time range from the rollups.
+
+    The range is widened to whole periods. Rooms whose seat utilisation is
+    below BOOKING_ANALYTICS['NO_SHOW_SEAT_UTILISATION'] over at least
+    NO_SHOW_MIN_BOOKINGS bookings are flagged as no-show prone: they are
+    routinely booked for far fewer people than they seat.
+
+    Parameters:
+    - period (str): hour, day or week.
+    - start_time (datetime): Start of the range.
+    - end_time (datetime): End of the range.
+    - room_ids (list, optional): Rooms to report, every active room by default.
+    - series (bool): Include the metrics of every period of the range.
+
+    Returns:
+    - dict: The widened range and the metrics of each room.
+    """
+    range_start = period_floor(start_time, period)
+    range_end = period_floor(end_time, period)
+    if range_end < end_time:
+        range_end = next_period_start(range_end, period)
+    range_seconds = (range_end.astimezone(dt_timezone.utc) - range_start.astimezone(dt_timezone.utc)).total_seconds()
+
+    rooms = MeetingRoom.objects.order_by('id')
+    rooms = rooms.filter(id__in=room_ids) if room_ids is not None else rooms.filter(is_active=True)
+    rooms = list(rooms.values('id', 'room_name', 'capacity'))
+    rollups = RoomUsageRollup.objects.filter(
+        meeting_room_id__in=[room['id'] for room in rooms],
+        period=period, period_start__gte=range_start, period_start__lt=range_end,
+    )
+    totals = {
+        row['meeting_room_id']: row
+        for row in rollups.values('meeting_room_id').annotate(*(Sum(field) for field in ROLLUP_FIELDS)).order_by()
+    }
+    periods = {}
+    if series:
+        for row in rollups.order_by('period_start').values('meeting_room_id', 'period_start', *ROLLUP_FIELDS):
+            periods.setdefault(row['meeting_room_id'], []).append(row)
+
+    threshold = analytics_setting('NO_SHOW_SEAT_UTILISATION', 0.25)
+    min_bookings = analytics_setting('NO_SHOW_MIN_BOOKINGS', 5)
+    report = []
+    for room in rooms:
+        total = totals.get(room['id'], {})
+        metrics = usage_metrics(
+            total.get('booked_seconds__sum') or 0, total.get('person_seconds__sum') or 0,
+            total.get('bookings__sum') or 0, room['capacity'], range_seconds,
+        )
+        entry = {
+            'room_id': room['id'],
+            'room_name': room['room_name'],
+            'capacity': room['capacity'],
+            **metrics,
+            'no_show_prone': (
+                metrics['bookings'] >= min_bookings
+                and metrics['seat_utilisation'] is not None
+                and metrics['seat_utilisation'] < threshold
+            ),
+        }
+        if series:
+            entry['series'] = [
+                {
+                    'period_start': row['period_start'],
+                    **usage_metrics(
+                        row['booked_seconds'], row['person_seconds'], row['bookings'], room['capacity'],
+                        period_seconds(row['period_start'], period),
+                    ),
+                }
+                for row in periods.get(room['id'], [])
+            ]
+        report.append(entry)
+    return {'period': period, 'start_time': range_start, 'end_time': range_end, 'rooms': report}
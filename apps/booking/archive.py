@@ -0,0 +1,73 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.booking.models import ArchivedBookingHistory, BookingHistory
+from apps.core.routers import booking_database
+
+ARCHIVED_FIELDS = ('id', 'meeting_room_id', 'start_time', 'end_time', 'no_of_persons', 'booked_by_id')
+
+
+def archive_cutoff(older_than_days=None):
+    """
+    Returns the time before which ended bookings are archived, BOOKING_ARCHIVE_AFTER_DAYS ago by default.
+    """
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'BOOKING_ARCHIVE_AFTER_DAYS', 365)
+    return timezone.now() - timedelta(days=older_than_days)
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Moves up to batch_size bookings that ended before cutoff to the archive in one transaction.
+
+    The rows are copied with bulk_create and deleted with a regular delete(),
+    so the post_delete signals remove them from the availability index and
+    invalidate the cached availability of their rooms, as for a cancellation.
+
+    Returns:
+    - int: Number of bookings archived.
+    """
+    with transaction.atomic(using=booking_database()):
+        rows = list(
+            BookingHistory.objects.filter(end_time__lt=cutoff)
+            .order_by('id')
+            .values_list(*ARCHIVED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        ArchivedBookingHistory.objects.bulk_create(
+            [ArchivedBookingHistory(**dict(zip(ARCHIVED_FIELDS, row))) for row in rows]
+        )
+        BookingHistory.objects.filter(id__in=[row[0] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_bookings(older_than_days=None, batch_size=1000, on_batch=None):
+    """
+    Moves every booking that ended more than older_than_days ago from BookingHistory to ArchivedBookingHistory.
+
+    Bookings are moved in batches of batch_size, each in its own short
+    transaction, so the live table stays available while a large backlog is
+    archived and an interrupted run can simply be started again.
+
+    Parameters:
+    - older_than_days (int, optional): Age of the bookings to archive, BOOKING_ARCHIVE_AFTER_DAYS by default.
+    - batch_size (int): Bookings moved per transaction.
+    - on_batch (callable, optional): Called with the running total after every batch.
+
+    Returns:
+    - int: Number of bookings archived.
+    """
+    cutoff = archive_cutoff(older_than_days)
+    total = 0
+    while True:
+        archived = archive_batch(cutoff, batch_size)
+        if not archived:
+            return total
+        total += archived
+        if on_batch is not None:
+            on_batch(total)
+
@@ -0,0 +1,297 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.booking.cache import cached_active_rooms, cached_series_busy_intervals, get_room_versions, held_room_ids
+from apps.booking.recurrence import series_busy_intervals
+from apps.core.routers import booking_database, use_primary
+
+
+class RoomIntervals:
+    """
+    Sorted interval index of the bookings of a single meeting room.
+
+    Intervals are kept ordered by start time next to a parallel list of start
+    times used for bisection. The longest booking duration seen so far bounds
+    how far back an overlapping interval can start, so an overlap query only
+    inspects the intervals starting in (start - max_duration, end).
+    """
+    __slots__ = ('starts', 'intervals', 'max_duration')
+
+    def __init__(self):
+        self.starts = []
+        self.intervals = []
+        self.max_duration = timedelta(0)
+
+    def add(self, start_time, end_time, booking_id):
+        interval = (start_time, end_time, booking_id)
+        position = bisect_right(self.intervals, interval)
+        self.intervals.insert(position, interval)
+        self.starts.insert(position, start_time)
+        self.max_duration = max(self.max_duration, end_time - start_time)
+
+    def remove(self, start_time, end_time, booking_id):
+        interval = (start_time, end_time, booking_id)
+        position = bisect_left(self.intervals, interval)
+        if position < len(self.intervals) and self.intervals[position] == interval:
+            del self.intervals[position]
+            del self.starts[position]
+
+    def overlaps(self, start_time, end_time):
+        """
+        Returns True if any indexed interval overlaps [start_time, end_time).
+        """
+        low = bisect_right(self.starts, start_time - self.max_duration)
+        high = bisect_left(self.starts, end_time)
+        for index in range(low, high):
+            if self.intervals[index][1] > start_time:
+                return True
+        return False
+
+    def __len__(self):
+        return len(self.intervals)
+
+
+class AvailabilityIndex:
+    """
+    In-process availability engine holding a per-room interval index of
+    future bookings.
+
+    The index is loaded lazily with a single query for every booking that ends
+    after the load time (the horizon) and is kept in sync through the
+    BookingHistory post_save/post_delete signals. Windows that start before
+    the horizon cannot be answered from memory and fall back to the database.
+    The whole index is rebuilt every ``AVAILABILITY_INDEX_TTL`` seconds so
+    bookings that ended in the meantime are pruned.
+
+    Changes made by other processes are picked up through the per-room version
+    counters of the shared cache: every query compares them with the versions
+    the index was built from and reloads only the rooms that changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """
+        Drops the index; it will be rebuilt on next use.
+        """
+        with self._lock:
+            self._rooms = {}
+            self._bookings = {}
+            self._versions = {}
+            self._horizon = None
+            self._loaded_at = None
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'AVAILABILITY_INDEX_TTL', 300)
+
+    def _is_stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def _load(self):
+        from apps.booking.models import BookingHistory
+
+        horizon = timezone.now()
+        self._rooms = {}
+        self._bookings = {}
+        self._horizon = horizon
+        # Read the versions first, so changes racing with the load trigger a reload of their room
+        self._versions = get_room_versions(active_room_ids())
+        rows = BookingHistory.objects.filter(end_time__gt=horizon).values_list(
+            'id', 'meeting_room_id', 'start_time', 'end_time'
+        )
+        for booking_id, room_id, start_time, end_time in rows.iterator(chunk_size=2000):
+            self._insert(booking_id, room_id, start_time, end_time)
+        self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        with self._lock:
+            if self._is_stale():
+                self._load()
+
+    def _reload_rooms(self, room_ids):
+        from apps.booking.models import BookingHistory
+
+        for room_id in room_ids:
+            room = self._rooms.pop(room_id, None)
+            for _, _, booking_id in (room.intervals if room else ()):
+                self._bookings.pop(booking_id, None)
+        rows = BookingHistory.objects.filter(meeting_room_id__in=room_ids, end_time__gt=self._horizon).values_list(
+            'id', 'meeting_room_id', 'start_time', 'end_time'
+        )
+        for booking_id, room_id, start_time, end_time in rows:
+            self._insert(booking_id, room_id, start_time, end_time)
+
+    def _sync(self, room_ids):
+        versions = get_room_versions(room_ids)
+        stale = [room_id for room_id, version in versions.items() if self._versions.get(room_id) != version]
+        if stale:
+            self._reload_rooms(stale)
+            self._versions.update((room_id, versions[room_id]) for room_id in stale)
+
+    def version_bumped(self, room_id, version, previous=None):
+        """
+        Accepts a version bump made by this process after the index was updated for it.
+
+        previous is the version the index must still hold, version - 1 by
+        default. If the room went through other versions meanwhile, the next
+        query reloads it.
+        """
+        if previous is None:
+            previous = version - 1
+        with self._lock:
+            if self._versions.get(room_id) == previous:
+                self._versions[room_id] = version
+
+    def _insert(self, booking_id, room_id, start_time, end_time):
+        room = self._rooms.get(room_id)
+        if room is None:
+            room = self._rooms[room_id] = RoomIntervals()
+        room.add(start_time, end_time, booking_id)
+        self._bookings[booking_id] = (room_id, start_time, end_time)
+
+    def _discard(self, booking_id):
+        entry = self._bookings.pop(booking_id, None)
+        if entry is not None:
+            room_id, start_time, end_time = entry
+            self._rooms[room_id].remove(start_time, end_time, booking_id)
+
+    def booking_saved(self, booking):
+        """
+        Indexes a created or updated booking.
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._discard(booking.pk)
+            if booking.end_time > self._horizon:
+                self._insert(booking.pk, booking.meeting_room_id, booking.start_time, booking.end_time)
+
+    def booking_deleted(self, booking):
+        """
+        Removes a deleted booking from the index.
+        """
+        with self._lock:
+            if self._loaded_at is not None:
+                self._discard(booking.pk)
+
+    def busy_room_ids(self, start_time, end_time, room_ids=None):
+        """
+        Returns the ids of the rooms with at least one booking, recurring
+        booking occurrence or hold overlapping [start_time, end_time).
+
+        Recurring bookings are not indexed in memory; their rules are few, are
+        read from the versioned cache and are expanded over the requested window only.
+        Holds are few and short-lived, they are read from the versioned cache too.
+
+        Parameters:
+        - start_time (datetime): Start of the requested window (inclusive).
+        - end_time (datetime): End of the requested window (exclusive).
+        - room_ids (list, optional): Rooms to check, all active rooms by default.
+
+        Returns:
+        - set: Ids of the meeting rooms that are not free for the whole window.
+        """
+        if room_ids is None:
+            room_ids = active_room_ids()
+        with self._lock:
+            self.ensure_loaded()
+            if start_time < self._horizon:
+                busy_room_ids = self._busy_room_ids_from_db(start_time, end_time)
+            else:
+                self._sync(room_ids)
+                busy_room_ids = {
+                    room_id for room_id in room_ids
+                    if self._rooms.get(room_id) and self._rooms[room_id].overlaps(start_time, end_time)
+                }
+        series_busy = cached_series_busy_intervals(start_time, end_time)
+        if series_busy is None:
+            series_busy = series_busy_intervals(None, start_time, end_time)
+        return busy_room_ids | set(series_busy) | held_room_ids(start_time, end_time)
+
+    def is_room_free(self, room_id, start_time, end_time):
+        with self._lock:
+            self.ensure_loaded()
+            self._sync([room_id])
+            if start_time < self._horizon:
+                if room_id in self._busy_room_ids_from_db(start_time, end_time, room_id=room_id):
+                    return False
+            else:
+                room = self._rooms.get(room_id)
+                if room is not None and room.overlaps(start_time, end_time):
+                    return False
+        if room_id in held_room_ids(start_time, end_time):
+            return False
+        return not series_busy_intervals([room_id], start_time, end_time)
+
+    @staticmethod
+    def _busy_room_ids_from_db(start_time, end_time, room_id=None):
+        from apps.booking.models import BookingHistory
+
+        bookings = BookingHistory.objects.filter(start_time__lt=end_time, end_time__gt=start_time)
+        if room_id is not None:
+            bookings = bookings.filter(meeting_room_id=room_id)
+        return set(bookings.values_list('meeting_room_id', flat=True).distinct())
+
+
+def active_room_ids():
+    return [room['id'] for room in cached_active_rooms()]
+
+
+class SiteAvailabilityIndexes:
+    """
+    One AvailabilityIndex per database holding bookings (see apps.core.routers).
+
+    Queries go to the index of the current site's database and booking
+    changes to the index of the database the booking is stored on. Room IDs
+    are unique across databases, so version bumps are passed to every index.
+    The indexes are shared by every request, so they are loaded from the
+    primaries even inside use_replicas().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def for_database(self, alias):
+        with self._lock:
+            index = self._indexes.get(alias)
+            if index is None:
+                index = self._indexes[alias] = AvailabilityIndex()
+            return index
+
+    def _all(self):
+        with self._lock:
+            return list(self._indexes.values())
+
+    def reset(self):
+        for index in self._all():
+            index.reset()
+
+    def busy_room_ids(self, start_time, end_time, room_ids=None):
+        with use_primary():
+            return self.for_database(booking_database()).busy_room_ids(start_time, end_time, room_ids)
+
+    def is_room_free(self, room_id, start_time, end_time):
+        with use_primary():
+            return self.for_database(booking_database()).is_room_free(room_id, start_time, end_time)
+
+    def booking_saved(self, booking):
+        self.for_database(booking._state.db or booking_database()).booking_saved(booking)
+
+    def booking_deleted(self, booking):
+        self.for_database(booking._state.db or booking_database()).booking_deleted(booking)
+
+    def version_bumped(self, room_id, version, previous=None):
+        for index in self._all():
+            index.version_bumped(room_id, version, previous)
+
+
+availability_index = SiteAvailabilityIndexes()
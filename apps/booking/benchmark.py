@@ -0,0 +1,436 @@
+import asyncio
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.asgi import get_asgi_application
+from django.db import connection, connections, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.booking.availability import availability_index
+from apps.booking.cache import bump_room_version, bump_rooms_version
+from apps.booking.models import BookingHistory, Equipment, MeetingRoom
+from apps.member.models import CustomUser
+
+BENCHMARK_ROOM_PREFIX = 'Benchmark Room'
+BENCHMARK_EMAIL_DOMAIN = 'benchmark.example.com'
+BENCHMARK_PASSWORD = 'benchmark-password'
+BENCHMARK_BUILDINGS = ('North', 'South', 'East', 'West')
+BENCHMARK_FLOORS = 10
+BENCHMARK_EQUIPMENT = ('projector', 'vc', 'whiteboard', 'display')
+
+
+def benchmark_host():
+    """
+    Returns a host name accepted by ALLOWED_HOSTS for the requests of the test client.
+    """
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    # Without ALLOWED_HOSTS, localhost is allowed when DEBUG is on
+    return 'localhost'
+
+
+def benchmark_email(index):
+    return f'user{index}@{BENCHMARK_EMAIL_DOMAIN}'
+
+
+def clear_dataset():
+    """
+    Deletes the rooms, users and bookings created by seed_dataset.
+    """
+    BookingHistory.objects.filter(booked_by__email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}').delete()
+    MeetingRoom.objects.filter(room_name__startswith=BENCHMARK_ROOM_PREFIX).delete()
+    CustomUser.objects.filter(email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}').delete()
+    availability_index.reset()
+
+
+def seed_dataset(rooms, users, bookings, batch_size=5000, seed=0):
+    """
+    Seeds a synthetic dataset of meeting rooms, users and bookings.
+
+    Rooms get a random building, floor and set of equipment. Bookings are
+    back to back one hour slots per room, half of them in the past and half
+    in the future, owned by randomly picked users. Everything is
+    inserted with bulk_create in batches, so millions of bookings can be
+    seeded without holding them all in memory.
+
+    Parameters:
+    - rooms (int): Number of meeting rooms.
+    - users (int): Number of users, all sharing BENCHMARK_PASSWORD.
+    - bookings (int): Total number of bookings, spread evenly over the rooms.
+    - batch_size (int): Rows per INSERT.
+    - seed (int): Seed of the random generator, for reproducible datasets.
+
+    Returns:
+    - dict: Number of rooms, users and bookings created.
+    """
+    rng = random.Random(seed)
+    # Hashing once keeps seeding fast while login still verifies a real hash
+    password = make_password(BENCHMARK_PASSWORD)
+
+    with transaction.atomic():
+        room_ids = [
+            room.id for room in MeetingRoom.objects.bulk_create(
+                [
+                    MeetingRoom(
+                        room_name=f'{BENCHMARK_ROOM_PREFIX} {index}', capacity=rng.choice((4, 6, 8, 12, 20, 50)),
+                        building=rng.choice(BENCHMARK_BUILDINGS), floor=rng.randrange(BENCHMARK_FLOORS),
+                    )
+                    for index in range(rooms)
+                ],
+                batch_size=batch_size,
+            )
+        ]
+        equipment_ids = [
+            Equipment.objects.get_or_create(code=code, defaults={'name': code.title()})[0].id for code in BENCHMARK_EQUIPMENT
+        ]
+        MeetingRoom.equipment.through.objects.bulk_create(
+            [
+                MeetingRoom.equipment.through(meetingroom_id=room_id, equipment_id=equipment_id)
+                for room_id in room_ids
+                for equipment_id in equipment_ids
+                if rng.random() < 0.5
+            ],
+            batch_size=batch_size,
+        )
+        CustomUser.objects.bulk_create(
+            [CustomUser(email=benchmark_email(index), username=f'user{index}', password=password) for index in range(users)],
+            batch_size=batch_size,
+        )
+        user_ids = list(
+            CustomUser.objects.filter(email__endswith=f'@{BENCHMARK_EMAIL_DOMAIN}').values_list('id', flat=True)
+        )
+
+    slot = timedelta(hours=1)
+    per_room = -(-bookings // max(rooms, 1))
+    first_start = timezone.now().replace(minute=0, second=0, microsecond=0) - per_room // 2 * slot
+    created = 0
+    batch = []
+    for position in range(per_room):
+        start_time = first_start + position * slot
+        for room_id in room_ids:
+            if created == bookings:
+                break
+            batch.append(BookingHistory(
+                meeting_room_id=room_id, start_time=start_time, end_time=start_time + slot,
+                no_of_persons=1, booked_by_id=rng.choice(user_ids),
+            ))
+            created += 1
+        if len(batch) >= batch_size:
+            BookingHistory.objects.bulk_create(batch, batch_size=batch_size)
+            batch = []
+    if batch:
+        BookingHistory.objects.bulk_create(batch, batch_size=batch_size)
+
+    # bulk_create skips the signals that keep the caches in sync
+    availability_index.reset()
+    bump_rooms_version()
+    for room_id in room_ids:
+        bump_room_version(room_id)
+
+    return {'rooms': len(room_ids), 'users': len(user_ids), 'bookings': created}
+
+
+def percentile(samples, pct):
+    """
+    Returns the pct percentile of the samples using linear interpolation between the closest ranks.
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(durations, query_counts, statuses):
+    """
+    Summarises the measured requests of one scenario.
+    """
+    milliseconds = [duration * 1000 for duration in durations]
+    return {
+        'requests': len(durations),
+        'p50_ms': round(percentile(milliseconds, 50), 3),
+        'p95_ms': round(percentile(milliseconds, 95), 3),
+        'p99_ms': round(percentile(milliseconds, 99), 3),
+        'mean_ms': round(statistics.fmean(milliseconds), 3) if milliseconds else 0.0,
+        'queries': max(query_counts, default=0),
+        'statuses': sorted(set(statuses)),
+    }
+
+
+def measure(requests, warmup=1):
+    """
+    Times a sequence of requests and counts the queries each of them runs.
+
+    Parameters:
+    - requests (iterable): Callables performing one request and returning the response.
+    - warmup (int): Number of leading requests that are performed but not recorded.
+
+    Returns:
+    - dict: Latency percentiles in milliseconds, the maximum query count and the response statuses.
+    """
+    durations, query_counts, statuses = [], [], []
+    for position, request in enumerate(requests):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = request()
+            # Streaming responses do their work while being consumed
+            if response.streaming:
+                b''.join(response.streaming_content)
+            duration = time.perf_counter() - started
+        if position < warmup:
+            continue
+        durations.append(duration)
+        query_counts.append(len(queries))
+        statuses.append(response.status_code)
+    return summarize(durations, query_counts, statuses)
+
+
+def run_benchmarks(iterations=100, warmup=1, user_email=None):
+    """
+    Benchmarks the booking endpoints against the seeded dataset.
+
+    Scenarios:
+    - login: UserLoginView with a benchmark user, without rate limiting.
+    - login_throttled: UserLoginView rejecting the attempts with its rate limiter.
+    - list_rooms / list_available_rooms: MeetingRoomListView without and with a time range.
+    - search_rooms: MeetingRoomSearchView filtering on building, capacity, equipment and a time range.
+    - book: MeetingRoomBookingView, booking free slots far in the future.
+    - my_bookings: MyBookingsView, first page of upcoming bookings.
+    - cancel: CancelMeetingRoomBookingView, cancelling the bookings made by the book scenario.
+
+    Parameters:
+    - iterations (int): Recorded requests per scenario.
+    - warmup (int): Unrecorded requests performed before each scenario.
+    - user_email (str, optional): Benchmark user, the first seeded user by default.
+
+    Returns:
+    - dict: Scenario name to its summary (see measure).
+    """
+    user_email = user_email or benchmark_email(0)
+    room = MeetingRoom.objects.filter(room_name__startswith=BENCHMARK_ROOM_PREFIX, is_active=True).order_by('-capacity', 'id').first()
+    if room is None:
+        raise ValueError("No benchmark dataset found, seed it first.")
+
+    client = APIClient(SERVER_NAME=benchmark_host())
+    total = iterations + warmup
+    results = {}
+
+    def login():
+        return client.post(reverse('user-login'), {'email': user_email, 'password': BENCHMARK_PASSWORD}, format='json')
+
+    # The login scenario measures authentication itself, the throttled one the cost of a rejected attempt
+    with override_settings(LOGIN_RATE_LIMIT={}):
+        results['login'] = measure((login for _ in range(total)), warmup)
+    with override_settings(LOGIN_RATE_LIMIT={'IP': {'CAPACITY': 0, 'REFILL_PER_MINUTE': 1}}):
+        results['login_throttled'] = measure((login for _ in range(total)), warmup)
+    with override_settings(LOGIN_RATE_LIMIT={}):
+        token = login().data['token']['access']
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    list_url = reverse('meeting-room-list')
+    window_start = timezone.now() + timedelta(hours=2)
+    window = {'start_time': window_start.isoformat(), 'end_time': (window_start + timedelta(hours=1)).isoformat()}
+    results['list_rooms'] = measure((lambda: client.get(list_url) for _ in range(total)), warmup)
+    results['list_available_rooms'] = measure((lambda: client.get(list_url, window) for _ in range(total)), warmup)
+    search_url = reverse('meeting-room-search')
+    search = {**window, 'building': BENCHMARK_BUILDINGS[0], 'min_capacity': 6, 'equipment': BENCHMARK_EQUIPMENT[0]}
+    results['search_rooms'] = measure((lambda: client.get(search_url, search) for _ in range(total)), warmup)
+
+    # Book consecutive slots well past the seeded bookings, so every request succeeds
+    book_url = reverse('book-meeting-room', kwargs={'room_id': room.id})
+    latest_end = BookingHistory.objects.filter(meeting_room=room).order_by('-end_time').values_list('end_time', flat=True).first()
+    book_start = max(latest_end or timezone.now(), timezone.now()) + timedelta(days=30)
+    booking_ids = []
+
+    def book(position):
+        start_time = book_start + timedelta(hours=position)
+        response = client.post(book_url, {
+            'start_time': start_time.isoformat(),
+            'end_time': (start_time + timedelta(hours=1)).isoformat(),
+            'no_of_persons': 1,
+        }, format='json')
+        if response.status_code == 201:
+            booking_ids.append(response.data['id'])
+        return response
+
+    results['book'] = measure((lambda position=position: book(position) for position in range(total)), warmup)
+
+    my_bookings_url = reverse('my-bookings')
+    results['my_bookings'] = measure(
+        (lambda: client.get(my_bookings_url, {'scope': 'upcoming'}) for _ in range(total)), warmup
+    )
+
+    def cancel(booking_id):
+        return client.delete(reverse('cancel-meeting-room-booking', kwargs={'booking_id': booking_id}))
+
+    results['cancel'] = measure((lambda booking_id=booking_id: cancel(booking_id) for booking_id in booking_ids), warmup)
+    return results
+
+
+class InFlightCounter:
+    """
+    Thread safe count of the requests in flight, remembering its peak.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.current -= 1
+
+
+def summarize_load(durations, statuses, elapsed, in_flight):
+    summary = summarize(durations, [], statuses)
+    del summary['queries']
+    summary['throughput_rps'] = round(len(durations) / elapsed, 1) if elapsed else 0.0
+    summary['peak_in_flight'] = in_flight.peak
+    return summary
+
+
+async def asgi_get(application, path, query_string, headers):
+    """
+    Sends a GET request straight to an ASGI application and returns the response status.
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': query_string.encode(),
+        'headers': [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        'server': (headers.get('Host', 'localhost'), 80),
+        'client': ('127.0.0.1', 0),
+    }
+    response = {}
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+
+    await application(scope, receive, send)
+    return response['status']
+
+
+def run_concurrency_comparison(requests=500, concurrency=100, threads=4, user_email=None):
+    """
+    Compares the WSGI (sync DRF view) and ASGI (async view) my-bookings
+    endpoints under the same load: concurrency clients sending requests back
+    to back to a single worker.
+
+    The WSGI worker is modelled by a pool of threads, like a gthread worker,
+    so at most threads requests are handled at a time and the others queue.
+    The ASGI worker handles every request on one event loop. Latencies are
+    measured from the moment a client sends its request, queueing included.
+
+    Parameters:
+    - requests (int): Number of requests sent on each path.
+    - concurrency (int): Number of concurrent clients.
+    - threads (int): Number of threads of the WSGI worker.
+    - user_email (str, optional): Benchmark user, the first seeded user by default.
+
+    Returns:
+    - dict: wsgi and asgi summaries with the latency percentiles, throughput and peak number of requests in flight.
+    """
+    user = CustomUser.objects.get(email=user_email or benchmark_email(0))
+    headers = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+    params = {'scope': 'upcoming'}
+    host = benchmark_host()
+
+    async def run_clients(handle, in_flight):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def client_request():
+            async with semaphore:
+                request_started = time.perf_counter()
+                status_code = await handle(in_flight)
+                return time.perf_counter() - request_started, status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(client_request() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+        return summarize_load([duration for duration, _ in results], [code for _, code in results], elapsed, in_flight)
+
+    # WSGI: a fixed pool of threads, each with its own client and database connection
+    local = threading.local()
+    pool = ThreadPoolExecutor(max_workers=threads)
+
+    def wsgi_request(in_flight):
+        if not hasattr(local, 'client'):
+            local.client = APIClient(SERVER_NAME=host)
+        with in_flight:
+            return local.client.get(reverse('my-bookings'), params, headers=headers).status_code
+
+    async def handle_wsgi(in_flight):
+        return await asyncio.get_running_loop().run_in_executor(pool, wsgi_request, in_flight)
+
+    try:
+        wsgi = asyncio.run(run_clients(handle_wsgi, InFlightCounter()))
+        list(pool.map(lambda _: connections.close_all(), range(threads)))
+    finally:
+        pool.shutdown()
+
+    # ASGI: the requests are passed to the ASGI application like an ASGI server would
+    application = get_asgi_application()
+    path = reverse('async-my-bookings')
+    query_string = urlencode(params)
+
+    async def handle_asgi(in_flight):
+        with in_flight:
+            return await asgi_get(application, path, query_string, {**headers, 'Host': host})
+
+    asgi = asyncio.run(run_clients(handle_asgi, InFlightCounter()))
+    return {'requests': requests, 'concurrency': concurrency, 'threads': threads, 'wsgi': wsgi, 'asgi': asgi}
+
+
+def compare_to_baseline(scenarios, baseline, tolerance=0.2):
+    """
+    Compares benchmark results with a stored baseline report.
+
+    A scenario regresses when it runs more queries than in the baseline, or
+    when its p95 latency grew by more than the tolerance.
+
+    Parameters:
+    - scenarios (dict): Results returned by run_benchmarks.
+    - baseline (dict): A report previously written by the benchmark command.
+    - tolerance (float): Allowed relative p95 latency increase.
+
+    Returns:
+    - list: One dict per regression, with the scenario, metric, baseline and current values.
+    """
+    regressions = []
+    for name, result in scenarios.items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        if result['queries'] > previous['queries']:
+            regressions.append({'scenario': name, 'metric': 'queries', 'baseline': previous['queries'], 'current': result['queries']})
+        if result['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append({'scenario': name, 'metric': 'p95_ms', 'baseline': previous['p95_ms'], 'current': result['p95_ms']})
+    return regressions
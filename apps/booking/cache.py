@@ -0,0 +1,303 @@
+import threading
+import time
+from datetime import datetime, time as datetime_time, timedelta, timezone as datetime_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from apps.booking import recurrence
+from apps.core.routers import booking_database, use_primary
+
+ROOMS_VERSION_KEY = 'booking:rooms:version'
+SERIES_VERSION_KEY = 'booking:series:version'
+HOLDS_VERSION_KEY = 'booking:holds:version'
+
+
+class CacheStats:
+    """
+    Thread safe hit/miss counters of the booking read cache, per namespace.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {}
+
+    def record(self, namespace, hits=0, misses=0):
+        with self._lock:
+            counters = self._counters.setdefault(namespace, {'hits': 0, 'misses': 0})
+            counters['hits'] += hits
+            counters['misses'] += misses
+
+    def snapshot(self):
+        with self._lock:
+            return {namespace: dict(counters) for namespace, counters in self._counters.items()}
+
+
+cache_stats = CacheStats()
+
+
+def get_cache():
+    return caches[getattr(settings, 'BOOKING_CACHE_ALIAS', 'default')]
+
+
+def cache_timeout():
+    return getattr(settings, 'BOOKING_CACHE_TIMEOUT', 3600)
+
+
+def room_version_key(room_id):
+    return f'booking:room:{room_id}:version'
+
+
+def _initial_version():
+    # Seeded from the clock, so a counter lost to eviction never comes back with an old value
+    return time.time_ns() // 1000
+
+
+def get_versions(keys):
+    """
+    Returns the current value of several version counters in one cache round trip.
+
+    Missing counters are initialised, so every caller agrees on the version.
+    """
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = _initial_version()
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+            versions[key] = version
+    return versions
+
+
+def bump_version(key):
+    """
+    Increments a version counter, making every entry keyed by the previous value unreachable.
+    """
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def get_room_versions(room_ids):
+    """
+    Returns the version counter of every given meeting room.
+
+    Returns:
+    - dict: Meeting room ID to its version.
+    """
+    keys = {room_version_key(room_id): room_id for room_id in room_ids}
+    versions = get_versions(list(keys))
+    return {room_id: versions[key] for key, room_id in keys.items()}
+
+
+def bump_room_version(room_id):
+    return bump_version(room_version_key(room_id))
+
+
+def bump_rooms_version():
+    return bump_version(ROOMS_VERSION_KEY)
+
+
+def bump_series_version():
+    return bump_version(SERIES_VERSION_KEY)
+
+
+def bump_holds_version():
+    return bump_version(HOLDS_VERSION_KEY)
+
+
+def cached_active_rooms():
+    """
+    Returns the id, room_name, capacity, building and floor of every active meeting room, ordered by id.
+
+    The list is cached under the global rooms version, bumped whenever a
+    meeting room is saved or deleted, per database holding meeting rooms.
+    Cache entries are shared by every user, so they are always filled from
+    the primary: an entry filled from a lagging replica would outlive the lag.
+    """
+    from apps.booking.models import MeetingRoom
+
+    cache = get_cache()
+    version = get_versions([ROOMS_VERSION_KEY])[ROOMS_VERSION_KEY]
+    key = f'booking:rooms:{version}:{booking_database()}:active'
+    rooms = cache.get(key)
+    if rooms is not None:
+        cache_stats.record('rooms', hits=1)
+        return rooms
+
+    cache_stats.record('rooms', misses=1)
+    with use_primary():
+        rooms = list(MeetingRoom.objects.filter(is_active=True).order_by('id').values('id', 'room_name', 'capacity', 'building', 'floor'))
+    cache.set(key, rooms, cache_timeout())
+    return rooms
+
+
+def _window_days(start_time, end_time):
+    day = start_time.astimezone(datetime_timezone.utc).date()
+    last_day = (end_time - timedelta(microseconds=1)).astimezone(datetime_timezone.utc).date()
+    while True:
+        yield day
+        if day >= last_day:
+            return
+        day += timedelta(days=1)
+
+
+def _day_bounds(day):
+    day_start = datetime.combine(day, datetime_time.min, tzinfo=datetime_timezone.utc)
+    if day == datetime.max.date():
+        # The last day has no next midnight
+        return day_start, datetime.max.replace(tzinfo=datetime_timezone.utc)
+    return day_start, day_start + timedelta(days=1)
+
+
+def cached_busy_intervals(room_ids, start_time, end_time):
+    """
+    Returns the busy intervals (bookings and recurring occurrences) of several
+    meeting rooms over a time range, served from per room and per UTC day
+    cache entries keyed by the room version.
+
+    All missing room/day entries are loaded together with a single call to
+    busy_intervals_for_rooms.
+
+    Returns:
+    - dict: Meeting room ID to the sorted (start_time, end_time) intervals overlapping the range.
+    """
+    from apps.booking.services import busy_intervals_for_rooms
+
+    cache = get_cache()
+    versions = get_room_versions(room_ids)
+    days = list(_window_days(start_time, end_time))
+    keys = {
+        (room_id, day): f'booking:busy:{room_id}:{versions[room_id]}:{day.isoformat()}'
+        for room_id in room_ids for day in days
+    }
+    entries = cache.get_many(list(keys.values()))
+    missing = [room_day for room_day, key in keys.items() if key not in entries]
+    cache_stats.record('availability', hits=len(keys) - len(missing), misses=len(missing))
+
+    if missing:
+        missing_room_ids = sorted({room_id for room_id, _ in missing})
+        missing_days = sorted({day for _, day in missing})
+        with use_primary():
+            loaded = busy_intervals_for_rooms(missing_room_ids, _day_bounds(missing_days[0])[0], _day_bounds(missing_days[-1])[1])
+        new_entries = {}
+        for room_id, day in missing:
+            day_start, day_end = _day_bounds(day)
+            new_entries[keys[(room_id, day)]] = [
+                (busy_start, busy_end) for busy_start, busy_end in loaded[room_id]
+                if busy_start < day_end and busy_end > day_start
+            ]
+        cache.set_many(new_entries, cache_timeout())
+        entries.update(new_entries)
+
+    busy = {}
+    for room_id in room_ids:
+        intervals = set()
+        for day in days:
+            intervals.update(
+                (busy_start, busy_end) for busy_start, busy_end in entries[keys[(room_id, day)]]
+                if busy_start < end_time and busy_end > start_time
+            )
+        busy[room_id] = sorted(intervals)
+    return busy
+
+
+def cached_series_busy_intervals(start_time, end_time):
+    """
+    Expands the recurring bookings of every meeting room over a time range
+    from the cached rules of the series that had not ended when the cache
+    entry was filled.
+
+    Returns:
+    - dict: Meeting room ID to the occurrences overlapping the range, or None
+      when the range starts before the cached horizon and the database has to be asked.
+    """
+    from apps.booking.models import RecurringBooking
+
+    cache = get_cache()
+    version = get_versions([SERIES_VERSION_KEY])[SERIES_VERSION_KEY]
+    key = f'booking:series:{version}:{booking_database()}:active'
+    entry = cache.get(key)
+    if entry is None:
+        cache_stats.record('series', misses=1)
+        horizon = timezone.now()
+        with use_primary():
+            series = list(RecurringBooking.objects.filter(ends_at__gt=horizon).prefetch_related('exceptions'))
+        entry = {
+            'horizon': horizon,
+            'rules': [
+                (
+                    recurring_booking.meeting_room_id, recurring_booking.start_time, recurring_booking.end_time,
+                    recurring_booking.frequency, recurring_booking.interval, recurring_booking.until,
+                    recurring_booking.count, recurring_booking.ends_at,
+                    frozenset(exception.occurrence_start for exception in recurring_booking.exceptions.all()),
+                )
+                for recurring_booking in series
+            ],
+        }
+        cache.set(key, entry, cache_timeout())
+    else:
+        cache_stats.record('series', hits=1)
+
+    if start_time < entry['horizon']:
+        return None
+
+    busy = {}
+    for room_id, first_start, first_end, frequency, interval, until, count, ends_at, exceptions in entry['rules']:
+        if first_start >= end_time or ends_at <= start_time:
+            continue
+        occurrences = list(recurrence.expand_occurrences(
+            first_start, first_end, frequency, interval, until=until, count=count,
+            exceptions=exceptions, window_start=start_time, window_end=end_time,
+        ))
+        if occurrences:
+            busy.setdefault(room_id, []).extend(occurrences)
+    return busy
+
+
+def cached_active_holds():
+    """
+    Returns the (meeting_room_id, start_time, end_time, expires_at) of every hold that has not expired.
+
+    The list is cached under the holds version, bumped whenever a hold is
+    taken, confirmed, released or swept. Holds expire by time rather than by
+    a write, so expired holds are filtered out when the entry is read.
+    """
+    from apps.booking.models import BookingHold
+
+    cache = get_cache()
+    version = get_versions([HOLDS_VERSION_KEY])[HOLDS_VERSION_KEY]
+    key = f'booking:holds:{version}:{booking_database()}:active'
+    holds = cache.get(key)
+    if holds is None:
+        cache_stats.record('holds', misses=1)
+        with use_primary():
+            holds = list(BookingHold.objects.filter(expires_at__gt=timezone.now()).values_list(
+                'meeting_room_id', 'start_time', 'end_time', 'expires_at'
+            ))
+        cache.set(key, holds, cache_timeout())
+    else:
+        cache_stats.record('holds', hits=1)
+
+    now = timezone.now()
+    return [hold for hold in holds if hold[3] > now]
+
+
+def held_room_ids(start_time, end_time):
+    """
+    Returns the ids of the meeting rooms with a hold overlapping [start_time, end_time).
+    """
+    return {
+        room_id for room_id, hold_start, hold_end, _ in cached_active_holds()
+        if hold_start < end_time and hold_end > start_time
+    }
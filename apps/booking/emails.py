@@ -0,0 +1,83 @@
+from apps.core.outbox import enqueue_email
+
+
+def queue_confirmation_email(room_name, start_time, end_time, booked_by_email):
+    """
+    Queue a confirmation email for a meeting room booking.
+
+    Parameters:
+    - room_name (str): The name of the booked meeting room.
+    - start_time (datetime): The start time of the booking.
+    - end_time (datetime): The end time of the booking.
+    - booked_by_email (str): The email address of the user who made the booking.
+
+    The email will contain details of the booking, including the meeting room name, date, and time.
+
+    Example:
+    queue_confirmation_email('Conference Room A', datetime(2023, 12, 15, 10, 0), datetime(2023, 12, 15, 12, 0), 'user@example.com')
+    """
+    subject = 'Meeting Room Booking Confirmation'
+    formatted_start_time = start_time.strftime("%d-%B-%Y %I:%M %p")
+    formatted_end_time = end_time.strftime("%I:%M %p")
+    message = f'You have successfully booked meeting room {room_name}. Your booking details:\nDate & Time: {formatted_start_time}  -  {formatted_end_time}.'
+    return enqueue_email(subject, message, booked_by_email)
+
+
+def queue_cancellation_email(room_name, start_time, end_time, booked_by_email):
+    """
+    Queue a cancellation email for a meeting room booking.
+
+    Parameters:
+    - room_name (str): The name of the canceled meeting room booking.
+    - start_time (datetime): The start time of the canceled booking.
+    - end_time (datetime): The end time of the canceled booking.
+    - booked_by_email (str): The email address of the user who made the canceled booking.
+
+    The email will notify the user about the cancellation and include details such as the meeting room name, date, and time.
+
+    Example:
+    queue_cancellation_email('Conference Room A', datetime(2023, 12, 15, 10, 0), datetime(2023, 12, 15, 12, 0), 'user@example.com')
+    """
+    subject = 'Meeting Room Booking Cancellation'
+    formatted_start_time = start_time.strftime("%d-%B-%Y %I:%M %p")
+    formatted_end_time = end_time.strftime("%I:%M %p")
+    message = f'Your booking for meeting room {room_name} from {formatted_start_time} to {formatted_end_time} has been canceled.'
+    return enqueue_email(subject, message, booked_by_email)
+
+
+def queue_bulk_confirmation_email(bookings, booked_by_email):
+    """
+    Queue a single confirmation email listing every booking made in one batch.
+
+    Parameters:
+    - bookings (list): The created BookingHistory instances.
+    - booked_by_email (str): The email address of the user who made the bookings.
+    """
+    subject = 'Meeting Room Booking Confirmation'
+    lines = [
+        f'{booking.meeting_room.room_name}: {booking.start_time.strftime("%d-%B-%Y %I:%M %p")}  -  {booking.end_time.strftime("%I:%M %p")}'
+        for booking in sorted(bookings, key=lambda booking: booking.start_time)
+    ]
+    message = f'You have successfully booked {len(bookings)} meeting room slots. Your booking details:\n' + '\n'.join(lines)
+    return enqueue_email(subject, message, booked_by_email)
+
+
+def queue_recurring_confirmation_email(recurring_booking, occurrence_count, booked_by_email):
+    """
+    Queue a confirmation email for a recurring booking series.
+
+    Parameters:
+    - recurring_booking (RecurringBooking): The booked series.
+    - occurrence_count (int): Number of booked occurrences.
+    - booked_by_email (str): The email address of the user who made the booking.
+    """
+    subject = 'Meeting Room Booking Confirmation'
+    formatted_start_time = recurring_booking.start_time.strftime("%d-%B-%Y %I:%M %p")
+    formatted_end_time = recurring_booking.end_time.strftime("%I:%M %p")
+    formatted_ends_at = recurring_booking.ends_at.strftime("%d-%B-%Y")
+    message = (
+        f'You have successfully booked meeting room {recurring_booking.meeting_room.room_name} {recurring_booking.frequency}. '
+        f'Your booking details:\nFirst occurrence: {formatted_start_time}  -  {formatted_end_time}.\n'
+        f'Occurrences: {occurrence_count}, last one on {formatted_ends_at}.'
+    )
+    return enqueue_email(subject, message, booked_by_email)
@@ -0,0 +1,45 @@
+import logging
+
+from django.db import transaction
+
+from apps.core.pubsub import get_event_hub
+from apps.core.routers import booking_database
+
+logger = logging.getLogger(__name__)
+
+# Channel of the booking created/cancelled events streamed to availability displays
+AVAILABILITY_CHANNEL = 'availability'
+
+BOOKING_CREATED = 'booking.created'
+BOOKING_CANCELLED = 'booking.cancelled'
+
+
+def booking_event(event_type, booking):
+    return {
+        'type': event_type,
+        'room_id': booking.meeting_room_id,
+        'booking_id': booking.id,
+        'start_time': booking.start_time.isoformat(),
+        'end_time': booking.end_time.isoformat(),
+    }
+
+
+def publish_events(events):
+    hub = get_event_hub()
+    for event in events:
+        try:
+            hub.publish(AVAILABILITY_CHANNEL, event)
+        except Exception:
+            # Subscribers catch up from the listing, a failed publish must not fail the committed request
+            logger.exception("Publishing the %s event of booking %s failed", event['type'], event['booking_id'])
+
+
+def publish_booking_events(event_type, bookings, using=None):
+    """
+    Publishes an availability event per booking once the transaction of their database (the current site's by default) commits.
+
+    The events are built right away, so they describe the bookings as they
+    were when the change was made (deleted bookings keep their data).
+    """
+    events = [booking_event(event_type, booking) for booking in bookings]
+    transaction.on_commit(lambda: publish_events(events), using=using or booking_database())
@@ -0,0 +1,62 @@
+def merge_intervals(intervals, window_start, window_end):
+    """
+    Clips (start_time, end_time) intervals to a window and merges the overlapping ones.
+
+    Parameters:
+    - intervals (list): (start_time, end_time) intervals sorted by start time.
+    - window_start (datetime): Start of the window.
+    - window_end (datetime): End of the window.
+
+    Returns:
+    - list: Disjoint, sorted (start_time, end_time) intervals inside the window.
+    """
+    merged = []
+    for start_time, end_time in intervals:
+        start_time, end_time = max(start_time, window_start), min(end_time, window_end)
+        if start_time >= end_time:
+            continue
+        if merged and start_time <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end_time))
+        else:
+            merged.append((start_time, end_time))
+    return merged
+
+
+def free_intervals(busy, window_start, window_end):
+    """
+    Returns the gaps of the window that are not covered by the merged busy intervals.
+    """
+    free = []
+    cursor = window_start
+    for start_time, end_time in busy:
+        if start_time > cursor:
+            free.append((cursor, start_time))
+        cursor = max(cursor, end_time)
+    if cursor < window_end:
+        free.append((cursor, window_end))
+    return free
+
+
+def busy_bitmap(busy, window_start, slot_count, slot):
+    """
+    Converts merged busy intervals into a bitmap of fixed size slots.
+
+    Every interval is written with a single slice assignment on a bytearray, so
+    the cost grows with the number of intervals rather than with the number of
+    slots. A slot is busy ('1') when any part of it is booked.
+
+    Parameters:
+    - busy (list): Merged (start_time, end_time) intervals inside the window.
+    - window_start (datetime): Start of the first slot.
+    - slot_count (int): Number of slots of the window.
+    - slot (timedelta): Length of a slot.
+
+    Returns:
+    - str: One '0' (free) or '1' (busy) character per slot.
+    """
+    bitmap = bytearray(b'0' * slot_count)
+    for start_time, end_time in busy:
+        first = (start_time - window_start) // slot
+        last = min(slot_count, -((window_start - end_time) // slot))
+        bitmap[first:last] = b'1' * (last - first)
+    return bitmap.decode()
@@ -0,0 +1,36 @@
+from django.db import router, transaction
+from django.utils import timezone
+
+from apps.booking.models import BookingHold
+from apps.booking.services import hold_setting, queue_waitlist_promotion
+
+
+def purge_expired_holds(batch_size=None):
+    """
+    Deletes the expired holds of the current site's database in batches.
+
+    Expired holds already stop blocking their range when expires_at passes;
+    the sweep only removes the rows. Every batch is read from the expires_at
+    index, oldest first, and deleted together with the queueing of the
+    waitlist promotions of the freed ranges in one transaction.
+
+    Parameters:
+    - batch_size (int, optional): Holds deleted per transaction, BOOKING_HOLDS['BATCH_SIZE'] by default.
+
+    Returns:
+    - int: Number of holds deleted.
+    """
+    batch_size = batch_size or hold_setting('BATCH_SIZE', 1000)
+    using = router.db_for_write(BookingHold)
+    total = 0
+    while True:
+        now = timezone.now()
+        with transaction.atomic(using=using):
+            holds = list(BookingHold.objects.filter(expires_at__lte=now).order_by('expires_at')[:batch_size])
+            if not holds:
+                return total
+            # Holds confirmed meanwhile are gone already and simply not deleted
+            BookingHold.objects.filter(pk__in=[hold.pk for hold in holds], expires_at__lte=now).delete()
+            for hold in holds:
+                queue_waitlist_promotion(hold.meeting_room_id, hold.start_time, hold.end_time)
+        total += len(holds)
@@ -0,0 +1,26 @@
+from django.core.management.base import CommandError
+
+from apps.booking.archive import archive_bookings, archive_cutoff
+from apps.core.management.base import SiteCommand
+
+
+class Command(SiteCommand):
+    help = "Move bookings that ended more than N days ago from BookingHistory to the archive table, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, help="Age of the bookings to archive, BOOKING_ARCHIVE_AFTER_DAYS by default.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Bookings moved per transaction.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        if options['older_than_days'] is not None and options['older_than_days'] < 0:
+            raise CommandError("--older-than-days must not be negative.")
+
+        cutoff = archive_cutoff(options['older_than_days'])
+        self.stderr.write(f"Archiving the bookings that ended before {cutoff.isoformat()}.")
+        total = archive_bookings(
+            options['older_than_days'], batch_size=options['batch_size'],
+            on_batch=lambda total: self.stderr.write(f"{total} bookings archived."),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} bookings."))
@@ -0,0 +1,93 @@
+import json
+import platform
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.booking.benchmark import clear_dataset, compare_to_baseline, run_benchmarks, run_concurrency_comparison, seed_dataset
+
+
+class Command(BaseCommand):
+    help = "Seed a synthetic dataset and report the latency percentiles and query counts of the booking endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=500, help="Number of meeting rooms to seed.")
+        parser.add_argument('--users', type=int, default=10000, help="Number of users to seed.")
+        parser.add_argument('--bookings', type=int, default=2000000, help="Number of bookings to seed.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT while seeding.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed of the synthetic dataset.")
+        parser.add_argument('--no-seed', action='store_true', help="Reuse the dataset seeded by a previous run.")
+        parser.add_argument('--clear', action='store_true', help="Delete the benchmark dataset when done.")
+        parser.add_argument('--iterations', type=int, default=100, help="Measured requests per endpoint.")
+        parser.add_argument('--warmup', type=int, default=5, help="Unmeasured requests per endpoint.")
+        parser.add_argument('--compare-async', action='store_true', help="Also compare the concurrency of the WSGI and ASGI my-bookings views.")
+        parser.add_argument('--concurrency', type=int, default=100, help="Concurrent requests of the ASGI path of --compare-async.")
+        parser.add_argument('--threads', type=int, default=4, help="Threads of the WSGI worker of --compare-async.")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument('--baseline', help="JSON report of a previous run to compare against.")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative p95 latency increase over the baseline.")
+        parser.add_argument('--fail-on-regression', action='store_true', help="Exit with an error when a regression is found.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as baseline_file:
+                    baseline = json.load(baseline_file)
+            except (OSError, ValueError) as error:
+                raise CommandError(f"Cannot read the baseline report: {error}")
+
+        dataset = None
+        if not options['no_seed']:
+            clear_dataset()
+            dataset = seed_dataset(
+                options['rooms'], options['users'], options['bookings'],
+                batch_size=options['batch_size'], seed=options['seed'],
+            )
+            self.stderr.write(
+                f"Seeded {dataset['rooms']} rooms, {dataset['users']} users and {dataset['bookings']} bookings."
+            )
+
+        try:
+            scenarios = run_benchmarks(iterations=options['iterations'], warmup=options['warmup'])
+            concurrency = None
+            if options['compare_async']:
+                concurrency = run_concurrency_comparison(
+                    requests=options['iterations'] * 5, concurrency=options['concurrency'], threads=options['threads'],
+                )
+        except ValueError as error:
+            raise CommandError(str(error))
+        finally:
+            if options['clear']:
+                clear_dataset()
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'dataset': dataset,
+            'iterations': options['iterations'],
+            'scenarios': scenarios,
+        }
+        if concurrency is not None:
+            report['concurrency'] = concurrency
+        if baseline is not None:
+            report['regressions'] = compare_to_baseline(scenarios, baseline, options['tolerance'])
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                output_file.write(output + '\n')
+            self.stderr.write(f"Report written to {options['output']}.")
+        else:
+            self.stdout.write(output)
+
+        if report.get('regressions'):
+            message = ', '.join(
+                f"{regression['scenario']} {regression['metric']} {regression['baseline']} -> {regression['current']}"
+                for regression in report['regressions']
+            )
+            if options['fail_on_regression']:
+                raise CommandError(f"Performance regressions: {message}")
+            self.stderr.write(self.style.WARNING(f"Performance regressions: {message}"))
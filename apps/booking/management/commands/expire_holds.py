@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.booking.holds import purge_expired_holds
+from apps.core.routers import site_databases, use_database
+
+
+class Command(BaseCommand):
+    help = "Delete the expired meeting room holds of every site database in batches, optionally polling in a loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Holds deleted per transaction.")
+        parser.add_argument('--loop', action='store_true', help="Keep sweeping instead of exiting once no hold has expired.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds to sleep between sweeps.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        total = 0
+        while True:
+            # Holds are stored on the database of the site of their meeting room
+            for alias in site_databases():
+                with use_database(alias):
+                    total += purge_expired_holds(batch_size=options['batch_size'])
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired holds."))
@@ -0,0 +1,32 @@
+from django.core.management.base import CommandError
+
+from apps.booking.transfer import COLUMNS, FORMATS, ImportRowError, detect_format, export_rows, parse_time, write_records
+from apps.core.management.base import SiteCommand
+
+
+class Command(SiteCommand):
+    help = "Stream meeting rooms or bookings to a CSV or NDJSON file, with flat memory use."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=('rooms', 'bookings'), default='bookings', help="Kind of records to export.")
+        parser.add_argument('--format', choices=FORMATS, help="File format, detected from the --output extension by default.")
+        parser.add_argument('--output', help="File to write, stdout by default.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows fetched from the database at a time.")
+        parser.add_argument('--start-time', help="Only export bookings ending after this time.")
+        parser.add_argument('--end-time', help="Only export bookings starting before this time.")
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or (detect_format(options['output']) if options['output'] else 'csv')
+        try:
+            start_time = parse_time(options['start_time'], '--start-time') if options['start_time'] else None
+            end_time = parse_time(options['end_time'], '--end-time') if options['end_time'] else None
+        except ImportRowError as error:
+            raise CommandError(str(error))
+
+        rows = export_rows(options['kind'], chunk_size=options['chunk_size'], start_time=start_time, end_time=end_time)
+        if not options['output']:
+            write_records(self.stdout, file_format, COLUMNS[options['kind']], rows)
+            return
+        with open(options['output'], 'w', newline='') as stream:
+            written = write_records(stream, file_format, COLUMNS[options['kind']], rows)
+        self.stderr.write(f"Exported {written} {options['kind']} to {options['output']}.")
@@ -0,0 +1,53 @@
+from django.core.management.base import CommandError
+
+from apps.booking.transfer import FORMATS, detect_format, file_fingerprint, import_records, read_checkpoint, read_records
+from apps.core.management.base import SiteCommand
+
+
+class Command(SiteCommand):
+    help = "Stream meeting rooms or bookings from a CSV or NDJSON file into the database in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file to import.")
+        parser.add_argument('--kind', choices=('rooms', 'bookings'), default='bookings', help="Kind of records in the file.")
+        parser.add_argument('--format', choices=FORMATS, help="File format, detected from the extension by default.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Records per transaction and INSERT.")
+        parser.add_argument('--checkpoint', help="Progress file used by --resume, <path>.checkpoint by default.")
+        parser.add_argument('--resume', action='store_true', help="Continue a failed import after its last committed batch.")
+        parser.add_argument('--max-errors', type=int, default=100, help="Skipped records reported individually.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        file_format = options['format'] or detect_format(options['path'])
+        checkpoint_path = options['checkpoint'] or f"{options['path']}.checkpoint"
+        if not options['resume'] and read_checkpoint(checkpoint_path) is not None:
+            raise CommandError(
+                f"{checkpoint_path} records a previous import of this file: pass --resume to continue it, "
+                f"or delete the checkpoint to start over."
+            )
+
+        reported = 0
+
+        def on_batch(totals, errors):
+            nonlocal reported
+            for line_number, message in errors:
+                if reported < options['max_errors']:
+                    self.stderr.write(f"Line {line_number}: {message}")
+                reported += 1
+            self.stderr.write(f"{totals['consumed']} records read, {totals['imported']} imported, {totals['skipped']} skipped.")
+
+        try:
+            source = file_fingerprint(options['path'])
+            with open(options['path'], newline='') as stream:
+                totals = import_records(
+                    options['kind'], read_records(stream, file_format),
+                    batch_size=options['batch_size'], checkpoint_path=checkpoint_path,
+                    resume=options['resume'], on_batch=on_batch, source=source,
+                )
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['imported']} {options['kind']}, skipped {totals['skipped']} invalid or overlapping records."
+        ))
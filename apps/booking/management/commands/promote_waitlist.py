@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.booking.waitlist import expire_waitlist, promote_waitlist
+from apps.core.routers import site_databases, use_database
+
+
+class Command(BaseCommand):
+    help = "Book the slots freed by cancellations for the users on their waitlist, on every site database, optionally polling in a loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Number of freed slots claimed per batch.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for freed slots instead of exiting when there are none.")
+        parser.add_argument('--interval', type=float, default=1, help="Seconds to sleep between polls when no slot was freed.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        totals = {'slots': 0, 'promoted': 0, 'expired': 0}
+        while True:
+            slots = 0
+            # Freed slots are queued on the database of the site of their meeting room
+            for alias in site_databases():
+                with use_database(alias):
+                    totals['expired'] += expire_waitlist()
+                    result = promote_waitlist(batch_size=options['batch_size'])
+                slots += result['slots']
+                totals['slots'] += result['slots']
+                totals['promoted'] += result['promoted']
+
+            if not slots:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Waitlist processed: {totals['slots']} freed slots, {totals['promoted']} users booked, "
+            f"{totals['expired']} entries expired."
+        ))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import CommandError
+
+from apps.booking.analytics import rebuild_rollups
+from apps.core.management.base import SiteCommand
+
+
+class Command(SiteCommand):
+    help = "Recompute the hourly, daily and weekly room usage rollups from the live and archived bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Bookings fetched from the database at a time.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rollup rows per INSERT.")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--chunk-size and --batch-size must be at least 1.")
+        started = time.perf_counter()
+        written = rebuild_rollups(chunk_size=options['chunk_size'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} rollup rows in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,14 @@
+from apps.core.metrics import registry
+
+booking_attempts = registry.counter(
+    'booking_attempts_total',
+    "Booking attempts by operation (book, allocate, recurring, bulk) and outcome.",
+    ('operation', 'outcome'),
+)
+
+booking_lock_wait = registry.histogram(
+    'booking_lock_wait_seconds',
+    "Time spent waiting for the meeting room locks before booking.",
+    ('operation',),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+CREATE_CONSTRAINT = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE booking_bookinghistory
+    ADD CONSTRAINT booking_no_overlap
+    EXCLUDE USING gist (meeting_room_id WITH =, tstzrange(start_time, end_time, '[)') WITH &&);
+"""
+
+DROP_CONSTRAINT = """
+ALTER TABLE booking_bookinghistory DROP CONSTRAINT IF EXISTS booking_no_overlap;
+"""
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    # Exclusion constraints only exist on PostgreSQL, other backends rely on the room lock
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_CONSTRAINT)
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_alter_bookinghistory_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
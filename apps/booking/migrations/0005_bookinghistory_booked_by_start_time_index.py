@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_bookinghistory_no_overlap'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookinghistory',
+            index=models.Index(fields=['booked_by', 'start_time', 'id'], name='booking_boo_booked__2524a7_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_bookinghistory_booked_by_start_time_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meetingroom',
+            index=models.Index(fields=['is_active', 'capacity'], name='booking_mee_is_acti_4acfe5_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 15:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('booking', '0006_meetingroom_is_active_capacity_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField(help_text='Start time of the first occurrence.')),
+                ('end_time', models.DateTimeField(help_text='End time of the first occurrence.')),
+                ('no_of_persons', models.PositiveIntegerField(help_text='Number of persons for every occurrence.')),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], help_text='Recurrence frequency.', max_length=10)),
+                ('interval', models.PositiveIntegerField(default=1, help_text='Number of days/weeks/months between occurrences.')),
+                ('until', models.DateTimeField(blank=True, help_text='No occurrence starts after this time.', null=True)),
+                ('count', models.PositiveIntegerField(blank=True, help_text='Total number of occurrences.', null=True)),
+                ('ends_at', models.DateTimeField(help_text='End time of the last occurrence.')),
+                ('booked_by', models.ForeignKey(help_text='User making the booking.', on_delete=django.db.models.deletion.CASCADE, related_name='recurring_bookings', to=settings.AUTH_USER_MODEL)),
+                ('meeting_room', models.ForeignKey(help_text='Meeting room associated with the series.', on_delete=django.db.models.deletion.CASCADE, related_name='recurring_bookings', to='booking.meetingroom')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecurringBookingException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurrence_start', models.DateTimeField(help_text='Start time of the skipped occurrence.')),
+                ('recurring_booking', models.ForeignKey(help_text='The series the occurrence belongs to.', on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='booking.recurringbooking')),
+            ],
+            options={
+                'unique_together': {('recurring_booking', 'occurrence_start')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recurringbooking',
+            index=models.Index(fields=['meeting_room', 'start_time', 'ends_at'], name='booking_rec_meeting_ebb050_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-18 15:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('booking', '0007_recurringbooking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBookingHistory',
+            fields=[
+                ('id', models.BigIntegerField(help_text='ID of the booking in BookingHistory.', primary_key=True, serialize=False)),
+                ('start_time', models.DateTimeField(help_text='Start time of the booking.')),
+                ('end_time', models.DateTimeField(help_text='End time of the booking.')),
+                ('no_of_persons', models.PositiveIntegerField(help_text='Number of persons for the booking.')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, help_text='When the booking was archived.')),
+                ('booked_by', models.ForeignKey(help_text='User who made the booking.', on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to=settings.AUTH_USER_MODEL)),
+                ('meeting_room', models.ForeignKey(help_text='Meeting room associated with the booking.', on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to='booking.meetingroom')),
+            ],
+            options={
+                'verbose_name_plural': 'Archived Booking Histories',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedbookinghistory',
+            index=models.Index(fields=['booked_by', 'start_time', 'id'], name='booking_arc_booked__7153a8_idx'),
+        ),
+    ]
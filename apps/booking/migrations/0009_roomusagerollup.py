@@ -0,0 +1,42 @@
+# Generated by Django 4.2 on 2026-10-18 15:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_archivedbookinghistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomUsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('week', 'Week')], help_text='Length of the period.', max_length=4)),
+                ('period_start', models.DateTimeField(help_text='Start of the period.')),
+                ('booked_seconds', models.BigIntegerField(default=0, help_text='Seconds of the period during which the room was booked.')),
+                ('person_seconds', models.BigIntegerField(default=0, help_text='Booked seconds multiplied by the number of persons.')),
+                ('bookings', models.PositiveIntegerField(default=0, help_text='Number of bookings starting during the period.')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedbookinghistory',
+            index=models.Index(fields=['meeting_room', 'start_time'], name='booking_arc_meeting_f13ff8_idx'),
+        ),
+        migrations.AddField(
+            model_name='roomusagerollup',
+            name='meeting_room',
+            field=models.ForeignKey(help_text='Meeting room the usage belongs to.', on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='booking.meetingroom'),
+        ),
+        migrations.AddIndex(
+            model_name='roomusagerollup',
+            index=models.Index(fields=['period', 'period_start'], name='booking_roo_period_43a99e_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='roomusagerollup',
+            unique_together={('meeting_room', 'period', 'period_start')},
+        ),
+    ]
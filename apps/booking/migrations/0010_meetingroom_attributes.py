@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 15:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_roomusagerollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Equipment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(help_text='Short identifier used by the search filters.', unique=True)),
+                ('name', models.CharField(help_text='Display name of the equipment.', max_length=100)),
+            ],
+            options={
+                'verbose_name_plural': 'Equipment',
+            },
+        ),
+        migrations.AddField(
+            model_name='meetingroom',
+            name='building',
+            field=models.CharField(blank=True, default='', help_text='Building the meeting room is in.', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='meetingroom',
+            name='floor',
+            field=models.SmallIntegerField(blank=True, help_text='Floor the meeting room is on.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='meetingroom',
+            index=models.Index(fields=['is_active', 'building', 'floor', 'capacity'], name='booking_mee_is_acti_dac61a_idx'),
+        ),
+        migrations.AddField(
+            model_name='meetingroom',
+            name='equipment',
+            field=models.ManyToManyField(blank=True, help_text='Equipment available in the meeting room.', related_name='meeting_rooms', to='booking.equipment'),
+        ),
+    ]
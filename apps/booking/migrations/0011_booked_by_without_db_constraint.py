@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 15:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('booking', '0010_meetingroom_attributes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedbookinghistory',
+            name='booked_by',
+            field=models.ForeignKey(db_constraint=False, help_text='User who made the booking.', on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='bookinghistory',
+            name='booked_by',
+            field=models.ForeignKey(db_constraint=False, help_text='User making the booking.', on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='recurringbooking',
+            name='booked_by',
+            field=models.ForeignKey(db_constraint=False, help_text='User making the booking.', on_delete=django.db.models.deletion.CASCADE, related_name='recurring_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
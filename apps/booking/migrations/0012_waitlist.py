@@ -0,0 +1,55 @@
+# Generated by Django 4.2 on 2026-10-18 15:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('booking', '0011_booked_by_without_db_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistPromotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField(help_text='Start time of the freed slot.')),
+                ('end_time', models.DateTimeField(help_text='End time of the freed slot.')),
+                ('available_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, help_text='When a worker may claim the row.')),
+                ('meeting_room', models.ForeignKey(help_text='Meeting room freed.', on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_promotions', to='booking.meetingroom')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField(help_text='Start time of the wanted booking.')),
+                ('end_time', models.DateTimeField(help_text='End time of the wanted booking.')),
+                ('no_of_persons', models.PositiveIntegerField(help_text='Number of persons for the wanted booking.')),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('promoted', 'Promoted'), ('expired', 'Expired')], default='waiting', help_text='Waiting, promoted or expired.', max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the user joined the waitlist.')),
+                ('meeting_room', models.ForeignKey(help_text='Meeting room waited for.', on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='booking.meetingroom')),
+                ('user', models.ForeignKey(db_constraint=False, help_text='User waiting.', on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Waitlist Entries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['meeting_room', 'status', 'start_time'], name='booking_wai_meeting_b5f117_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['status', 'start_time'], name='booking_wai_status_3bc28c_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='waitlistentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'waiting')), fields=('user', 'meeting_room', 'start_time', 'end_time'), name='waitlist_one_waiting_entry'),
+        ),
+    ]
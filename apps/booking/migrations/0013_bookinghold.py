@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-18 16:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('booking', '0012_waitlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.DateTimeField(help_text='Start time of the held range.')),
+                ('end_time', models.DateTimeField(help_text='End time of the held range.')),
+                ('no_of_persons', models.PositiveIntegerField(help_text='Number of persons for the booking.')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the hold was taken.')),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='When the hold stops blocking the range.')),
+                ('held_by', models.ForeignKey(db_constraint=False, help_text='User holding the room.', on_delete=django.db.models.deletion.CASCADE, related_name='booking_holds', to=settings.AUTH_USER_MODEL)),
+                ('meeting_room', models.ForeignKey(help_text='Meeting room held.', on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='booking.meetingroom')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='bookinghold',
+            index=models.Index(fields=['meeting_room', 'start_time', 'end_time'], name='booking_boo_meeting_96f2dd_idx'),
+        ),
+    ]
@@ -1,7 +1,31 @@
 from django.db import models
+from django.utils import timezone
 
+from apps.booking import recurrence
 from apps.member.models import CustomUser
 
+
+class Equipment(models.Model):
+    """
+    Model representing a piece of equipment a meeting room can have, e.g. a projector or video conferencing.
+
+    Attributes:
+        code (str): Short identifier used by the search filters, e.g. "projector".
+        name (str): Display name of the equipment.
+    """
+    code = models.SlugField(max_length=50, unique=True, help_text="Short identifier used by the search filters.")
+    name = models.CharField(max_length=100, help_text="Display name of the equipment.")
+
+    def __str__(self):
+        """
+        Returns a string representation of the equipment.
+        """
+        return self.name
+
+    class Meta:
+        verbose_name_plural = "Equipment"
+
+
 class MeetingRoom(models.Model):
     """
     Model representing a meeting room.
@@ -10,6 +34,9 @@ class MeetingRoom(models.Model):
         room_name (str): Name of the meeting room.
         capacity (int): Capacity of the meeting room.
         is_active (bool): Indicates whether the meeting room is active or not.
+        building (str): Building the meeting room is in.
+        floor (int): Floor the meeting room is on.
+        equipment (Equipment): Equipment available in the meeting room.
 
     Methods:
         __str__(): Returns a string representation of the meeting room.
@@ -19,13 +46,24 @@ class MeetingRoom(models.Model):
     room_name = models.CharField(max_length=255, help_text="Name of the meeting room.")
     capacity = models.PositiveIntegerField(help_text="Capacity of the meeting room.")
     is_active = models.BooleanField(default=True, help_text="Indicates whether the meeting room is active or not.")
+    building = models.CharField(max_length=100, blank=True, default='', help_text="Building the meeting room is in.")
+    floor = models.SmallIntegerField(null=True, blank=True, help_text="Floor the meeting room is on.")
+    equipment = models.ManyToManyField(Equipment, blank=True, related_name="meeting_rooms", help_text="Equipment available in the meeting room.")
 
     def __str__(self):
         """
         Returns a string representation of the meeting room.
         """
         return self.room_name
-    
+
+    class Meta:
+        # Smallest fitting room lookups scan active rooms by ascending capacity,
+        # room searches within a building and floor too
+        indexes = [
+            models.Index(fields=['is_active', 'capacity']),
+            models.Index(fields=['is_active', 'building', 'floor', 'capacity']),
+        ]
+
 
 class BookingHistory(models.Model):
     """
@@ -47,10 +85,12 @@ class BookingHistory(models.Model):
     start_time = models.DateTimeField(help_text="Start time of the booking.")
     end_time = models.DateTimeField(help_text="End time of the booking.")
     no_of_persons = models.PositiveIntegerField(help_text="Number of persons for the booking.")
+    # Users stay on the default database while bookings may live on a site database, so no database constraint
     booked_by = models.ForeignKey(
             CustomUser,
             on_delete=models.CASCADE,
             related_name="bookings",
+            db_constraint=False,
             help_text="User making the booking."
         )
     
@@ -64,5 +104,301 @@ class BookingHistory(models.Model):
         # Database index for optimized query performance
         indexes = [
             models.Index(fields=['meeting_room', 'start_time', 'end_time']),
+            # Keyset pagination of a user's bookings on (start_time, id)
+            models.Index(fields=['booked_by', 'start_time', 'id']),
         ]
         verbose_name_plural = "Booking Histories"
+
+
+class ArchivedBookingHistory(models.Model):
+    """
+    Model representing a past booking moved out of BookingHistory by the archive_bookings command.
+
+    Archived bookings keep the ID they had in BookingHistory, so (start_time,
+    id) keyset cursors stay unique across both tables. They are never read by
+    availability checks, which only look at the live table.
+
+    Attributes:
+        id (int): ID of the booking in BookingHistory.
+        meeting_room (MeetingRoom): Meeting room associated with the booking.
+        start_time (datetime): Start time of the booking.
+        end_time (datetime): End time of the booking.
+        no_of_persons (int): Number of persons for the booking.
+        booked_by (CustomUser): User who made the booking.
+        archived_at (datetime): When the booking was archived.
+    """
+
+    id = models.BigIntegerField(primary_key=True, help_text="ID of the booking in BookingHistory.")
+    meeting_room = models.ForeignKey(MeetingRoom, on_delete=models.CASCADE, related_name="archived_bookings", help_text="Meeting room associated with the booking.")
+    start_time = models.DateTimeField(help_text="Start time of the booking.")
+    end_time = models.DateTimeField(help_text="End time of the booking.")
+    no_of_persons = models.PositiveIntegerField(help_text="Number of persons for the booking.")
+    booked_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="archived_bookings", db_constraint=False, help_text="User who made the booking.")
+    archived_at = models.DateTimeField(auto_now_add=True, help_text="When the booking was archived.")
+
+    def __str__(self):
+        """
+        Returns a string representation of the archived booking.
+        """
+        return f"{self.booked_by} booked {self.meeting_room.room_name} from {self.start_time} to {self.end_time} (archived)"
+
+    class Meta:
+        # Keyset pagination of a user's past bookings on (start_time, id), and per room reads of the rollup rebuild
+        indexes = [
+            models.Index(fields=['booked_by', 'start_time', 'id']),
+            models.Index(fields=['meeting_room', 'start_time']),
+        ]
+        verbose_name_plural = "Archived Booking Histories"
+
+
+class RoomUsageRollup(models.Model):
+    """
+    Model representing the usage of a meeting room during one hour, day or week.
+
+    Rows are kept up to date by the booking services when bookings are
+    created or cancelled and recomputed by the rebuild_usage_rollups command,
+    so usage reports never scan BookingHistory.
+
+    Attributes:
+        meeting_room (MeetingRoom): Meeting room the usage belongs to.
+        period (str): hour, day or week.
+        period_start (datetime): Start of the period.
+        booked_seconds (int): Seconds of the period during which the room was booked.
+        person_seconds (int): Booked seconds multiplied by the number of persons of each booking.
+        bookings (int): Number of bookings starting during the period.
+    """
+    PERIOD_CHOICES = (
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+        ('week', 'Week'),
+    )
+
+    meeting_room = models.ForeignKey(MeetingRoom, on_delete=models.CASCADE, related_name="usage_rollups", help_text="Meeting room the usage belongs to.")
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES, help_text="Length of the period.")
+    period_start = models.DateTimeField(help_text="Start of the period.")
+    booked_seconds = models.BigIntegerField(default=0, help_text="Seconds of the period during which the room was booked.")
+    person_seconds = models.BigIntegerField(default=0, help_text="Booked seconds multiplied by the number of persons.")
+    bookings = models.PositiveIntegerField(default=0, help_text="Number of bookings starting during the period.")
+
+    def __str__(self):
+        """
+        Returns a string representation of the rollup.
+        """
+        return f"{self.meeting_room_id} {self.period} {self.period_start}"
+
+    class Meta:
+        # One row per room and period, and the range scans of the reports over every room
+        unique_together = ('meeting_room', 'period', 'period_start')
+        indexes = [
+            models.Index(fields=['period', 'period_start']),
+        ]
+
+
+class RecurringBooking(models.Model):
+    """
+    Model representing a recurring booking series of a meeting room.
+
+    A series is stored as a single row holding its recurrence rule; the
+    individual occurrences are never stored and are expanded lazily for the
+    window being queried.
+
+    Attributes:
+        meeting_room (MeetingRoom): Meeting room associated with the series.
+        booked_by (CustomUser): User making the booking.
+        start_time (datetime): Start time of the first occurrence.
+        end_time (datetime): End time of the first occurrence.
+        no_of_persons (int): Number of persons for every occurrence.
+        frequency (str): daily, weekly or monthly.
+        interval (int): Number of days/weeks/months between occurrences.
+        until (datetime): No occurrence starts after this time.
+        count (int): Total number of occurrences.
+        ends_at (datetime): End time of the last occurrence, derived from the rule.
+
+    Methods:
+        __str__(): Returns a string representation of the series.
+        occurrences(): Lazily yields the occurrences overlapping a time window.
+    """
+    FREQUENCY_CHOICES = (
+        (recurrence.DAILY, 'Daily'),
+        (recurrence.WEEKLY, 'Weekly'),
+        (recurrence.MONTHLY, 'Monthly'),
+    )
+
+    meeting_room = models.ForeignKey(MeetingRoom, on_delete=models.CASCADE, related_name="recurring_bookings", help_text="Meeting room associated with the series.")
+    booked_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="recurring_bookings", db_constraint=False, help_text="User making the booking.")
+    start_time = models.DateTimeField(help_text="Start time of the first occurrence.")
+    end_time = models.DateTimeField(help_text="End time of the first occurrence.")
+    no_of_persons = models.PositiveIntegerField(help_text="Number of persons for every occurrence.")
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, help_text="Recurrence frequency.")
+    interval = models.PositiveIntegerField(default=1, help_text="Number of days/weeks/months between occurrences.")
+    until = models.DateTimeField(null=True, blank=True, help_text="No occurrence starts after this time.")
+    count = models.PositiveIntegerField(null=True, blank=True, help_text="Total number of occurrences.")
+    ends_at = models.DateTimeField(help_text="End time of the last occurrence.")
+
+    def __str__(self):
+        """
+        Returns a string representation of the series.
+        """
+        return f"{self.booked_by} booked {self.meeting_room.room_name} {self.frequency} from {self.start_time}"
+
+    def occurrences(self, window_start=None, window_end=None, exceptions=None):
+        """
+        Lazily yields the (start_time, end_time) occurrences overlapping [window_start, window_end).
+        """
+        if exceptions is None:
+            exceptions = {exception.occurrence_start for exception in self.exceptions.all()} if self.pk else set()
+        return recurrence.expand_occurrences(
+            self.start_time, self.end_time, self.frequency, self.interval,
+            until=self.until, count=self.count, exceptions=exceptions,
+            window_start=window_start, window_end=window_end,
+        )
+
+    class Meta:
+        # Database index for the lookup of the series overlapping a time range
+        indexes = [
+            models.Index(fields=['meeting_room', 'start_time', 'ends_at']),
+        ]
+
+
+class RecurringBookingException(models.Model):
+    """
+    Model representing an occurrence skipped from a recurring booking series.
+
+    Attributes:
+        recurring_booking (RecurringBooking): The series the occurrence belongs to.
+        occurrence_start (datetime): Start time of the skipped occurrence.
+    """
+    recurring_booking = models.ForeignKey(RecurringBooking, on_delete=models.CASCADE, related_name="exceptions", help_text="The series the occurrence belongs to.")
+    occurrence_start = models.DateTimeField(help_text="Start time of the skipped occurrence.")
+
+    def __str__(self):
+        """
+        Returns a string representation of the skipped occurrence.
+        """
+        return f"{self.recurring_booking} except {self.occurrence_start}"
+
+    class Meta:
+        unique_together = ('recurring_booking', 'occurrence_start')
+
+
+class BookingHold(models.Model):
+    """
+    Model representing a short-lived tentative reservation of a meeting room.
+
+    A hold blocks its time range in every availability check until it is
+    confirmed into a booking, released or expires. Expired holds stop
+    blocking as soon as expires_at passes; the expire_holds sweeper deletes
+    them afterwards in batches, in expires_at order.
+
+    Attributes:
+        meeting_room (MeetingRoom): Meeting room held.
+        held_by (CustomUser): User holding the room.
+        start_time (datetime): Start time of the held range.
+        end_time (datetime): End time of the held range.
+        no_of_persons (int): Number of persons for the booking.
+        created_at (datetime): When the hold was taken.
+        expires_at (datetime): When the hold stops blocking the range.
+    """
+    meeting_room = models.ForeignKey(MeetingRoom, on_delete=models.CASCADE, related_name="holds", help_text="Meeting room held.")
+    held_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="booking_holds", db_constraint=False, help_text="User holding the room.")
+    start_time = models.DateTimeField(help_text="Start time of the held range.")
+    end_time = models.DateTimeField(help_text="End time of the held range.")
+    no_of_persons = models.PositiveIntegerField(help_text="Number of persons for the booking.")
+    created_at = models.DateTimeField(default=timezone.now, help_text="When the hold was taken.")
+    expires_at = models.DateTimeField(db_index=True, help_text="When the hold stops blocking the range.")
+
+    def __str__(self):
+        """
+        Returns a string representation of the hold.
+        """
+        return f"{self.held_by} holds {self.meeting_room.room_name} from {self.start_time} to {self.end_time}"
+
+    class Meta:
+        # Overlap lookups of the availability checks, like the bookings
+        indexes = [
+            models.Index(fields=['meeting_room', 'start_time', 'end_time']),
+        ]
+
+
+class WaitlistEntry(models.Model):
+    """
+    Model representing a user waiting for a meeting room to be freed during a time range.
+
+    When a booking overlapping the range is cancelled, the promote_waitlist
+    worker books the room for the first waiting user it fits, in order of
+    joining, and the entry is marked as promoted. Entries whose start time
+    passes while waiting are marked as expired.
+
+    Attributes:
+        meeting_room (MeetingRoom): Meeting room waited for.
+        user (CustomUser): User waiting.
+        start_time (datetime): Start time of the wanted booking.
+        end_time (datetime): End time of the wanted booking.
+        no_of_persons (int): Number of persons for the wanted booking.
+        status (str): waiting, promoted or expired.
+        created_at (datetime): When the user joined the waitlist.
+    """
+    STATUS_WAITING = 'waiting'
+    STATUS_PROMOTED = 'promoted'
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = (
+        (STATUS_WAITING, 'Waiting'),
+        (STATUS_PROMOTED, 'Promoted'),
+        (STATUS_EXPIRED, 'Expired'),
+    )
+
+    meeting_room = models.ForeignKey(MeetingRoom, on_delete=models.CASCADE, related_name="waitlist_entries", help_text="Meeting room waited for.")
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="waitlist_entries", db_constraint=False, help_text="User waiting.")
+    start_time = models.DateTimeField(help_text="Start time of the wanted booking.")
+    end_time = models.DateTimeField(help_text="End time of the wanted booking.")
+    no_of_persons = models.PositiveIntegerField(help_text="Number of persons for the wanted booking.")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_WAITING, help_text="Waiting, promoted or expired.")
+    created_at = models.DateTimeField(default=timezone.now, help_text="When the user joined the waitlist.")
+
+    def __str__(self):
+        """
+        Returns a string representation of the waitlist entry.
+        """
+        return f"{self.user} waiting for {self.meeting_room.room_name} from {self.start_time} to {self.end_time}"
+
+    class Meta:
+        # Promotion looks up the waiting entries of a room overlapping a freed slot,
+        # expiry the waiting entries that started
+        indexes = [
+            models.Index(fields=['meeting_room', 'status', 'start_time']),
+            models.Index(fields=['status', 'start_time']),
+        ]
+        # A user queues once per room and time range
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'meeting_room', 'start_time', 'end_time'],
+                condition=models.Q(status='waiting'),
+                name='waitlist_one_waiting_entry',
+            ),
+        ]
+        verbose_name_plural = "Waitlist Entries"
+
+
+class WaitlistPromotion(models.Model):
+    """
+    Model representing a slot freed by a cancellation, queued for the promote_waitlist worker.
+
+    Rows are inserted in the transaction of the cancellation, only when users
+    wait for the slot, and deleted once processed.
+
+    Attributes:
+        meeting_room (MeetingRoom): Meeting room freed.
+        start_time (datetime): Start time of the freed slot.
+        end_time (datetime): End time of the freed slot.
+        available_at (datetime): When a worker may claim the row, pushed back by the lease of the worker processing it.
+    """
+    meeting_room = models.ForeignKey(MeetingRoom, on_delete=models.CASCADE, related_name="waitlist_promotions", help_text="Meeting room freed.")
+    start_time = models.DateTimeField(help_text="Start time of the freed slot.")
+    end_time = models.DateTimeField(help_text="End time of the freed slot.")
+    available_at = models.DateTimeField(default=timezone.now, db_index=True, help_text="When a worker may claim the row.")
+
+    def __str__(self):
+        """
+        Returns a string representation of the freed slot.
+        """
+        return f"{self.meeting_room_id} freed from {self.start_time} to {self.end_time}"
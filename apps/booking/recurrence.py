@@ -0,0 +1,141 @@
+import calendar
+from datetime import MAXYEAR, timedelta
+
+from django.utils import timezone
+
+DAILY = 'daily'
+WEEKLY = 'weekly'
+MONTHLY = 'monthly'
+
+# Consecutive months without a valid day (e.g. the 31st) after which a monthly rule stops
+MAX_SKIPPED_MONTHS = 48
+
+# Largest number of days/weeks/months between occurrences accepted for a rule
+MAX_INTERVAL = 999
+
+
+def add_months(value, months):
+    """
+    Adds months to a naive datetime, returning None when the day does not exist in the target month.
+
+    Raises:
+    - OverflowError: If the result is after datetime.max.
+    """
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    if year > MAXYEAR:
+        raise OverflowError("date value out of range")
+    if value.day > calendar.monthrange(year, month)[1]:
+        return None
+    return value.replace(year=year, month=month)
+
+
+def occurrence_starts(first_start, frequency, interval, from_time=None):
+    """
+    Lazily yields the (position, start_time) pairs of an unbounded recurrence rule.
+
+    The arithmetic runs on local wall clock time, so a weekly 9 AM meeting stays
+    at 9 AM across DST changes. Like RRULE, monthly occurrences on days that do
+    not exist in a month are skipped and do not count. A rule running past
+    datetime.max stops there.
+
+    Parameters:
+    - first_start (datetime): Start of the first occurrence.
+    - frequency (str): daily, weekly or monthly.
+    - interval (int): Number of days/weeks/months between occurrences.
+    - from_time (datetime, optional): Daily and weekly rules jump straight to
+      occurrences starting shortly before this time instead of walking from the first one.
+    """
+    local_first = timezone.localtime(first_start)
+    tzinfo = local_first.tzinfo
+    naive_first = local_first.replace(tzinfo=None)
+
+    if frequency == MONTHLY:
+        position, months, skipped = 0, 0, 0
+        while skipped < MAX_SKIPPED_MONTHS:
+            try:
+                naive_start = add_months(naive_first, months)
+            except OverflowError:
+                return
+            months += interval
+            if naive_start is None:
+                skipped += 1
+                continue
+            skipped = 0
+            yield position, timezone.make_aware(naive_start, tzinfo)
+            position += 1
+        return
+
+    step = timedelta(days=interval * (7 if frequency == WEEKLY else 1))
+    position = 0
+    if from_time is not None and from_time > first_start:
+        # One step of slack absorbs DST offsets between UTC and wall clock time
+        position = max(0, (from_time - first_start) // step - 1)
+    while True:
+        try:
+            naive_start = naive_first + position * step
+        except OverflowError:
+            return
+        yield position, timezone.make_aware(naive_start, tzinfo)
+        position += 1
+
+
+def expand_occurrences(first_start, first_end, frequency, interval, until=None, count=None,
+                       exceptions=(), window_start=None, window_end=None):
+    """
+    Lazily yields the (start_time, end_time) occurrences of a recurrence rule overlapping a window.
+
+    Only the occurrences around the window are generated, so the cost depends
+    on the size of the window and not on the length of the series.
+
+    Parameters:
+    - first_start (datetime): Start of the first occurrence.
+    - first_end (datetime): End of the first occurrence.
+    - frequency (str): daily, weekly or monthly.
+    - interval (int): Number of days/weeks/months between occurrences.
+    - until (datetime, optional): No occurrence starts after this time.
+    - count (int, optional): Total number of occurrences of the series.
+    - exceptions (set, optional): Start times of the skipped occurrences.
+    - window_start (datetime, optional): Only occurrences ending after this time.
+    - window_end (datetime, optional): Only occurrences starting before this time.
+    """
+    duration = first_end - first_start
+    from_time = window_start - duration if window_start is not None else None
+    for position, start_time in occurrence_starts(first_start, frequency, interval, from_time):
+        if count is not None and position >= count:
+            return
+        if until is not None and start_time > until:
+            return
+        if window_end is not None and start_time >= window_end:
+            return
+        try:
+            end_time = start_time + duration
+        except OverflowError:
+            return
+        if window_start is not None and end_time <= window_start:
+            continue
+        if start_time in exceptions:
+            continue
+        yield start_time, end_time
+
+
+def series_busy_intervals(room_ids, start_time, end_time):
+    """
+    Expands the recurring bookings of several meeting rooms (all rooms when
+    room_ids is None) over a time range.
+
+    Returns:
+    - dict: Meeting room ID to the (start_time, end_time) occurrences overlapping the range.
+    """
+    from apps.booking.models import RecurringBooking
+
+    busy = {}
+    series = RecurringBooking.objects.filter(start_time__lt=end_time, ends_at__gt=start_time)
+    if room_ids is not None:
+        series = series.filter(meeting_room_id__in=room_ids)
+    series = series.prefetch_related('exceptions')
+    for recurring_booking in series:
+        occurrences = list(recurring_booking.occurrences(start_time, end_time))
+        if occurrences:
+            busy.setdefault(recurring_booking.meeting_room_id, []).extend(occurrences)
+    return busy
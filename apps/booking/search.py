@@ -0,0 +1,75 @@
+from django.db.models import Exists, F, OuterRef, Value
+from django.utils import timezone
+
+from apps.booking.models import BookingHistory, BookingHold, MeetingRoom
+from apps.booking.recurrence import series_busy_intervals
+
+SEARCH_FIELDS = ('id', 'room_name', 'capacity', 'building', 'floor')
+
+
+def search_rooms(min_capacity=1, max_capacity=None, building=None, floors=None, equipment=(),
+                 start_time=None, end_time=None, limit=50):
+    """
+    Searches the active meeting rooms matching attribute filters and, optionally, free during a time range.
+
+    Every filter is part of one query: building, floor and capacity are
+    answered by the (is_active, building, floor, capacity) index, each
+    required piece of equipment by an EXISTS on the unique (room, equipment)
+    index of the equipment table, and availability by NOT EXISTS on the
+    (meeting_room, start_time, end_time) indexes of the bookings and of the
+    holds. Rooms busy with a recurring booking occurrence are expanded
+    beforehand and excluded by ID. Results are ranked by best fit: fewest
+    spare seats first.
+
+    Parameters:
+    - min_capacity (int): Number of persons the room must seat.
+    - max_capacity (int, optional): Largest capacity to return.
+    - building (str, optional): Building the room must be in.
+    - floors (list, optional): Floors the room may be on.
+    - equipment (iterable): Equipment codes the room must all have.
+    - start_time (datetime, optional): Start of the range the room must be free during.
+    - end_time (datetime, optional): End of the range.
+    - limit (int): Maximum number of rooms returned.
+
+    Returns:
+    - list: Dicts with the attributes of the rooms, their equipment codes and spare_seats.
+    """
+    rooms = MeetingRoom.objects.filter(is_active=True, capacity__gte=min_capacity)
+    if max_capacity is not None:
+        rooms = rooms.filter(capacity__lte=max_capacity)
+    if building:
+        rooms = rooms.filter(building=building)
+    if floors:
+        rooms = rooms.filter(floor__in=floors)
+
+    room_equipment = MeetingRoom.equipment.through.objects
+    for code in sorted(set(equipment)):
+        rooms = rooms.filter(Exists(room_equipment.filter(meetingroom_id=OuterRef('pk'), equipment__code=code)))
+
+    if start_time is not None and end_time is not None:
+        rooms = rooms.filter(~Exists(BookingHistory.objects.filter(
+            meeting_room_id=OuterRef('pk'), start_time__lt=end_time, end_time__gt=start_time,
+        )), ~Exists(BookingHold.objects.filter(
+            meeting_room_id=OuterRef('pk'), start_time__lt=end_time, end_time__gt=start_time, expires_at__gt=timezone.now(),
+        )))
+        series_busy_room_ids = list(series_busy_intervals(None, start_time, end_time))
+        if series_busy_room_ids:
+            rooms = rooms.exclude(id__in=series_busy_room_ids)
+
+    results = list(
+        rooms.annotate(spare_seats=F('capacity') - Value(min_capacity))
+        .order_by('capacity', 'id')
+        .values(*SEARCH_FIELDS, 'spare_seats')[:limit]
+    )
+
+    codes_by_room = {room['id']: [] for room in results}
+    if codes_by_room:
+        for room_id, code in (
+            room_equipment.filter(meetingroom_id__in=codes_by_room)
+            .order_by('meetingroom_id', 'equipment__code')
+            .values_list('meetingroom_id', 'equipment__code')
+        ):
+            codes_by_room[room_id].append(code)
+    for room in results:
+        room['equipment'] = codes_by_room[room['id']]
+    return results
@@ -0,0 +1,695 @@
+import threading
+import time
+from datetime import timedelta
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from apps.booking.analytics import record_usage
+from apps.booking.availability import availability_index
+from apps.booking.emails import queue_bulk_confirmation_email, queue_cancellation_email, queue_confirmation_email, queue_recurring_confirmation_email
+from apps.booking.metrics import booking_attempts, booking_lock_wait
+from apps.booking.models import BookingHistory, BookingHold, MeetingRoom, RecurringBooking, RecurringBookingException, WaitlistEntry, WaitlistPromotion
+from apps.booking.recurrence import series_busy_intervals
+from apps.booking.signals import bookings_bulk_created
+from apps.core.routers import booking_database
+
+
+class BookingError(Exception):
+    """
+    Base class of the errors raised while booking a meeting room.
+    """
+    message = "Meeting room could not be booked."
+    # Outcome label of the booking_attempts_total metric
+    outcome = 'error'
+
+    def __init__(self, message=None):
+        super().__init__(message or self.message)
+        self.message = message or self.message
+
+
+class MeetingRoomNotFound(BookingError):
+    message = "Meeting room not found."
+    outcome = 'not_found'
+
+
+class BookingConflict(BookingError):
+    message = "Meeting room is not available for the specified time range."
+    outcome = 'conflict'
+
+
+class InsufficientCapacity(BookingError):
+    message = "Meeting room does not have sufficient capacity for the specified number of persons."
+    outcome = 'insufficient_capacity'
+
+
+class RecurringBookingConflict(BookingConflict):
+    message = "Some occurrences of the recurring booking overlap existing bookings."
+
+    def __init__(self, conflicting_starts):
+        super().__init__()
+        self.conflicting_starts = conflicting_starts
+
+
+class RecurrenceTooLong(BookingError):
+    message = "The recurring booking has too many occurrences."
+    outcome = 'too_long'
+
+
+class NoMeetingRoomAvailable(BookingError):
+    message = "No meeting room with sufficient capacity is available for the specified time range."
+    outcome = 'no_room_available'
+
+
+class AlreadyWaitlisted(BookingError):
+    message = "You are already on the waitlist of this meeting room for the specified time range."
+    outcome = 'already_waitlisted'
+
+
+class HoldNotFound(BookingError):
+    message = "Meeting room hold not found."
+    outcome = 'not_found'
+
+
+class HoldExpired(BookingError):
+    message = "The meeting room hold has expired."
+    outcome = 'expired'
+
+
+def hold_setting(name, default):
+    return getattr(settings, 'BOOKING_HOLDS', {}).get(name, default)
+
+
+def record_booking_outcome(operation):
+    """
+    Decorator counting the calls of a booking service in booking_attempts_total, by outcome.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            try:
+                result = function(*args, **kwargs)
+            except BookingError as error:
+                booking_attempts.inc(operation=operation, outcome=error.outcome)
+                raise
+            booking_attempts.inc(operation=operation, outcome='success')
+            return result
+        return wrapper
+    return decorator
+
+
+_room_locks = defaultdict(threading.Lock)
+_room_locks_guard = threading.Lock()
+
+
+@contextmanager
+def room_lock(*room_ids):
+    """
+    Serialises booking creation for the given meeting rooms.
+
+    On databases supporting SELECT ... FOR UPDATE the row lock taken on the
+    MeetingRoom inside the transaction does the job across processes, so no
+    in-process lock is needed. Other backends (SQLite) fall back to a
+    per-room lock, so contention is still per room and never global. Locks
+    are always acquired in room id order to avoid deadlocks.
+    """
+    if connections[booking_database()].features.has_select_for_update:
+        yield
+        return
+    with _room_locks_guard:
+        locks = [_room_locks[room_id] for room_id in sorted(set(room_ids))]
+    with ExitStack() as stack:
+        for lock in locks:
+            stack.enter_context(lock)
+        yield
+
+
+def has_overlapping_booking(meeting_room_id, start_time, end_time):
+    """
+    Checks whether a booking, a hold that has not expired or a recurring
+    booking occurrence of the meeting room overlaps [start_time, end_time).
+    """
+    bookings = BookingHistory.objects.filter(
+        meeting_room_id=meeting_room_id,
+        start_time__lt=end_time,
+        end_time__gt=start_time
+    ).values('id')
+    holds = BookingHold.objects.filter(
+        meeting_room_id=meeting_room_id,
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+        expires_at__gt=timezone.now(),
+    ).values('id')
+    # Bookings and holds are checked in one round trip
+    if bookings.union(holds, all=True).exists():
+        return True
+    return bool(series_busy_intervals([meeting_room_id], start_time, end_time))
+
+
+def busy_intervals_for_rooms(room_ids, start_time, end_time):
+    """
+    Loads the bookings and the holds that have not expired of several meeting
+    rooms overlapping a time range in one query, together with the
+    occurrences of their recurring bookings.
+
+    Returns:
+    - dict: Meeting room ID to the list of (start_time, end_time) intervals, sorted by start time.
+    """
+    busy = {room_id: [] for room_id in room_ids}
+    bookings = BookingHistory.objects.filter(
+        meeting_room_id__in=room_ids,
+        start_time__lt=end_time,
+        end_time__gt=start_time
+    ).values_list('meeting_room_id', 'start_time', 'end_time')
+    holds = BookingHold.objects.filter(
+        meeting_room_id__in=room_ids,
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+        expires_at__gt=timezone.now(),
+    ).values_list('meeting_room_id', 'start_time', 'end_time')
+    for room_id, busy_start, busy_end in bookings.union(holds, all=True).order_by('meeting_room_id', 'start_time'):
+        busy[room_id].append((busy_start, busy_end))
+
+    for room_id, occurrences in series_busy_intervals(room_ids, start_time, end_time).items():
+        busy[room_id] = sorted(busy[room_id] + occurrences)
+    return busy
+
+
+def sweep_conflicts(busy, requests):
+    """
+    Finds the requested intervals of one meeting room that cannot be booked.
+
+    Both lists are swept once in start time order. A request conflicts when an
+    interval starting at or before it (busy or already accepted) ends after its
+    start, or when the next busy interval starts before its end. Requests are
+    accepted first come first served by start time, then by position.
+
+    Parameters:
+    - busy (list): Sorted (start_time, end_time) intervals that already exist.
+    - requests (list): (start_time, end_time, key) intervals to be booked.
+
+    Returns:
+    - set: Keys of the conflicting requests.
+    """
+    conflicts = set()
+    busy_index = 0
+    busy_until = None
+    for start_time, end_time, key in sorted(requests, key=lambda request: (request[0], request[2])):
+        while busy_index < len(busy) and busy[busy_index][0] <= start_time:
+            busy_end = busy[busy_index][1]
+            busy_until = busy_end if busy_until is None else max(busy_until, busy_end)
+            busy_index += 1
+        if (busy_until is not None and busy_until > start_time) or (busy_index < len(busy) and busy[busy_index][0] < end_time):
+            conflicts.add(key)
+            continue
+        busy_until = end_time if busy_until is None else max(busy_until, end_time)
+    return conflicts
+
+
+def create_bookings_bulk(user, items):
+    """
+    Books many meeting room slots in a single transaction.
+
+    Rooms are locked and loaded with one query, the existing bookings of the
+    whole batch window with another, conflicts against the database and
+    within the batch are resolved by a sort and sweep per room, and the
+    accepted bookings are inserted with bulk_create. The number of queries
+    does not depend on the number of items.
+
+    Parameters:
+    - user (CustomUser): The user making the bookings.
+    - items (list): Dicts with index, room_id, start_time, end_time and no_of_persons.
+
+    Returns:
+    - dict: Item index to the created BookingHistory or to the BookingError explaining the rejection.
+    """
+    results = {}
+    if not items:
+        return results
+
+    room_ids = {item['room_id'] for item in items}
+    lock_requested = time.perf_counter()
+    with room_lock(*room_ids), transaction.atomic(using=booking_database()):
+        meeting_rooms = MeetingRoom.objects.select_for_update().filter(pk__in=room_ids, is_active=True).in_bulk()
+        booking_lock_wait.observe(time.perf_counter() - lock_requested, operation='bulk')
+
+        requests_by_room = {}
+        for item in items:
+            meeting_room = meeting_rooms.get(item['room_id'])
+            if meeting_room is None:
+                results[item['index']] = MeetingRoomNotFound()
+            elif meeting_room.capacity < item['no_of_persons']:
+                results[item['index']] = InsufficientCapacity()
+            else:
+                requests_by_room.setdefault(meeting_room.id, []).append((item['start_time'], item['end_time'], item['index']))
+
+        if requests_by_room:
+            busy = busy_intervals_for_rooms(
+                list(requests_by_room),
+                min(item['start_time'] for item in items),
+                max(item['end_time'] for item in items),
+            )
+            for room_id, requests in requests_by_room.items():
+                for index in sweep_conflicts(busy[room_id], requests):
+                    results[index] = BookingConflict()
+
+        bookings = [
+            BookingHistory(
+                meeting_room=meeting_rooms[item['room_id']],
+                start_time=item['start_time'],
+                end_time=item['end_time'],
+                no_of_persons=item['no_of_persons'],
+                booked_by=user,
+            )
+            for item in items if item['index'] not in results
+        ]
+        if bookings:
+            try:
+                with transaction.atomic(using=booking_database()):
+                    BookingHistory.objects.bulk_create(bookings)
+                    record_usage(bookings)
+            except IntegrityError:
+                # A concurrent writer outside the room lock won the race, reject the whole batch
+                booking_attempts.inc(len(items), operation='bulk', outcome=BookingConflict.outcome)
+                raise BookingConflict()
+            queue_bulk_confirmation_email(bookings, user.email)
+            bookings_bulk_created.send(sender=BookingHistory, bookings=bookings)
+
+    accepted = iter(bookings)
+    for item in items:
+        if item['index'] not in results:
+            results[item['index']] = next(accepted)
+        result = results[item['index']]
+        booking_attempts.inc(operation='bulk', outcome=result.outcome if isinstance(result, BookingError) else 'success')
+    return results
+
+
+@record_booking_outcome('book')
+def create_booking(room_id, user, start_time, end_time, no_of_persons, before_commit=None):
+    """
+    Atomically books a meeting room.
+
+    The availability check and the insert run in one transaction holding the
+    meeting room lock, so concurrent requests for the same room cannot both
+    pass the check. On PostgreSQL the booking_no_overlap exclusion constraint
+    is the last line of defence and is reported as a conflict as well. The
+    confirmation email is queued in the outbox within the same transaction.
+
+    Parameters:
+    - room_id (int): The ID of the meeting room to be booked.
+    - user (CustomUser): The user making the booking.
+    - start_time (datetime): Start time of the booking.
+    - end_time (datetime): End time of the booking.
+    - no_of_persons (int): Number of persons for the booking.
+    - before_commit (callable, optional): Called with the booking at the end of the transaction,
+      e.g. to store the response of the request with it (see apps.core.idempotency.response_hook).
+
+    Returns:
+    - BookingHistory: The created booking.
+
+    Raises:
+    - MeetingRoomNotFound: If no active meeting room has the given ID.
+    - InsufficientCapacity: If the room is too small for no_of_persons.
+    - BookingConflict: If the room is already booked during the time range.
+    """
+    return book_room(room_id, user, start_time, end_time, no_of_persons, operation='book', before_commit=before_commit)
+
+
+def book_room(room_id, user, start_time, end_time, no_of_persons, operation, before_insert=None, before_commit=None):
+    """
+    Books a meeting room like create_booking, without counting the attempt,
+    so services retrying over several rooms count a single attempt.
+
+    before_insert, when given, is called in the transaction and under the
+    room lock once the room is known to be free; a BookingError it raises
+    aborts the booking. before_commit, when given, is called with the
+    booking at the end of the transaction.
+    """
+    lock_requested = time.perf_counter()
+    with room_lock(room_id), transaction.atomic(using=booking_database()):
+        try:
+            meeting_room = MeetingRoom.objects.select_for_update().get(pk=room_id, is_active=True)
+        except MeetingRoom.DoesNotExist:
+            raise MeetingRoomNotFound()
+        finally:
+            booking_lock_wait.observe(time.perf_counter() - lock_requested, operation=operation)
+
+        if meeting_room.capacity < no_of_persons:
+            raise InsufficientCapacity()
+        if has_overlapping_booking(meeting_room.id, start_time, end_time):
+            raise BookingConflict()
+        if before_insert is not None:
+            before_insert()
+
+        try:
+            with transaction.atomic(using=booking_database()):
+                booking = BookingHistory.objects.create(
+                    meeting_room=meeting_room,
+                    start_time=start_time,
+                    end_time=end_time,
+                    no_of_persons=no_of_persons,
+                    booked_by=user,
+                )
+        except IntegrityError:
+            raise BookingConflict()
+        record_usage([booking])
+
+        queue_confirmation_email(meeting_room.room_name, booking.start_time, booking.end_time, user.email)
+        if before_commit is not None:
+            before_commit(booking)
+
+    return booking
+
+
+def cancel_booking(booking, before_commit=None):
+    """
+    Deletes a booking, removes it from the usage rollups and queues the
+    cancellation email and the promotion of its waitlist in the same transaction.
+
+    Parameters:
+    - booking (BookingHistory): The booking to be canceled.
+    - before_commit (callable, optional): Called with the booking at the end of the transaction.
+    """
+    with transaction.atomic(using=booking._state.db):
+        booking.delete()
+        record_usage([booking], sign=-1)
+        queue_cancellation_email(booking.meeting_room.room_name, booking.start_time, booking.end_time, booking.booked_by.email)
+        queue_waitlist_promotion(booking.meeting_room_id, booking.start_time, booking.end_time)
+        if before_commit is not None:
+            before_commit(booking)
+
+
+def queue_waitlist_promotion(room_id, start_time, end_time):
+    """
+    Queues a freed slot for the promote_waitlist worker when users wait for it.
+
+    Call it inside the transaction freeing the slot, so the promotion is
+    queued if and only if the slot is actually freed.
+
+    Returns:
+    - WaitlistPromotion: The queued slot, None when nobody waits for it.
+    """
+    if not WaitlistEntry.objects.filter(
+        meeting_room_id=room_id,
+        status=WaitlistEntry.STATUS_WAITING,
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+    ).exists():
+        return None
+    return WaitlistPromotion.objects.create(meeting_room_id=room_id, start_time=start_time, end_time=end_time)
+
+
+@record_booking_outcome('waitlist')
+def join_waitlist(room_id, user, start_time, end_time, no_of_persons, before_commit=None):
+    """
+    Adds a user to the waitlist of a meeting room for a time range.
+
+    The user is booked by the promote_waitlist worker as soon as a
+    cancellation frees the range, instead of polling the booking endpoint.
+    When the range is already free (the blocking booking was cancelled
+    between the user's failed attempt and now), a promotion is queued right away.
+
+    Parameters:
+    - room_id (int): The ID of the meeting room waited for.
+    - user (CustomUser): The user waiting.
+    - start_time (datetime): Start time of the wanted booking.
+    - end_time (datetime): End time of the wanted booking.
+    - no_of_persons (int): Number of persons for the wanted booking.
+    - before_commit (callable, optional): Called with the entry at the end of the transaction.
+
+    Returns:
+    - WaitlistEntry: The created entry.
+
+    Raises:
+    - MeetingRoomNotFound: If no active meeting room has the given ID.
+    - InsufficientCapacity: If the room is too small for no_of_persons.
+    - AlreadyWaitlisted: If the user already waits for the room during the same time range.
+    """
+    meeting_room = MeetingRoom.objects.filter(pk=room_id, is_active=True).first()
+    if meeting_room is None:
+        raise MeetingRoomNotFound()
+    if meeting_room.capacity < no_of_persons:
+        raise InsufficientCapacity()
+
+    try:
+        with transaction.atomic(using=booking_database()):
+            entry = WaitlistEntry.objects.create(
+                meeting_room=meeting_room,
+                user=user,
+                start_time=start_time,
+                end_time=end_time,
+                no_of_persons=no_of_persons,
+            )
+            if not has_overlapping_booking(meeting_room.id, start_time, end_time):
+                WaitlistPromotion.objects.create(meeting_room=meeting_room, start_time=start_time, end_time=end_time)
+            if before_commit is not None:
+                before_commit(entry)
+    except IntegrityError:
+        raise AlreadyWaitlisted()
+    return entry
+
+
+@record_booking_outcome('allocate')
+def allocate_booking(user, start_time, end_time, no_of_persons):
+    """
+    Books the smallest free active meeting room that fits no_of_persons.
+
+    Candidates come from the (is_active, capacity) index in ascending capacity
+    order and are pre-filtered with the availability index. Each candidate is
+    then booked through book_room, which re-checks availability under
+    the room lock; losing a race for one room simply moves on to the next one.
+
+    Parameters:
+    - user (CustomUser): The user making the booking.
+    - start_time (datetime): Start time of the booking.
+    - end_time (datetime): End time of the booking.
+    - no_of_persons (int): Number of persons for the booking.
+
+    Returns:
+    - BookingHistory: The created booking.
+
+    Raises:
+    - NoMeetingRoomAvailable: If every fitting room is taken.
+    """
+    candidate_ids = MeetingRoom.objects.filter(
+        is_active=True, capacity__gte=no_of_persons
+    ).order_by('capacity', 'id').values_list('id', flat=True)
+    busy_room_ids = availability_index.busy_room_ids(start_time, end_time)
+
+    for room_id in candidate_ids:
+        if room_id in busy_room_ids:
+            continue
+        try:
+            return book_room(room_id, user, start_time, end_time, no_of_persons, operation='allocate')
+        except (BookingConflict, MeetingRoomNotFound, InsufficientCapacity):
+            # Another request got there first or the room changed meanwhile, try the next fitting room
+            continue
+    raise NoMeetingRoomAvailable()
+
+
+@record_booking_outcome('recurring')
+def create_recurring_booking(room_id, user, start_time, end_time, no_of_persons, frequency,
+                             interval=1, until=None, count=None, exception_dates=()):
+    """
+    Atomically books a recurring series of a meeting room.
+
+    The series is stored as one rule row plus its exception rows. Its
+    occurrences are expanded once, under the room lock, and swept against the
+    bookings and the other series of the room over the span of the series.
+
+    Parameters:
+    - room_id (int): The ID of the meeting room to be booked.
+    - user (CustomUser): The user making the booking.
+    - start_time (datetime): Start time of the first occurrence.
+    - end_time (datetime): End time of the first occurrence.
+    - no_of_persons (int): Number of persons for every occurrence.
+    - frequency (str): daily, weekly or monthly.
+    - interval (int): Number of days/weeks/months between occurrences.
+    - until (datetime, optional): No occurrence starts after this time.
+    - count (int, optional): Total number of occurrences.
+    - exception_dates (list, optional): Start times of the occurrences to skip.
+
+    Returns:
+    - RecurringBooking: The created series.
+
+    Raises:
+    - MeetingRoomNotFound: If no active meeting room has the given ID.
+    - InsufficientCapacity: If the room is too small for no_of_persons.
+    - RecurrenceTooLong: If the rule has more than RECURRING_BOOKING_MAX_OCCURRENCES occurrences.
+    - RecurringBookingConflict: If occurrences overlap existing bookings or each other.
+    """
+    lock_requested = time.perf_counter()
+    with room_lock(room_id), transaction.atomic(using=booking_database()):
+        try:
+            meeting_room = MeetingRoom.objects.select_for_update().get(pk=room_id, is_active=True)
+        except MeetingRoom.DoesNotExist:
+            raise MeetingRoomNotFound()
+        finally:
+            booking_lock_wait.observe(time.perf_counter() - lock_requested, operation='recurring')
+        if meeting_room.capacity < no_of_persons:
+            raise InsufficientCapacity()
+
+        recurring_booking = RecurringBooking(
+            meeting_room=meeting_room,
+            booked_by=user,
+            start_time=start_time,
+            end_time=end_time,
+            no_of_persons=no_of_persons,
+            frequency=frequency,
+            interval=interval,
+            until=until,
+            count=count,
+        )
+        # Expand the whole rule once, bounded so a far away until cannot run away
+        max_occurrences = getattr(settings, 'RECURRING_BOOKING_MAX_OCCURRENCES', 1000)
+        rule_occurrences = list(islice(recurring_booking.occurrences(exceptions=set()), max_occurrences + 1))
+        if len(rule_occurrences) > max_occurrences:
+            raise RecurrenceTooLong(f"A recurring booking can have at most {max_occurrences} occurrences.")
+        recurring_booking.ends_at = rule_occurrences[-1][1]
+
+        exceptions = set(exception_dates)
+        occurrences = [
+            (occurrence_start, occurrence_end, position)
+            for position, (occurrence_start, occurrence_end) in enumerate(rule_occurrences)
+            if occurrence_start not in exceptions
+        ]
+        busy = busy_intervals_for_rooms([meeting_room.id], start_time, recurring_booking.ends_at)[meeting_room.id]
+        conflicts = sweep_conflicts(busy, occurrences)
+        if conflicts:
+            raise RecurringBookingConflict(sorted(occurrences[position][0] for position in conflicts))
+
+        recurring_booking.save()
+        RecurringBookingException.objects.bulk_create(
+            RecurringBookingException(recurring_booking=recurring_booking, occurrence_start=occurrence_start)
+            for occurrence_start in exceptions
+        )
+        queue_recurring_confirmation_email(recurring_booking, len(occurrences), user.email)
+
+    return recurring_booking
+
+
+@record_booking_outcome('hold')
+def create_hold(room_id, user, start_time, end_time, no_of_persons):
+    """
+    Tentatively reserves a meeting room while the user fills in the booking details.
+
+    Availability and capacity are checked like for create_booking, under the
+    meeting room lock. The hold blocks the range in every availability check
+    for BOOKING_HOLDS['TTL_SECONDS'], without sending any email, and stops
+    blocking by itself when it expires.
+
+    Parameters:
+    - room_id (int): The ID of the meeting room to hold.
+    - user (CustomUser): The user holding the room.
+    - start_time (datetime): Start time of the held range.
+    - end_time (datetime): End time of the held range.
+    - no_of_persons (int): Number of persons for the booking.
+
+    Returns:
+    - BookingHold: The created hold.
+
+    Raises:
+    - MeetingRoomNotFound: If no active meeting room has the given ID.
+    - InsufficientCapacity: If the room is too small for no_of_persons.
+    - BookingConflict: If the room is already booked or held during the time range.
+    """
+    lock_requested = time.perf_counter()
+    with room_lock(room_id), transaction.atomic(using=booking_database()):
+        try:
+            meeting_room = MeetingRoom.objects.select_for_update().get(pk=room_id, is_active=True)
+        except MeetingRoom.DoesNotExist:
+            raise MeetingRoomNotFound()
+        finally:
+            booking_lock_wait.observe(time.perf_counter() - lock_requested, operation='hold')
+
+        if meeting_room.capacity < no_of_persons:
+            raise InsufficientCapacity()
+        if has_overlapping_booking(meeting_room.id, start_time, end_time):
+            raise BookingConflict()
+
+        now = timezone.now()
+        return BookingHold.objects.create(
+            meeting_room=meeting_room,
+            held_by=user,
+            start_time=start_time,
+            end_time=end_time,
+            no_of_persons=no_of_persons,
+            created_at=now,
+            expires_at=now + timedelta(seconds=hold_setting('TTL_SECONDS', 300)),
+        )
+
+
+@record_booking_outcome('confirm_hold')
+def confirm_hold(hold_id, user, before_commit=None):
+    """
+    Turns a hold into a booking.
+
+    The availability check is not run again: every booking path treats the
+    hold as busy, so the range is still free as long as the hold has not
+    expired. Deleting the hold, conditioned on its expiry, and inserting the
+    booking happen in one transaction under the meeting room lock, so a hold
+    is confirmed at most once. The confirmation email is queued in the same transaction.
+
+    Parameters:
+    - hold_id (int): The ID of the hold.
+    - user (CustomUser): The user who took the hold.
+    - before_commit (callable, optional): Called with the booking at the end of the transaction.
+
+    Returns:
+    - BookingHistory: The created booking.
+
+    Raises:
+    - HoldNotFound: If the user has no hold with the given ID.
+    - HoldExpired: If the hold expired before being confirmed.
+    """
+    hold = BookingHold.objects.filter(pk=hold_id, held_by=user).first()
+    if hold is None:
+        raise HoldNotFound()
+
+    lock_requested = time.perf_counter()
+    with room_lock(hold.meeting_room_id), transaction.atomic(using=booking_database()):
+        try:
+            meeting_room = MeetingRoom.objects.select_for_update().get(pk=hold.meeting_room_id)
+        except MeetingRoom.DoesNotExist:
+            raise HoldNotFound()
+        finally:
+            booking_lock_wait.observe(time.perf_counter() - lock_requested, operation='confirm_hold')
+
+        if not BookingHold.objects.filter(pk=hold.pk, expires_at__gt=timezone.now()).delete()[0]:
+            raise HoldExpired()
+
+        try:
+            with transaction.atomic(using=booking_database()):
+                booking = BookingHistory.objects.create(
+                    meeting_room=meeting_room,
+                    start_time=hold.start_time,
+                    end_time=hold.end_time,
+                    no_of_persons=hold.no_of_persons,
+                    booked_by=user,
+                )
+        except IntegrityError:
+            raise BookingConflict()
+        record_usage([booking])
+
+        queue_confirmation_email(meeting_room.room_name, booking.start_time, booking.end_time, user.email)
+        if before_commit is not None:
+            before_commit(booking)
+
+    return booking
+
+
+def release_hold(hold):
+    """
+    Deletes a hold before it expires and queues the promotion of the waitlist of its range in the same transaction.
+
+    Parameters:
+    - hold (BookingHold): The hold to release.
+    """
+    with transaction.atomic(using=hold._state.db):
+        hold.delete()
+        queue_waitlist_promotion(hold.meeting_room_id, hold.start_time, hold.end_time)
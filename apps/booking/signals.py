@@ -0,0 +1,138 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from apps.booking.availability import availability_index
+from apps.booking.cache import bump_holds_version, bump_room_version, bump_rooms_version, bump_series_version
+from apps.booking.events import BOOKING_CANCELLED, BOOKING_CREATED, publish_booking_events
+from apps.booking.models import ArchivedBookingHistory, BookingHistory, BookingHold, MeetingRoom, RecurringBooking, RecurringBookingException, WaitlistEntry
+from apps.core.models import IdempotencyKey
+from apps.core.routers import booking_database, pin_to_primary, site_databases
+from apps.member.models import CustomUser
+
+# Sent with the created bookings after BookingHistory.objects.bulk_create, which skips post_save
+bookings_bulk_created = Signal()
+
+
+def room_changed(room_id, using=None):
+    """
+    Invalidates the cached availability of a meeting room.
+
+    The version is bumped right away, so this process never serves stale
+    entries, and once more when the transaction of the room's database
+    (the current site's by default) commits, so entries another process
+    cached from data read before the commit are dropped as well.
+
+    The availability index is updated by the signals before the commit, so
+    it only accepts the version once the transaction commits: after a
+    rollback, its version is behind and the next query reloads the room.
+    """
+    version = bump_room_version(room_id)
+
+    def committed():
+        committed_version = bump_room_version(room_id)
+        # Another change of the room in between means the index has to reload it
+        if committed_version == version + 1:
+            availability_index.version_bumped(room_id, committed_version, previous=version - 1)
+
+    transaction.on_commit(committed, using=using or booking_database())
+
+
+def series_changed(room_id, using=None):
+    """
+    Invalidates the cached recurring booking rules and the availability of their meeting room.
+    """
+    bump_series_version()
+    transaction.on_commit(bump_series_version, using=using or booking_database())
+    room_changed(room_id, using)
+
+
+@receiver(post_save, sender=BookingHistory)
+def index_saved_booking(sender, instance, created, using, **kwargs):
+    """
+    Keeps the availability index in sync with created or updated bookings.
+    """
+    availability_index.booking_saved(instance)
+    pin_to_primary([instance.booked_by_id])
+    room_changed(instance.meeting_room_id, using)
+    if created:
+        publish_booking_events(BOOKING_CREATED, [instance], using)
+
+
+@receiver(post_delete, sender=BookingHistory)
+def unindex_deleted_booking(sender, instance, using, **kwargs):
+    """
+    Removes cancelled bookings from the availability index.
+    """
+    availability_index.booking_deleted(instance)
+    room_changed(instance.meeting_room_id, using)
+    # Bookings that already ended (archived ones) free no time: nobody to notify
+    if instance.end_time > timezone.now():
+        pin_to_primary([instance.booked_by_id])
+        publish_booking_events(BOOKING_CANCELLED, [instance], using)
+
+
+@receiver(bookings_bulk_created, sender=BookingHistory)
+def index_bulk_created_bookings(sender, bookings, **kwargs):
+    """
+    Indexes bookings created with bulk_create.
+    """
+    for booking in bookings:
+        availability_index.booking_saved(booking)
+    pin_to_primary({booking.booked_by_id for booking in bookings})
+    for room_id in {booking.meeting_room_id for booking in bookings}:
+        room_changed(room_id)
+    publish_booking_events(BOOKING_CREATED, bookings)
+
+
+@receiver(post_save, sender=RecurringBooking)
+@receiver(post_delete, sender=RecurringBooking)
+def recurring_booking_changed(sender, instance, using, **kwargs):
+    pin_to_primary([instance.booked_by_id])
+    series_changed(instance.meeting_room_id, using)
+
+
+@receiver(post_save, sender=RecurringBookingException)
+@receiver(post_delete, sender=RecurringBookingException)
+def recurring_booking_exception_changed(sender, instance, using, **kwargs):
+    pin_to_primary([instance.recurring_booking.booked_by_id])
+    series_changed(instance.recurring_booking.meeting_room_id, using)
+
+
+@receiver(post_save, sender=BookingHold)
+@receiver(post_delete, sender=BookingHold)
+def booking_hold_changed(sender, instance, using, **kwargs):
+    """
+    Invalidates the cached holds and the availability of their meeting room.
+    """
+    bump_holds_version()
+    transaction.on_commit(bump_holds_version, using=using)
+    room_changed(instance.meeting_room_id, using)
+
+
+@receiver(post_save, sender=MeetingRoom)
+@receiver(post_delete, sender=MeetingRoom)
+def meeting_room_changed(sender, instance, using, **kwargs):
+    """
+    Invalidates the cached room listing and the availability of the room.
+    """
+    bump_rooms_version()
+    transaction.on_commit(bump_rooms_version, using=using)
+    room_changed(instance.id, using)
+
+
+@receiver(pre_delete, sender=CustomUser)
+def delete_site_bookings(sender, instance, **kwargs):
+    """
+    Deletes the bookings, waitlist entries, holds and idempotency keys a deleted user has on the site databases.
+
+    Users live on the default database, so the ORM only cascades to the
+    bookings stored there.
+    """
+    for alias in site_databases()[1:]:
+        for model in (BookingHistory, ArchivedBookingHistory, RecurringBooking):
+            model.objects.using(alias).filter(booked_by_id=instance.pk).delete()
+        WaitlistEntry.objects.using(alias).filter(user_id=instance.pk).delete()
+        BookingHold.objects.using(alias).filter(held_by_id=instance.pk).delete()
+        IdempotencyKey.objects.using(alias).filter(user_id=instance.pk).delete()
@@ -1,16 +1,43 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, router, transaction
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
-from .models import MeetingRoom, BookingHistory
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.core.metrics import registry
+from apps.core.pubsub import get_event_hub, reset_event_hub
+from apps.core.routers import pin_key, reserve_site_id_ranges, use_replicas, use_site
+from apps.core.models import IdempotencyKey, OutboxEmail
+from apps.member.models import CustomUser
+from .analytics import rebuild_rollups
+from .archive import archive_bookings
+from .availability import availability_index
+from .benchmark import compare_to_baseline, run_benchmarks, seed_dataset
+from .cache import bump_room_version, cache_stats
+from .models import ArchivedBookingHistory, BookingHold, Equipment, MeetingRoom, BookingHistory, RecurringBooking, RoomUsageRollup, WaitlistEntry, WaitlistPromotion
+from .recurrence import expand_occurrences
+from .services import BookingConflict, cancel_booking, create_booking
+from .transfer import file_fingerprint, write_checkpoint
 
 class MeetingRoomAPITestCase(TestCase):
     def setUp(self):
         self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.client.force_authenticate(user=self.user)
         self.meeting_room_url = reverse('meeting-room-list')
-        self.booking_url = reverse('book-meeting-room', kwargs={'room_id': 1})
-        self.cancel_booking_url = reverse('cancel-meeting-room-booking', kwargs={'booking_id': 1})
         self.meeting_room_data = {'room_name': 'Test Room', 'capacity': 10, 'is_active': True}
         self.start_time = timezone.now() + timezone.timedelta(days=1)
         self.end_time = self.start_time + timezone.timedelta(hours=2)
@@ -18,6 +45,7 @@ class MeetingRoomAPITestCase(TestCase):
 
         # Create a meeting room for testing
         self.meeting_room = MeetingRoom.objects.create(**self.meeting_room_data)
+        self.booking_url = reverse('book-meeting-room', kwargs={'room_id': self.meeting_room.id})
 
     def test_list_meeting_rooms(self):
         response = self.client.get(self.meeting_room_url)
@@ -32,7 +60,1513 @@ class MeetingRoomAPITestCase(TestCase):
         booking_response = self.client.post(self.booking_url, data=self.booking_data, format='json')
         self.assertEqual(booking_response.status_code, status.HTTP_201_CREATED)
         booking_id = booking_response.data.get('id')
+        self.assertEqual(OutboxEmail.objects.filter(subject='Meeting Room Booking Confirmation').count(), 1)
 
         # Attempt to cancel the booking
-        cancel_response = self.client.delete(self.cancel_booking_url)
-        self.assertEqual(cancel_response.status_code, status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        cancel_booking_url = reverse('cancel-meeting-room-booking', kwargs={'booking_id': booking_id})
+        cancel_response = self.client.delete(cancel_booking_url)
+        self.assertEqual(cancel_response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(OutboxEmail.objects.filter(subject='Meeting Room Booking Cancellation').count(), 1)
+
+    def test_overlapping_booking_is_rejected(self):
+        response = self.client.post(self.booking_url, data=self.booking_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        overlapping_data = dict(self.booking_data, start_time=(self.start_time + timezone.timedelta(hours=1)).isoformat())
+        overlapping_data['end_time'] = (self.end_time + timezone.timedelta(hours=1)).isoformat()
+        response = self.client.post(self.booking_url, data=overlapping_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(BookingHistory.objects.count(), 1)
+
+    def test_booking_over_capacity_is_rejected(self):
+        response = self.client.post(self.booking_url, data=dict(self.booking_data, no_of_persons=11), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_booking_with_a_non_integer_number_of_persons_is_rejected(self):
+        for no_of_persons in (2.7, '2.7', True, 'abc', 0):
+            response = self.client.post(self.booking_url, data=dict(self.booking_data, no_of_persons=no_of_persons), format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, no_of_persons)
+            self.assertIn('no_of_persons', response.data)
+        self.assertFalse(BookingHistory.objects.exists())
+
+        response = self.client.post(self.booking_url, data=dict(self.booking_data, no_of_persons=2.0), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(BookingHistory.objects.get().no_of_persons, 2)
+
+    def test_booking_unknown_room_returns_not_found(self):
+        booking_url = reverse('book-meeting-room', kwargs={'room_id': self.meeting_room.id + 1})
+        response = self.client.post(booking_url, data=self.booking_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class MeetingRoomAvailabilityTestCase(TestCase):
+    def setUp(self):
+        availability_index.reset()
+        self.client = APIClient()
+        self.meeting_room_url = reverse('meeting-room-list')
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.start_time = timezone.now() + timezone.timedelta(days=1)
+        self.busy_room = MeetingRoom.objects.create(room_name='Busy Room', capacity=10)
+        self.free_room = MeetingRoom.objects.create(room_name='Free Room', capacity=10)
+
+        # The busy room has several bookings, only one of them overlaps the requested window
+        for hours in (0, 4, 8):
+            BookingHistory.objects.create(
+                meeting_room=self.busy_room,
+                start_time=self.start_time + timezone.timedelta(hours=hours),
+                end_time=self.start_time + timezone.timedelta(hours=hours + 2),
+                no_of_persons=2,
+                booked_by=self.user,
+            )
+
+    def list_room_ids(self, start_time, end_time):
+        response = self.client.get(self.meeting_room_url, {
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {room['id'] for room in response.data}
+
+    def test_room_with_overlapping_booking_is_excluded(self):
+        room_ids = self.list_room_ids(self.start_time + timezone.timedelta(hours=5), self.start_time + timezone.timedelta(hours=6))
+        self.assertEqual(room_ids, {self.free_room.id})
+
+    def test_room_is_listed_between_bookings(self):
+        room_ids = self.list_room_ids(self.start_time + timezone.timedelta(hours=2), self.start_time + timezone.timedelta(hours=4))
+        self.assertEqual(room_ids, {self.busy_room.id, self.free_room.id})
+
+    def test_index_follows_created_and_deleted_bookings(self):
+        window = (self.start_time + timezone.timedelta(hours=2), self.start_time + timezone.timedelta(hours=3))
+        self.assertFalse(availability_index.busy_room_ids(*window))
+
+        booking = BookingHistory.objects.create(
+            meeting_room=self.free_room, start_time=window[0], end_time=window[1], no_of_persons=1, booked_by=self.user
+        )
+        self.assertEqual(availability_index.busy_room_ids(*window), {self.free_room.id})
+
+        booking.delete()
+        self.assertFalse(availability_index.busy_room_ids(*window))
+
+    def test_index_stays_consistent_after_archiving(self):
+        past_window = (timezone.now() - timezone.timedelta(days=3), timezone.now() - timezone.timedelta(days=3, hours=-1))
+        BookingHistory.objects.create(
+            meeting_room=self.busy_room, start_time=past_window[0], end_time=past_window[1], no_of_persons=1, booked_by=self.user
+        )
+        window = (self.start_time, self.start_time + timezone.timedelta(hours=1))
+        self.assertEqual(availability_index.busy_room_ids(*past_window), {self.busy_room.id})
+        self.assertEqual(availability_index.busy_room_ids(*window), {self.busy_room.id})
+
+        reset_event_hub()
+        self.addCleanup(reset_event_hub)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_bookings(older_than_days=1), 1)
+
+        self.assertEqual(ArchivedBookingHistory.objects.count(), 1)
+        self.assertFalse(availability_index.busy_room_ids(*past_window))
+        self.assertEqual(availability_index.busy_room_ids(*window), {self.busy_room.id})
+        self.assertTrue(availability_index.is_room_free(self.busy_room.id, self.start_time + timezone.timedelta(hours=2), self.start_time + timezone.timedelta(hours=4)))
+        # Archiving frees no time, so no cancellation is published
+        self.assertEqual(get_event_hub().last_event_id('availability'), 0)
+
+        # The index keeps following the bookings of the room
+        BookingHistory.objects.create(
+            meeting_room=self.busy_room,
+            start_time=self.start_time + timezone.timedelta(hours=2),
+            end_time=self.start_time + timezone.timedelta(hours=3),
+            no_of_persons=1,
+            booked_by=self.user,
+        )
+        self.assertFalse(availability_index.is_room_free(self.busy_room.id, self.start_time + timezone.timedelta(hours=2), self.start_time + timezone.timedelta(hours=4)))
+
+    def test_rolled_back_booking_leaves_no_phantom_interval(self):
+        window = (self.start_time + timezone.timedelta(hours=2), self.start_time + timezone.timedelta(hours=3))
+        self.assertTrue(availability_index.is_room_free(self.free_room.id, *window))
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                BookingHistory.objects.create(
+                    meeting_room=self.free_room, start_time=window[0], end_time=window[1], no_of_persons=1, booked_by=self.user
+                )
+                raise RuntimeError("rollback")
+
+        self.assertFalse(BookingHistory.objects.filter(meeting_room=self.free_room).exists())
+        self.assertTrue(availability_index.is_room_free(self.free_room.id, *window))
+        self.assertFalse(availability_index.busy_room_ids(*window))
+
+    def test_past_window_falls_back_to_database(self):
+        past_start = timezone.now() - timezone.timedelta(days=1)
+        BookingHistory.objects.create(
+            meeting_room=self.free_room, start_time=past_start, end_time=past_start + timezone.timedelta(hours=1),
+            no_of_persons=1, booked_by=self.user
+        )
+        room_ids = self.list_room_ids(past_start, past_start + timezone.timedelta(minutes=30))
+        self.assertEqual(room_ids, {self.busy_room.id})
+
+    def test_invalid_window_is_rejected(self):
+        response = self.client.get(self.meeting_room_url, {'start_time': self.start_time.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+class ConcurrentBookingTestCase(TransactionTestCase):
+    thread_count = 8
+
+    def setUp(self):
+        availability_index.reset()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.meeting_room = MeetingRoom.objects.create(room_name='Contended Room', capacity=10)
+        self.start_time = timezone.now() + timezone.timedelta(days=1)
+
+    def book_slots(self, offset, results, errors):
+        try:
+            # Every thread walks over the same overlapping one hour slots, shifted by its offset
+            for step in range(6):
+                start_time = self.start_time + timezone.timedelta(minutes=15 * (offset + step))
+                try:
+                    create_booking(self.meeting_room.id, self.user, start_time, start_time + timezone.timedelta(hours=1), 1)
+                    results.append(start_time)
+                except BookingConflict:
+                    pass
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    def test_concurrent_bookings_never_overlap(self):
+        results, errors = [], []
+        threads = [
+            threading.Thread(target=self.book_slots, args=(offset % 4, results, errors))
+            for offset in range(self.thread_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        bookings = list(BookingHistory.objects.filter(meeting_room=self.meeting_room).order_by('start_time'))
+        self.assertTrue(bookings)
+        self.assertEqual(len(bookings), len(results))
+        for previous, current in zip(bookings, bookings[1:]):
+            self.assertLessEqual(previous.end_time, current.start_time)
+
+
+class BulkMeetingRoomBookingTestCase(TestCase):
+    def setUp(self):
+        availability_index.reset()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.bulk_booking_url = reverse('bulk-book-meeting-rooms')
+        self.start_time = timezone.now() + timezone.timedelta(days=1)
+        self.small_room = MeetingRoom.objects.create(room_name='Small Room', capacity=4)
+        self.large_room = MeetingRoom.objects.create(room_name='Large Room', capacity=20)
+        BookingHistory.objects.create(
+            meeting_room=self.large_room, start_time=self.start_time, end_time=self.start_time + timezone.timedelta(hours=1),
+            no_of_persons=2, booked_by=self.user
+        )
+
+    def item(self, room, start_hour, end_hour, no_of_persons=2):
+        return {
+            'room_id': room.id,
+            'start_time': (self.start_time + timezone.timedelta(hours=start_hour)).isoformat(),
+            'end_time': (self.start_time + timezone.timedelta(hours=end_hour)).isoformat(),
+            'no_of_persons': no_of_persons,
+        }
+
+    def test_bulk_booking_reports_per_item_results(self):
+        items = [
+            self.item(self.large_room, 0.5, 1.5),            # overlaps an existing booking
+            self.item(self.small_room, 0, 2),                # booked
+            self.item(self.small_room, 1, 3),                # overlaps the previous item
+            self.item(self.small_room, 2, 3),                # booked, touches the first item
+            self.item(self.small_room, 4, 5, 10),            # too many persons
+            dict(self.item(self.small_room, 6, 7), room_id=self.large_room.id + 100),
+            {'room_id': self.small_room.id, 'start_time': 'tomorrow'},
+        ]
+        response = self.client.post(self.bulk_booking_url, data={'bookings': items}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['conflict', 'booked', 'conflict', 'booked', 'insufficient_capacity', 'room_not_found', 'invalid'],
+        )
+        self.assertEqual(response.data['booked'], 2)
+        self.assertEqual(BookingHistory.objects.filter(meeting_room=self.small_room).count(), 2)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+        # The bulk created bookings are visible to the availability index
+        busy_room_ids = availability_index.busy_room_ids(self.start_time + timezone.timedelta(hours=2), self.start_time + timezone.timedelta(hours=3))
+        self.assertEqual(busy_room_ids, {self.small_room.id})
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def count_queries(first_day, item_count):
+            items = [self.item(self.small_room, 24 * first_day + hour, 24 * first_day + hour + 1) for hour in range(item_count)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(self.bulk_booking_url, data=items, format='json')
+            self.assertEqual(response.data['booked'], item_count)
+            return len(context.captured_queries)
+
+        self.assertEqual(count_queries(1, 10), count_queries(30, 100))
+
+    def test_rejects_non_list_body(self):
+        response = self.client.post(self.bulk_booking_url, data={'bookings': 'all of them'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MyBookingsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        other_user = CustomUser.objects.create_user(email='other@example.com', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.my_bookings_url = reverse('my-bookings')
+        self.now = timezone.now()
+        rooms = [MeetingRoom.objects.create(room_name=f'Room {index}', capacity=10) for index in range(3)]
+
+        # Two bookings per start time, so pages have to break ties on the id
+        self.bookings = []
+        for day in range(-3, 4):
+            for room in rooms[:2]:
+                self.bookings.append(BookingHistory.objects.create(
+                    meeting_room=room, start_time=self.now + timezone.timedelta(days=day),
+                    end_time=self.now + timezone.timedelta(days=day, hours=1), no_of_persons=1, booked_by=self.user
+                ))
+        BookingHistory.objects.create(
+            meeting_room=rooms[2], start_time=self.now, end_time=self.now + timezone.timedelta(hours=1),
+            no_of_persons=1, booked_by=other_user
+        )
+
+    def fetch_all_pages(self, **params):
+        ids, cursor = [], None
+        while True:
+            response = self.client.get(self.my_bookings_url, dict(params, **({'cursor': cursor} if cursor else {})))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(booking['id'] for booking in response.data['results'])
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_booking_once_in_order(self):
+        ids = self.fetch_all_pages(page_size=3)
+        expected = sorted(self.bookings, key=lambda booking: (booking.start_time, booking.id))
+        self.assertEqual(ids, [booking.id for booking in expected])
+
+    def test_past_scope_walks_backwards(self):
+        ids = self.fetch_all_pages(scope='past', page_size=4)
+        expected = sorted(
+            (booking for booking in self.bookings if booking.start_time < timezone.now()),
+            key=lambda booking: (booking.start_time, booking.id), reverse=True
+        )
+        self.assertEqual(ids, [booking.id for booking in expected])
+
+    def test_date_range_and_upcoming_filters(self):
+        response = self.client.get(self.my_bookings_url, {
+            'scope': 'upcoming',
+            'end_date': (self.now + timezone.timedelta(days=2)).isoformat(),
+        })
+        # Only the bookings of the next day, end_date is exclusive
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_page_is_fetched_without_n_plus_one_queries(self):
+        # One query for the live bookings and one for the archive
+        with self.assertNumQueries(2):
+            response = self.client.get(self.my_bookings_url, {'page_size': 10})
+        self.assertEqual(response.data['results'][0]['meeting_room']['room_name'], 'Room 0')
+
+        with self.assertNumQueries(1):
+            self.client.get(self.my_bookings_url, {'scope': 'upcoming', 'page_size': 10})
+
+    def test_archived_bookings_are_merged_back(self):
+        # Archives the bookings of three and two days ago
+        self.assertEqual(archive_bookings(older_than_days=1, batch_size=3), 4)
+        self.assertEqual(ArchivedBookingHistory.objects.count(), 4)
+        self.assertEqual(BookingHistory.objects.filter(booked_by=self.user).count(), len(self.bookings) - 4)
+
+        ids = self.fetch_all_pages(page_size=3)
+        expected = sorted(self.bookings, key=lambda booking: (booking.start_time, booking.id))
+        self.assertEqual(ids, [booking.id for booking in expected])
+
+        ids = self.fetch_all_pages(scope='past', page_size=4)
+        self.assertEqual(ids, [booking.id for booking in reversed(expected) if booking.start_time < timezone.now()])
+
+        response = self.client.get(self.my_bookings_url, {'stream': 'ndjson'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [booking.id for booking in expected])
+
+    def test_ndjson_stream_yields_every_booking(self):
+        response = self.client.get(self.my_bookings_url, {'stream': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), len(self.bookings))
+        self.assertIn('meeting_room', json.loads(lines[0]))
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(self.my_bookings_url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MeetingRoomFreeBusyTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.free_busy_url = reverse('meeting-room-free-busy')
+        self.window_start = (timezone.now() + timezone.timedelta(days=1)).replace(hour=8, minute=0, second=0, microsecond=0)
+        self.room = MeetingRoom.objects.create(room_name='Room', capacity=10)
+        self.empty_room = MeetingRoom.objects.create(room_name='Empty Room', capacity=10)
+        for start_minutes, end_minutes in ((10, 40), (30, 45), (90, 120)):
+            BookingHistory.objects.create(
+                meeting_room=self.room,
+                start_time=self.window_start + timezone.timedelta(minutes=start_minutes),
+                end_time=self.window_start + timezone.timedelta(minutes=end_minutes),
+                no_of_persons=1, booked_by=self.user
+            )
+
+    def test_busy_bitmap_and_free_intervals(self):
+        # Rooms, bookings and recurring booking rules
+        with self.assertNumQueries(3):
+            response = self.client.get(self.free_busy_url, {
+                'start_time': self.window_start.isoformat(),
+                'end_time': (self.window_start + timezone.timedelta(hours=2)).isoformat(),
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        room, empty_room = response.data['rooms']
+        self.assertEqual(room['busy'], '11100011')
+        self.assertEqual(
+            [(free['start_time'], free['end_time']) for free in room['free']],
+            [
+                (self.window_start, self.window_start + timezone.timedelta(minutes=10)),
+                (self.window_start + timezone.timedelta(minutes=45), self.window_start + timezone.timedelta(minutes=90)),
+            ]
+        )
+        self.assertEqual(empty_room['busy'], '0' * 8)
+
+    def test_room_filter_and_granularity(self):
+        response = self.client.get(self.free_busy_url, {
+            'start_time': self.window_start.isoformat(),
+            'end_time': (self.window_start + timezone.timedelta(hours=2)).isoformat(),
+            'granularity': 60,
+            'rooms': str(self.room.id),
+        })
+        self.assertEqual([room['busy'] for room in response.data['rooms']], ['11'])
+
+    def test_too_many_slots_are_rejected(self):
+        response = self.client.get(self.free_busy_url, {
+            'start_time': self.window_start.isoformat(),
+            'end_time': (self.window_start + timezone.timedelta(days=30)).isoformat(),
+            'granularity': 1,
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_window_longer_than_a_month_is_rejected(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.free_busy_url, {
+                'start_time': self.window_start.isoformat(),
+                'end_time': (self.window_start + timezone.timedelta(days=365 * 27)).isoformat(),
+                'granularity': 1440,
+            })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('end_time', response.data)
+        self.assertEqual(len(queries), 0)
+
+    def test_window_ending_at_the_largest_datetime(self):
+        end_time = timezone.datetime.max.replace(tzinfo=timezone.utc)
+        response = self.client.get(self.free_busy_url, {
+            'start_time': (end_time - timezone.timedelta(days=2)).isoformat(),
+            'end_time': end_time.isoformat(),
+            'granularity': 1440,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([room['busy'] for room in response.data['rooms']], ['00', '00'])
+
+    def test_granularity_and_window_limits(self):
+        def get(days, granularity):
+            return self.client.get(self.free_busy_url, {
+                'start_time': self.window_start.isoformat(),
+                'end_time': (self.window_start + timezone.timedelta(days=days)).isoformat(),
+                'granularity': granularity,
+            })
+
+        # The coarsest slots over the longest window
+        response = get(31, 1440)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['rooms'][0]['busy']), 31)
+
+        for days, granularity, field in ((1, 1441, 'granularity'), (1, 99999999999999, 'granularity'), (32, 1440, 'end_time')):
+            response = get(days, granularity)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(field, response.data)
+
+
+class AllocateMeetingRoomTestCase(TestCase):
+    def setUp(self):
+        availability_index.reset()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.allocate_url = reverse('allocate-meeting-room')
+        self.start_time = timezone.now() + timezone.timedelta(days=1)
+        self.booking_data = {
+            'start_time': self.start_time.isoformat(),
+            'end_time': (self.start_time + timezone.timedelta(hours=1)).isoformat(),
+            'no_of_persons': 4,
+        }
+        self.tiny_room = MeetingRoom.objects.create(room_name='Phone Booth', capacity=2)
+        self.small_room = MeetingRoom.objects.create(room_name='Small Room', capacity=4)
+        self.medium_room = MeetingRoom.objects.create(room_name='Medium Room', capacity=8)
+        self.large_room = MeetingRoom.objects.create(room_name='Large Room', capacity=20)
+        MeetingRoom.objects.create(room_name='Closed Room', capacity=4, is_active=False)
+
+    def test_allocates_smallest_fitting_free_room(self):
+        response = self.client.post(self.allocate_url, data=self.booking_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['meeting_room']['id'], self.small_room.id)
+
+        # The small room is now taken, the next fitting room is used
+        response = self.client.post(self.allocate_url, data=self.booking_data, format='json')
+        self.assertEqual(response.data['meeting_room']['id'], self.medium_room.id)
+
+    def test_no_fitting_room_available(self):
+        response = self.client.post(self.allocate_url, data=dict(self.booking_data, no_of_persons=50), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(BookingHistory.objects.exists())
+
+
+class MeetingRoomSearchTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.search_url = reverse('meeting-room-search')
+        projector = Equipment.objects.create(code='projector', name='Projector')
+        vc = Equipment.objects.create(code='vc', name='Video conferencing')
+        self.large = MeetingRoom.objects.create(room_name='Large', capacity=20, building='North', floor=2)
+        self.medium = MeetingRoom.objects.create(room_name='Medium', capacity=8, building='North', floor=2)
+        self.small = MeetingRoom.objects.create(room_name='Small', capacity=4, building='North', floor=3)
+        self.other = MeetingRoom.objects.create(room_name='Other', capacity=8, building='South', floor=2)
+        self.large.equipment.set([projector, vc])
+        self.medium.equipment.set([projector])
+        self.other.equipment.set([projector, vc])
+        self.start_time = timezone.now() + timezone.timedelta(days=1)
+        self.end_time = self.start_time + timezone.timedelta(hours=1)
+
+    def search(self, **params):
+        response = self.client.get(self.search_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['rooms']
+
+    def test_attribute_filters_ranked_by_best_fit(self):
+        rooms = self.search(building='North', floor='2', min_capacity=6, equipment='projector')
+        self.assertEqual([room['room_name'] for room in rooms], ['Medium', 'Large'])
+        self.assertEqual(rooms[0]['spare_seats'], 2)
+        self.assertEqual(rooms[1]['equipment'], ['projector', 'vc'])
+
+        self.assertEqual([room['room_name'] for room in self.search(equipment='projector,vc')], ['Other', 'Large'])
+        self.assertEqual([room['room_name'] for room in self.search(max_capacity=8, floor='2,3')], ['Small', 'Medium', 'Other'])
+
+    def test_busy_rooms_are_excluded(self):
+        BookingHistory.objects.create(
+            meeting_room=self.medium, booked_by=self.user, start_time=self.start_time,
+            end_time=self.end_time, no_of_persons=2,
+        )
+        RecurringBooking.objects.create(
+            meeting_room=self.other, booked_by=self.user, frequency='daily',
+            start_time=self.start_time - timezone.timedelta(days=1), end_time=self.end_time - timezone.timedelta(days=1),
+            count=3, no_of_persons=2, ends_at=self.end_time + timezone.timedelta(days=1),
+        )
+        rooms = self.search(min_capacity=6, start_time=self.start_time.isoformat(), end_time=self.end_time.isoformat())
+        self.assertEqual([room['room_name'] for room in rooms], ['Large'])
+
+    def test_invalid_filters(self):
+        self.assertEqual(self.client.get(self.search_url, {'min_capacity': 'x'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.search_url, {'min_capacity': 8, 'max_capacity': 4}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.search_url, {'floor': 'first'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecurrenceExpansionTestCase(TestCase):
+    def setUp(self):
+        self.start_time = timezone.make_aware(timezone.datetime(2030, 1, 31, 9, 0))
+        self.end_time = self.start_time + timezone.timedelta(minutes=30)
+
+    def test_weekly_expansion_jumps_to_window(self):
+        window_start = self.start_time + timezone.timedelta(weeks=500, days=1)
+        occurrences = list(expand_occurrences(
+            self.start_time, self.end_time, 'weekly', 1, count=1000,
+            window_start=window_start, window_end=window_start + timezone.timedelta(weeks=2)
+        ))
+        self.assertEqual([start for start, _ in occurrences], [
+            self.start_time + timezone.timedelta(weeks=501), self.start_time + timezone.timedelta(weeks=502)
+        ])
+
+    def test_monthly_expansion_skips_missing_days_and_respects_count(self):
+        occurrences = list(expand_occurrences(self.start_time, self.end_time, 'monthly', 1, count=3))
+        self.assertEqual([start.month for start, _ in occurrences], [1, 3, 5])
+
+    def test_until_and_exceptions(self):
+        occurrences = list(expand_occurrences(
+            self.start_time, self.end_time, 'daily', 2,
+            until=self.start_time + timezone.timedelta(days=6),
+            exceptions={self.start_time + timezone.timedelta(days=2)},
+        ))
+        self.assertEqual([(start - self.start_time).days for start, _ in occurrences], [0, 4, 6])
+
+    def test_expansion_stops_at_the_largest_datetime(self):
+        self.assertEqual(len(list(expand_occurrences(self.start_time, self.end_time, 'monthly', 999, count=1000))), 72)
+        self.assertEqual(len(list(expand_occurrences(self.start_time, self.end_time, 'weekly', 999, count=1000))), 417)
+
+
+class RecurringBookingTestCase(TestCase):
+    def setUp(self):
+        availability_index.reset()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.meeting_room = MeetingRoom.objects.create(room_name='Stand-up Room', capacity=10)
+        self.recurring_booking_url = reverse('book-recurring-meeting-room', kwargs={'room_id': self.meeting_room.id})
+        self.start_time = (timezone.now() + timezone.timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+        self.booking_data = {
+            'start_time': self.start_time.isoformat(),
+            'end_time': (self.start_time + timezone.timedelta(minutes=15)).isoformat(),
+            'no_of_persons': 5,
+            'frequency': 'weekly',
+            'count': 52,
+        }
+
+    def test_series_is_stored_as_one_row_and_blocks_occurrences(self):
+        response = self.client.post(self.recurring_booking_url, data=self.booking_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(RecurringBooking.objects.count(), 1)
+        self.assertFalse(BookingHistory.objects.exists())
+
+        # The 11th occurrence cannot be booked, the day after it can
+        eleventh = self.start_time + timezone.timedelta(weeks=10)
+        with self.assertRaises(BookingConflict):
+            create_booking(self.meeting_room.id, self.user, eleventh, eleventh + timezone.timedelta(hours=1), 1)
+        self.assertEqual(availability_index.busy_room_ids(eleventh, eleventh + timezone.timedelta(hours=1)), {self.meeting_room.id})
+        next_day = eleventh + timezone.timedelta(days=1)
+        create_booking(self.meeting_room.id, self.user, next_day, next_day + timezone.timedelta(hours=1), 1)
+
+    def test_series_conflicting_with_booking_is_rejected(self):
+        conflicting_start = self.start_time + timezone.timedelta(weeks=3)
+        create_booking(self.meeting_room.id, self.user, conflicting_start, conflicting_start + timezone.timedelta(hours=1), 1)
+
+        response = self.client.post(self.recurring_booking_url, data=self.booking_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['conflicts'], [conflicting_start])
+
+        # Skipping the conflicting occurrence makes the series bookable
+        response = self.client.post(self.recurring_booking_url, data=dict(
+            self.booking_data, exception_dates=[conflicting_start.isoformat()]
+        ), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_occurrences_are_listed_for_window_only(self):
+        response = self.client.post(self.recurring_booking_url, data=self.booking_data, format='json')
+        occurrences_url = reverse('recurring-booking-occurrences', kwargs={'recurring_booking_id': response.data['id']})
+        response = self.client.get(occurrences_url, {
+            'start_time': (self.start_time + timezone.timedelta(weeks=4)).isoformat(),
+            'end_time': (self.start_time + timezone.timedelta(weeks=6)).isoformat(),
+        })
+        self.assertEqual(len(response.data['occurrences']), 2)
+
+    def test_interval_is_bounded(self):
+        response = self.client.post(self.recurring_booking_url, data=dict(self.booking_data, interval=10 ** 12), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('interval', response.data)
+
+    def test_rule_requires_exactly_one_bound(self):
+        response = self.client.post(self.recurring_booking_url, data=dict(self.booking_data, until=self.booking_data['start_time']), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookingReadCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache_stats.reset()
+        availability_index.reset()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.meeting_room_url = reverse('meeting-room-list')
+        self.start_time = timezone.now() + timezone.timedelta(days=1)
+        self.window = {
+            'start_time': self.start_time.isoformat(),
+            'end_time': (self.start_time + timezone.timedelta(hours=1)).isoformat(),
+        }
+        self.meeting_room = MeetingRoom.objects.create(room_name='Room', capacity=10)
+
+    def test_warm_listing_does_not_hit_the_database(self):
+        self.client.get(self.meeting_room_url, self.window)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.meeting_room_url, self.window)
+        self.assertEqual([room['id'] for room in response.data], [self.meeting_room.id])
+        self.assertGreater(cache_stats.snapshot()['rooms']['hits'], 0)
+
+    def test_room_and_booking_changes_invalidate_the_cache(self):
+        self.client.get(self.meeting_room_url, self.window)
+
+        MeetingRoom.objects.filter(pk=self.meeting_room.pk).update(capacity=20)
+        other_room = MeetingRoom.objects.create(room_name='Other Room', capacity=4)
+        response = self.client.get(self.meeting_room_url)
+        self.assertEqual([room['capacity'] for room in response.data], [20, 4])
+
+        BookingHistory.objects.create(
+            meeting_room=other_room, start_time=self.start_time, end_time=self.start_time + timezone.timedelta(hours=1),
+            no_of_persons=1, booked_by=self.user
+        )
+        response = self.client.get(self.meeting_room_url, self.window)
+        self.assertEqual([room['id'] for room in response.data], [self.meeting_room.id])
+
+    def test_version_bump_from_another_process_reloads_the_room(self):
+        self.client.get(self.meeting_room_url, self.window)
+
+        # Another worker inserts a booking: this process only sees the version bump
+        BookingHistory.objects.bulk_create([BookingHistory(
+            meeting_room=self.meeting_room, start_time=self.start_time, end_time=self.start_time + timezone.timedelta(hours=1),
+            no_of_persons=1, booked_by=self.user
+        )])
+        bump_room_version(self.meeting_room.id)
+
+        response = self.client.get(self.meeting_room_url, self.window)
+        self.assertEqual(response.data, [])
+
+    def test_cache_stats_require_admin(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(reverse('booking-cache-stats')).status_code, status.HTTP_403_FORBIDDEN)
+
+        admin = CustomUser.objects.create_superuser(email='admin@example.com', password='password')
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(reverse('booking-cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class BookingBenchmarkTestCase(TestCase):
+    # Queries per request of every benchmarked endpoint; raise a budget only on purpose
+    query_budgets = {
+        'login': 1,
+        'login_throttled': 0,
+        'list_rooms': 0,
+        'list_available_rooms': 0,
+        'search_rooms': 3,
+        'book': 12,
+        'my_bookings': 1,
+        # One lookup of the users waiting for the freed slot
+        'cancel': 8,
+    }
+
+    def setUp(self):
+        cache.clear()
+        availability_index.reset()
+        self.dataset = seed_dataset(rooms=5, users=3, bookings=60)
+
+    def test_seed_dataset(self):
+        self.assertEqual(self.dataset, {'rooms': 5, 'users': 3, 'bookings': 60})
+        self.assertTrue(BookingHistory.objects.filter(start_time__gte=timezone.now()).exists())
+        self.assertTrue(BookingHistory.objects.filter(start_time__lt=timezone.now()).exists())
+
+    def test_endpoint_query_budgets(self):
+        scenarios = run_benchmarks(iterations=3, warmup=1)
+
+        self.assertEqual(set(scenarios), set(self.query_budgets))
+        for name, result in scenarios.items():
+            self.assertEqual(result['requests'], 3, name)
+            expected_status = [429] if name == 'login_throttled' else [200, 201, 204]
+            self.assertTrue(all(status_code in expected_status for status_code in result['statuses']), name)
+            self.assertLessEqual(result['queries'], self.query_budgets[name], name)
+
+    def test_compare_to_baseline(self):
+        baseline = {'scenarios': {
+            'book': {'p95_ms': 10.0, 'queries': 8},
+            'cancel': {'p95_ms': 10.0, 'queries': 6},
+        }}
+        scenarios = {
+            'book': {'p95_ms': 11.0, 'queries': 9},
+            'cancel': {'p95_ms': 13.0, 'queries': 6},
+            'login': {'p95_ms': 50.0, 'queries': 6},
+        }
+
+        regressions = compare_to_baseline(scenarios, baseline, tolerance=0.2)
+
+        self.assertEqual(regressions, [
+            {'scenario': 'book', 'metric': 'queries', 'baseline': 8, 'current': 9},
+            {'scenario': 'cancel', 'metric': 'p95_ms', 'baseline': 10.0, 'current': 13.0},
+        ])
+
+
+class BookingMetricsTestCase(TestCase):
+    def setUp(self):
+        registry.reset()
+        availability_index.reset()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.meeting_room = MeetingRoom.objects.create(room_name='Room', capacity=4)
+        start_time = timezone.now() + timezone.timedelta(days=1)
+        self.booking_url = reverse('book-meeting-room', kwargs={'room_id': self.meeting_room.id})
+        self.booking_data = {
+            'start_time': start_time.isoformat(),
+            'end_time': (start_time + timezone.timedelta(hours=1)).isoformat(),
+            'no_of_persons': 2,
+        }
+
+    def test_booking_outcomes_and_lock_wait_are_recorded(self):
+        self.client.post(self.booking_url, self.booking_data, format='json')
+        self.client.post(self.booking_url, self.booking_data, format='json')
+        self.client.post(self.booking_url, {**self.booking_data, 'no_of_persons': 10}, format='json')
+
+        metrics = registry.collect()
+        self.assertEqual(metrics['booking_attempts_total']['samples'], {
+            ('book', 'success'): 1,
+            ('book', 'conflict'): 1,
+            ('book', 'insufficient_capacity'): 1,
+        })
+        self.assertEqual(metrics['booking_lock_wait_seconds']['samples'][('book',)][2], 3)
+        self.assertEqual(metrics['http_request_duration_seconds']['samples'][('book-meeting-room', 'POST', '201')][2], 1)
+
+    def test_allocation_counts_a_single_attempt(self):
+        MeetingRoom.objects.create(room_name='Bigger Room', capacity=8)
+        self.client.post(self.booking_url, self.booking_data, format='json')
+        registry.reset()
+
+        response = self.client.post(reverse('allocate-meeting-room'), self.booking_data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(registry.collect()['booking_attempts_total']['samples'], {('allocate', 'success'): 1})
+
+
+class AsyncBookingViewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        availability_index.reset()
+        self.client = AsyncClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.auth = {'headers': {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}}
+        self.meeting_room = MeetingRoom.objects.create(room_name='Room', capacity=4)
+        self.start_time = timezone.now() + timezone.timedelta(days=1)
+        self.booking_data = {
+            'start_time': self.start_time.isoformat(),
+            'end_time': (self.start_time + timezone.timedelta(hours=1)).isoformat(),
+            'no_of_persons': 2,
+        }
+        self.booking_url = reverse('async-book-meeting-room', kwargs={'room_id': self.meeting_room.id})
+
+    async def test_requires_authentication(self):
+        response = await self.client.get(reverse('async-meeting-room-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = await self.client.get(reverse('async-meeting-room-list'), headers={'Authorization': 'Bearer invalid'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_book_list_and_my_bookings(self):
+        response = await self.client.post(self.booking_url, self.booking_data, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        booking_id = response.json()['id']
+        self.assertTrue(await OutboxEmail.objects.filter(subject='Meeting Room Booking Confirmation').aexists())
+
+        response = await self.client.post(self.booking_url, self.booking_data, content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self.client.get(
+            reverse('async-meeting-room-list'),
+            {'start_time': self.booking_data['start_time'], 'end_time': self.booking_data['end_time']},
+            **self.auth,
+        )
+        self.assertEqual(response.json(), [])
+
+        response = await self.client.get(reverse('async-my-bookings'), {'scope': 'upcoming'}, **self.auth)
+        self.assertEqual([booking['id'] for booking in response.json()['results']], [booking_id])
+        self.assertIsNone(response.json()['next_cursor'])
+
+    @override_settings(REQUEST_INSTRUMENTATION={'SAMPLE_RATE': 1})
+    async def test_sampled_async_request_counts_its_queries(self):
+        await sync_to_async(create_booking)(self.meeting_room.id, self.user, self.start_time, self.start_time + timezone.timedelta(hours=1), 2)
+
+        with self.assertLogs('apps.core.instrumentation', level='INFO') as logs:
+            response = await self.client.get(reverse('async-my-bookings'), **self.auth)
+        record = json.loads(logs.records[0].getMessage().split(' ', 1)[1])
+        # The bookings page and the user of the token, run by the async ORM in a worker thread
+        self.assertGreaterEqual(record['queries'], 1)
+        self.assertIn(f'desc="{record["queries"]} queries"', response['Server-Timing'])
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+
+    async def test_booking_validation(self):
+        response = await self.client.post(
+            self.booking_url, {**self.booking_data, 'no_of_persons': 10}, content_type='application/json', **self.auth
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = await self.client.post(
+            reverse('async-book-meeting-room', kwargs={'room_id': 999}), self.booking_data,
+            content_type='application/json', **self.auth
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = await self.client.post(
+            self.booking_url, {'start_time': 'invalid'}, content_type='application/json', **self.auth
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('start_time', response.json())
+
+
+class BookingImportExportTestCase(TestCase):
+    def setUp(self):
+        availability_index.reset()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.room = MeetingRoom.objects.create(room_name='Room A', capacity=10)
+        self.start_time = (timezone.now() + timezone.timedelta(days=1)).replace(microsecond=0)
+
+    def booking_record(self, start_hour, end_hour, **overrides):
+        return {
+            'meeting_room_id': self.room.id,
+            'booked_by_email': self.user.email,
+            'start_time': (self.start_time + timezone.timedelta(hours=start_hour)).isoformat(),
+            'end_time': (self.start_time + timezone.timedelta(hours=end_hour)).isoformat(),
+            'no_of_persons': 2,
+            **overrides,
+        }
+
+    def write_ndjson(self, records):
+        path = os.path.join(self.directory, 'bookings.ndjson')
+        with open(path, 'w') as stream:
+            for record in records:
+                stream.write(json.dumps(record) + '\n')
+        return path
+
+    def test_import_rejects_invalid_and_overlapping_records(self):
+        BookingHistory.objects.create(
+            meeting_room=self.room, booked_by=self.user, no_of_persons=2,
+            start_time=self.start_time, end_time=self.start_time + timezone.timedelta(hours=1),
+        )
+        path = self.write_ndjson([
+            self.booking_record(0.5, 1.5),                        # overlaps the existing booking
+            self.booking_record(1, 2),                            # imported
+            self.booking_record(3, 4),                            # imported, in the second batch
+            self.booking_record(3.5, 5),                          # overlaps the previous record
+            self.booking_record(6, 7, no_of_persons=20),          # too many persons
+            self.booking_record(6, 7, booked_by_email='nobody@example.com'),
+            self.booking_record(7, 6),                            # ends before it starts
+        ])
+
+        call_command('import_bookings', path, batch_size=2, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(BookingHistory.objects.count(), 3)
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+        # The imported bookings are visible to the availability index
+        self.assertFalse(availability_index.is_room_free(
+            self.room.id, self.start_time + timezone.timedelta(hours=3), self.start_time + timezone.timedelta(hours=4)
+        ))
+
+    def test_resume_skips_committed_batches(self):
+        path = self.write_ndjson([self.booking_record(hour, hour + 1) for hour in range(4)])
+        write_checkpoint(f'{path}.checkpoint', {'kind': 'bookings', 'source': file_fingerprint(path), 'consumed': 2})
+
+        with self.assertRaises(CommandError):
+            call_command('import_bookings', path, stdout=StringIO(), stderr=StringIO())
+
+        call_command('import_bookings', path, resume=True, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(
+            [booking.start_time for booking in BookingHistory.objects.order_by('start_time')],
+            [self.start_time + timezone.timedelta(hours=hour) for hour in (2, 3)],
+        )
+
+    def test_resume_refuses_a_modified_file(self):
+        path = self.write_ndjson([self.booking_record(hour, hour + 1) for hour in range(4)])
+        write_checkpoint(f'{path}.checkpoint', {'kind': 'bookings', 'source': file_fingerprint(path), 'consumed': 2})
+        # A record inserted before the committed ones would be skipped instead of them
+        self.write_ndjson([self.booking_record(hour, hour + 1) for hour in range(-1, 4)])
+
+        with self.assertRaisesMessage(CommandError, "the file changed since"):
+            call_command('import_bookings', path, resume=True, stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(BookingHistory.objects.exists())
+
+        # Neither is a checkpoint of another file with the same content accepted
+        other_path = os.path.join(self.directory, 'other.ndjson')
+        shutil.copy(path, other_path)
+        write_checkpoint(f'{other_path}.checkpoint', {'kind': 'bookings', 'source': file_fingerprint(path), 'consumed': 2})
+        with self.assertRaises(CommandError):
+            call_command('import_bookings', other_path, resume=True, stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(BookingHistory.objects.exists())
+
+    def test_import_rejects_explicit_ids_that_cannot_be_inserted(self):
+        existing = BookingHistory.objects.create(
+            meeting_room=self.room, booked_by=self.user, no_of_persons=2,
+            start_time=self.start_time, end_time=self.start_time + timezone.timedelta(hours=1),
+        )
+        path = self.write_ndjson([
+            self.booking_record(2, 3, id=existing.id),            # already exists
+            self.booking_record(3, 4, id=existing.id + 100),      # imported
+            self.booking_record(4, 5, id=existing.id + 100),      # repeated in the batch
+            self.booking_record(5, 6, id=10 ** 6 + 1),            # in the range of another site
+        ])
+
+        with override_settings(BOOKING_SITES={'east': {'DATABASE': 'site_shard', 'ID_OFFSET': 10 ** 6}}):
+            call_command('import_bookings', path, stdout=StringIO(), stderr=StringIO())
+            # Running it again skips every record instead of failing on the primary key
+            stderr = StringIO()
+            call_command('import_bookings', path, stdout=StringIO(), stderr=stderr)
+
+        self.assertEqual(
+            list(BookingHistory.objects.order_by('id').values_list('id', flat=True)), [existing.id, existing.id + 100],
+        )
+        self.assertIn(f"id {existing.id + 100} already exists.", stderr.getvalue())
+        self.assertIn("outside the ID range of the current site", stderr.getvalue())
+
+    def test_export_import_round_trip(self):
+        self.room.building, self.room.floor = 'HQ', -1
+        self.room.save()
+        self.room.equipment.set([
+            Equipment.objects.create(code='vc', name='Video conferencing'),
+            Equipment.objects.create(code='projector', name='Projector'),
+        ])
+        for hour in range(3):
+            BookingHistory.objects.create(
+                meeting_room=self.room, booked_by=self.user, no_of_persons=2,
+                start_time=self.start_time + timezone.timedelta(hours=hour),
+                end_time=self.start_time + timezone.timedelta(hours=hour + 1),
+            )
+        rooms_path = os.path.join(self.directory, 'rooms.csv')
+        bookings_path = os.path.join(self.directory, 'bookings.csv')
+        call_command('export_bookings', kind='rooms', output=rooms_path, stderr=StringIO())
+        call_command('export_bookings', output=bookings_path, chunk_size=2, stderr=StringIO())
+        exported = list(BookingHistory.objects.order_by('id').values_list('id', 'start_time', 'end_time'))
+
+        BookingHistory.objects.all().delete()
+        MeetingRoom.objects.all().delete()
+        call_command('import_bookings', rooms_path, kind='rooms', stdout=StringIO(), stderr=StringIO())
+        call_command('import_bookings', bookings_path, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(
+            list(MeetingRoom.objects.values_list('id', 'room_name', 'building', 'floor')), [(self.room.id, 'Room A', 'HQ', -1)],
+        )
+        self.assertEqual(sorted(MeetingRoom.objects.get().equipment.values_list('code', flat=True)), ['projector', 'vc'])
+        self.assertEqual(list(BookingHistory.objects.order_by('id').values_list('id', 'start_time', 'end_time')), exported)
+
+
+    def test_room_import_rejects_unknown_equipment(self):
+        Equipment.objects.create(code='projector', name='Projector')
+        path = self.write_ndjson([
+            {'room_name': 'Room B', 'capacity': 4, 'floor': 2, 'equipment': ['projector']},
+            {'room_name': 'Room C', 'capacity': 4, 'equipment': 'projector,whiteboard'},
+        ])
+        stderr = StringIO()
+        call_command('import_bookings', path, kind='rooms', stdout=StringIO(), stderr=stderr)
+
+        room = MeetingRoom.objects.get(room_name='Room B')
+        self.assertEqual((room.floor, list(room.equipment.values_list('code', flat=True))), (2, ['projector']))
+        self.assertFalse(MeetingRoom.objects.filter(room_name='Room C').exists())
+        self.assertIn("Unknown equipment: whiteboard.", stderr.getvalue())
+
+
+class RoomUsageAnalyticsTestCase(TestCase):
+    def setUp(self):
+        availability_index.reset()
+        self.client = APIClient()
+        self.admin = CustomUser.objects.create_user(email='admin@example.com', password='password', is_staff=True)
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.room = MeetingRoom.objects.create(room_name='Room A', capacity=10)
+        self.day = (timezone.now() + timezone.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.long_booking = create_booking(
+            self.room.id, self.user, self.day + timezone.timedelta(hours=10), self.day + timezone.timedelta(hours=11), 5,
+        )
+        self.short_booking = create_booking(
+            self.room.id, self.user, self.day + timezone.timedelta(hours=11, minutes=30), self.day + timezone.timedelta(hours=12), 1,
+        )
+
+    def rollups(self):
+        return sorted(RoomUsageRollup.objects.values_list(
+            'meeting_room_id', 'period', 'period_start', 'booked_seconds', 'person_seconds', 'bookings',
+        ))
+
+    def test_rollups_follow_bookings_and_cancellations(self):
+        day_rollup = RoomUsageRollup.objects.get(period='day', period_start=self.day)
+        self.assertEqual((day_rollup.booked_seconds, day_rollup.person_seconds, day_rollup.bookings), (5400, 19800, 2))
+        hour_rollup = RoomUsageRollup.objects.get(period='hour', period_start=self.day + timezone.timedelta(hours=11))
+        self.assertEqual((hour_rollup.booked_seconds, hour_rollup.bookings), (1800, 1))
+
+        cancel_booking(self.short_booking)
+        day_rollup.refresh_from_db()
+        self.assertEqual((day_rollup.booked_seconds, day_rollup.person_seconds, day_rollup.bookings), (3600, 18000, 1))
+
+        # A rebuild from the bookings gives the incrementally maintained rollups, without the emptied ones
+        expected = [rollup for rollup in self.rollups() if rollup[3]]
+        self.assertEqual(rebuild_rollups(chunk_size=1, batch_size=2), len(expected))
+        self.assertEqual(self.rollups(), expected)
+
+    @override_settings(BOOKING_ANALYTICS={'NO_SHOW_SEAT_UTILISATION': 0.5, 'NO_SHOW_MIN_BOOKINGS': 2})
+    def test_analytics_endpoint(self):
+        url = reverse('meeting-room-analytics')
+        params = {
+            'period': 'day',
+            'start_time': self.day.isoformat(),
+            'end_time': (self.day + timezone.timedelta(days=1)).isoformat(),
+        }
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(url, params).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.data['rooms'][0]
+        self.assertEqual(report['room_id'], self.room.id)
+        self.assertEqual(report['booked_minutes'], 90)
+        self.assertEqual(report['bookings'], 2)
+        self.assertEqual(report['occupancy'], round(5400 / 86400, 4))
+        self.assertEqual(report['seat_utilisation'], round(19800 / (5400 * 10), 4))
+        self.assertTrue(report['no_show_prone'])
+
+        response = self.client.get(url, {**params, 'period': 'hour', 'series': 'true'})
+        self.assertEqual([entry['booked_minutes'] for entry in response.data['rooms'][0]['series']], [60, 30])
+
+        response = self.client.get(url, {**params, 'period': 'month'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AvailabilityEventsTestCase(TestCase):
+    def setUp(self):
+        reset_event_hub()
+        self.addCleanup(reset_event_hub)
+        self.hub = get_event_hub()
+        self.client = AsyncClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.auth = {'headers': {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}}
+        self.room = MeetingRoom.objects.create(room_name='Room A', capacity=4)
+        self.other_room = MeetingRoom.objects.create(room_name='Room B', capacity=4)
+        self.start_time = timezone.now() + timezone.timedelta(days=1)
+
+    def publish(self, room, event_type='booking.created'):
+        return self.hub.publish('availability', {
+            'type': event_type, 'room_id': room.id, 'booking_id': 1,
+            'start_time': self.start_time.isoformat(), 'end_time': self.start_time.isoformat(),
+        })
+
+    def test_booking_changes_are_published_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = create_booking(self.room.id, self.user, self.start_time, self.start_time + timezone.timedelta(hours=1), 2)
+            self.assertEqual(self.hub.events_after('availability', 0), [])
+        booking_id = booking.id
+        with self.captureOnCommitCallbacks(execute=True):
+            cancel_booking(booking)
+
+        events = [event for _, event in self.hub.events_after('availability', 0)]
+        self.assertEqual([event['type'] for event in events], ['booking.created', 'booking.cancelled'])
+        self.assertEqual(events[1]['booking_id'], booking_id)
+        self.assertEqual(events[1]['room_id'], self.room.id)
+
+    async def test_long_poll_returns_the_events_of_the_requested_rooms(self):
+        url = reverse('availability-events-poll')
+        response = await self.client.get(url, **self.auth)
+        self.assertEqual(response.json(), {'events': [], 'last_event_id': 0})
+
+        self.publish(self.other_room)
+        event_id = self.publish(self.room, 'booking.cancelled')
+        response = await self.client.get(url, {'after': 0, 'rooms': str(self.room.id)}, **self.auth)
+        self.assertEqual([(event['id'], event['type']) for event in response.json()['events']], [(event_id, 'booking.cancelled')])
+        self.assertEqual(response.json()['last_event_id'], event_id)
+
+        # Nothing newer, answered empty once the timeout expires
+        response = await self.client.get(url, {'after': event_id, 'timeout': 0.05}, **self.auth)
+        self.assertEqual(response.json(), {'events': [], 'last_event_id': event_id})
+
+        response = await self.client.get(url, {'after': 'latest'}, **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for timeout in ('nan', 'inf'):
+            response = await self.client.get(url, {'after': event_id, 'timeout': timeout}, **self.auth)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(AVAILABILITY_EVENTS={'STREAM_SECONDS': 0.2, 'HEARTBEAT_SECONDS': 0.05})
+    async def test_event_stream_resumes_after_last_event_id(self):
+        first_id = self.publish(self.room)
+        second_id = self.publish(self.room, 'booking.cancelled')
+        self.publish(self.other_room)
+
+        response = await self.client.get(
+            reverse('availability-events'), {'rooms': str(self.room.id)},
+            headers={**self.auth['headers'], 'Last-Event-ID': str(first_id)},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        self.assertIn(f'id: {second_id}\nevent: booking.cancelled\n', body)
+        self.assertNotIn(f'id: {first_id}\n', body)
+        self.assertEqual(body.count('event: '), 1)
+        self.assertIn(': keepalive', body)
+
+
+class IdempotentBookingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.meeting_room = MeetingRoom.objects.create(room_name='Room A', capacity=10)
+        self.booking_url = reverse('book-meeting-room', kwargs={'room_id': self.meeting_room.id})
+        start_time = timezone.now() + timezone.timedelta(days=1)
+        self.booking_data = {
+            'start_time': start_time.isoformat(),
+            'end_time': (start_time + timezone.timedelta(hours=1)).isoformat(),
+            'no_of_persons': 2,
+        }
+
+    def test_retried_booking_replays_the_original_response(self):
+        response = self.client.post(self.booking_url, self.booking_data, format='json', HTTP_IDEMPOTENCY_KEY='book-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # Served from the cache front without touching the database
+        with CaptureQueriesContext(connection) as queries:
+            replay = self.client.post(self.booking_url, self.booking_data, format='json', HTTP_IDEMPOTENCY_KEY='book-1')
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.json(), response.json())
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(len(queries), 0)
+
+        # And from the database once the cache entry is gone
+        cache.clear()
+        replay = self.client.post(self.booking_url, self.booking_data, format='json', HTTP_IDEMPOTENCY_KEY='book-1')
+        self.assertEqual(replay.json()['id'], response.json()['id'])
+        self.assertEqual(BookingHistory.objects.count(), 1)
+
+    def test_key_reused_for_another_request_is_rejected(self):
+        self.client.post(self.booking_url, self.booking_data, format='json', HTTP_IDEMPOTENCY_KEY='book-1')
+        response = self.client.post(
+            self.booking_url, {**self.booking_data, 'no_of_persons': 3}, format='json', HTTP_IDEMPOTENCY_KEY='book-1',
+        )
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(BookingHistory.objects.count(), 1)
+
+    def test_key_in_progress_and_expired_keys(self):
+        self.client.post(self.booking_url, self.booking_data, format='json', HTTP_IDEMPOTENCY_KEY='book-1')
+        cache.clear()
+        IdempotencyKey.objects.update(status_code=None)
+        response = self.client.post(self.booking_url, self.booking_data, format='json', HTTP_IDEMPOTENCY_KEY='book-1')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        # An expired key is handled as a new request
+        BookingHistory.objects.all().delete()
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timezone.timedelta(seconds=1))
+        response = self.client.post(self.booking_url, self.booking_data, format='json', HTTP_IDEMPOTENCY_KEY='book-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timezone.timedelta(seconds=1))
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_response_is_stored_in_the_booking_transaction(self):
+        # The worker dies after the booking committed, before the wrapper ran again
+        with mock.patch('apps.core.idempotency.cache_response', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(self.booking_url, self.booking_data, format='json', HTTP_IDEMPOTENCY_KEY='book-1')
+        self.assertEqual(IdempotencyKey.objects.get().status_code, status.HTTP_201_CREATED)
+
+        # Even once the lock expired, the retry replays the response instead of booking again
+        IdempotencyKey.objects.update(created_at=timezone.now() - timezone.timedelta(hours=1))
+        replay = self.client.post(self.booking_url, self.booking_data, format='json', HTTP_IDEMPOTENCY_KEY='book-1')
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.json()['id'], BookingHistory.objects.get().id)
+
+    def test_side_effect_of_a_reclaimed_key_is_rolled_back(self):
+        def reclaim(*args):
+            # What a retry does once the request has been in progress for longer than LOCK_SECONDS
+            IdempotencyKey.objects.filter(status_code__isnull=True).delete()
+
+        with mock.patch('apps.booking.services.queue_confirmation_email', side_effect=reclaim):
+            response = self.client.post(self.booking_url, self.booking_data, format='json', HTTP_IDEMPOTENCY_KEY='book-1')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(BookingHistory.objects.exists())
+
+        # The key left in progress proves that nothing committed, so it is reclaimed once LOCK_SECONDS passed
+        IdempotencyKey.objects.update(created_at=timezone.now() - timezone.timedelta(hours=1))
+        response = self.client.post(self.booking_url, self.booking_data, format='json', HTTP_IDEMPOTENCY_KEY='book-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(BookingHistory.objects.count(), 1)
+
+    def test_retried_cancellation_replays_the_original_response(self):
+        booking_id = self.client.post(self.booking_url, self.booking_data, format='json').json()['id']
+        cancel_url = reverse('cancel-meeting-room-booking', kwargs={'booking_id': booking_id})
+
+        response = self.client.delete(cancel_url, HTTP_IDEMPOTENCY_KEY='cancel-1')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        replay = self.client.delete(cancel_url, HTTP_IDEMPOTENCY_KEY='cancel-1')
+        self.assertEqual(replay.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.client.delete(cancel_url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class WaitlistTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        availability_index.reset()
+        self.owner = CustomUser.objects.create_user(email='owner@example.com', password='password')
+        self.first = CustomUser.objects.create_user(email='first@example.com', password='password')
+        self.second = CustomUser.objects.create_user(email='second@example.com', password='password')
+        self.meeting_room = MeetingRoom.objects.create(room_name='Room A', capacity=6)
+        self.start_time = timezone.now() + timezone.timedelta(days=1)
+        self.end_time = self.start_time + timezone.timedelta(hours=1)
+        self.booking = create_booking(self.meeting_room.id, self.owner, self.start_time, self.end_time, 2)
+        self.client = APIClient()
+
+    def join(self, user, no_of_persons, start_time=None):
+        self.client.force_authenticate(user=user)
+        start_time = start_time or self.start_time
+        return self.client.post(reverse('join-meeting-room-waitlist', kwargs={'room_id': self.meeting_room.id}), {
+            'start_time': start_time.isoformat(),
+            'end_time': (start_time + timezone.timedelta(hours=1)).isoformat(),
+            'no_of_persons': no_of_persons,
+        }, format='json')
+
+    def test_cancellation_books_the_first_waiting_user_that_fits(self):
+        self.assertEqual(self.join(self.first, 5).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.join(self.second, 3).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.join(self.second, 3).status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(WaitlistPromotion.objects.exists())
+        # The room shrank since the first user joined
+        MeetingRoom.objects.filter(pk=self.meeting_room.pk).update(capacity=4)
+
+        cancel_booking(BookingHistory.objects.select_related('meeting_room', 'booked_by').get(pk=self.booking.pk))
+        # Promotion runs off the request path
+        self.assertEqual(WaitlistPromotion.objects.count(), 1)
+        self.assertFalse(BookingHistory.objects.exists())
+
+        out = StringIO()
+        call_command('promote_waitlist', stdout=out)
+        self.assertIn('1 users booked', out.getvalue())
+        booking = BookingHistory.objects.get()
+        self.assertEqual((booking.booked_by, booking.no_of_persons), (self.second, 3))
+        self.assertEqual(
+            dict(WaitlistEntry.objects.values_list('user__email', 'status')),
+            {'first@example.com': 'waiting', 'second@example.com': 'promoted'},
+        )
+        self.assertTrue(OutboxEmail.objects.filter(recipient='second@example.com', subject='Meeting Room Booking Confirmation').exists())
+        self.assertFalse(WaitlistPromotion.objects.exists())
+
+    def test_joining_a_free_slot_books_it_and_cancelling_without_waiters_queues_nothing(self):
+        cancel_booking(BookingHistory.objects.select_related('meeting_room', 'booked_by').get(pk=self.booking.pk))
+        self.assertFalse(WaitlistPromotion.objects.exists())
+
+        self.assertEqual(self.join(self.first, 2).status_code, status.HTTP_201_CREATED)
+        call_command('promote_waitlist', stdout=StringIO())
+        self.assertEqual(BookingHistory.objects.get().booked_by, self.first)
+
+    def test_list_leave_and_expire_entries(self):
+        response = self.join(self.first, 2)
+        self.assertEqual(self.join(self.first, 2, start_time=timezone.now() - timezone.timedelta(hours=1)).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse('my-waitlist')).data['results'][0]['id'], response.data['id'])
+
+        leave_url = reverse('leave-meeting-room-waitlist', kwargs={'entry_id': response.data['id']})
+        self.assertEqual(self.client.delete(leave_url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.delete(leave_url).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.join(self.second, 2)
+        WaitlistEntry.objects.update(start_time=timezone.now() - timezone.timedelta(minutes=1))
+        call_command('promote_waitlist', stdout=StringIO())
+        self.assertEqual(WaitlistEntry.objects.get().status, WaitlistEntry.STATUS_EXPIRED)
+
+
+class BookingHoldTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        availability_index.reset()
+        self.holder = CustomUser.objects.create_user(email='holder@example.com', password='password')
+        self.other = CustomUser.objects.create_user(email='other@example.com', password='password')
+        self.meeting_room = MeetingRoom.objects.create(room_name='Room A', capacity=6)
+        self.client = APIClient()
+        start_time = timezone.now() + timezone.timedelta(days=1)
+        self.window = {
+            'start_time': start_time.isoformat(),
+            'end_time': (start_time + timezone.timedelta(hours=1)).isoformat(),
+            'no_of_persons': 2,
+        }
+
+    def hold(self):
+        self.client.force_authenticate(user=self.holder)
+        response = self.client.post(reverse('hold-meeting-room', kwargs={'room_id': self.meeting_room.id}), self.window, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def available_room_ids(self):
+        self.client.force_authenticate(user=self.other)
+        response = self.client.get(reverse('meeting-room-list'), {key: self.window[key] for key in ('start_time', 'end_time')})
+        return [room['id'] for room in response.data]
+
+    def test_hold_blocks_the_range_until_confirmed_into_a_booking(self):
+        hold_id = self.hold()
+        self.assertEqual(self.available_room_ids(), [])
+        self.assertEqual(self.client.get(reverse('meeting-room-search'), self.window).data['rooms'], [])
+        book_url = reverse('book-meeting-room', kwargs={'room_id': self.meeting_room.id})
+        self.assertEqual(self.client.post(book_url, self.window, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(OutboxEmail.objects.exists())
+
+        self.client.force_authenticate(user=self.holder)
+        confirm_url = reverse('confirm-meeting-room-hold', kwargs={'hold_id': hold_id})
+        response = self.client.post(confirm_url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        booking = BookingHistory.objects.get(pk=response.data['id'])
+        self.assertEqual((booking.booked_by, booking.no_of_persons), (self.holder, 2))
+        self.assertFalse(BookingHold.objects.exists())
+        self.assertEqual(list(OutboxEmail.objects.values_list('subject', flat=True)), ['Meeting Room Booking Confirmation'])
+        self.assertEqual(self.client.post(confirm_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.available_room_ids(), [])
+
+    def test_expired_holds_stop_blocking_and_are_swept(self):
+        hold_id = self.hold()
+        self.client.force_authenticate(user=self.other)
+        self.client.post(reverse('join-meeting-room-waitlist', kwargs={'room_id': self.meeting_room.id}), self.window, format='json')
+        self.assertFalse(WaitlistPromotion.objects.exists())
+
+        BookingHold.objects.update(expires_at=timezone.now() - timezone.timedelta(seconds=1))
+        self.assertEqual(self.available_room_ids(), [self.meeting_room.id])
+        self.client.force_authenticate(user=self.holder)
+        self.assertEqual(self.client.post(reverse('confirm-meeting-room-hold', kwargs={'hold_id': hold_id})).status_code, status.HTTP_410_GONE)
+
+        out = StringIO()
+        call_command('expire_holds', stdout=out)
+        self.assertIn('Deleted 1 expired holds', out.getvalue())
+        self.assertFalse(BookingHold.objects.exists())
+        # The waiting user gets the freed range
+        self.assertEqual(WaitlistPromotion.objects.count(), 1)
+
+    def test_released_hold_frees_the_range(self):
+        hold_id = self.hold()
+        release_url = reverse('release-meeting-room-hold', kwargs={'hold_id': hold_id})
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.delete(release_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=self.holder)
+        self.assertEqual(self.client.delete(release_url).status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.available_room_ids(), [self.meeting_room.id])
+
+
+@override_settings(BOOKING_SITES={'paris': {'DATABASE': 'site_shard', 'ID_OFFSET': 10 ** 6}})
+class SiteShardingTestCase(TransactionTestCase):
+    databases = {'default', 'site_shard'}
+
+    def setUp(self):
+        cache.clear()
+        availability_index.reset()
+        reserve_site_id_ranges(using='site_shard')
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.local_room = MeetingRoom.objects.create(room_name='London Room', capacity=6)
+        with use_site('paris'):
+            self.paris_room = MeetingRoom.objects.create(room_name='Paris Room', capacity=6)
+        self.start_time = timezone.now() + timezone.timedelta(days=1)
+
+    def book(self, room, start_time, **headers):
+        return self.client.post(reverse('book-meeting-room', kwargs={'room_id': room.id}), {
+            'start_time': start_time.isoformat(),
+            'end_time': (start_time + timezone.timedelta(hours=1)).isoformat(),
+        }, format='json', **headers)
+
+    def test_bookings_are_stored_on_the_database_of_their_site(self):
+        self.assertGreater(self.paris_room.id, 10 ** 6)
+        response = self.book(self.paris_room, self.start_time, HTTP_X_BOOKING_SITE='paris')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(BookingHistory.objects.using('site_shard').get().id, response.data['id'])
+        self.assertFalse(BookingHistory.objects.using('default').exists())
+        # The confirmation email is queued in the transaction of the booking, users stay on the shared database
+        self.assertEqual(OutboxEmail.objects.using('site_shard').count(), 1)
+        self.assertFalse(CustomUser.objects.using('site_shard').exists())
+
+        # Without the site the room is not found on the default database
+        self.assertEqual(self.book(self.paris_room, self.start_time).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('meeting-room-list'), {'site': 'nowhere'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+        cancel_url = reverse('cancel-meeting-room-booking', kwargs={'booking_id': response.data['id']})
+        self.assertEqual(self.client.delete(cancel_url, HTTP_X_BOOKING_SITE='paris').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(BookingHistory.objects.using('site_shard').exists())
+
+    def test_my_bookings_merges_every_site(self):
+        self.book(self.paris_room, self.start_time + timezone.timedelta(hours=2), HTTP_X_BOOKING_SITE='paris')
+        self.book(self.local_room, self.start_time + timezone.timedelta(hours=1))
+        self.book(self.paris_room, self.start_time, HTTP_X_BOOKING_SITE='paris')
+
+        response = self.client.get(reverse('my-bookings'), {'page_size': 2})
+        results = response.data['results']
+        self.assertEqual([booking['site'] for booking in results], ['paris', None])
+        self.assertEqual(results[1]['meeting_room']['room_name'], 'London Room')
+        response = self.client.get(reverse('my-bookings'), {'page_size': 2, 'cursor': response.data['next_cursor']})
+        self.assertEqual([booking['meeting_room']['room_name'] for booking in response.data['results']], ['Paris Room'])
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_sampled_request_counts_the_queries_of_every_database(self):
+        self.book(self.paris_room, self.start_time, HTTP_X_BOOKING_SITE='paris')
+        self.book(self.local_room, self.start_time)
+
+        with override_settings(REQUEST_INSTRUMENTATION={'SAMPLE_RATE': 1}):
+            with self.assertLogs('apps.core.instrumentation', level='INFO') as logs:
+                response = self.client.get(reverse('my-bookings'))
+        record = json.loads(logs.records[0].getMessage().split(' ', 1)[1])
+        # One page query per database, run by the site fan-out threads
+        self.assertGreaterEqual(record['queries'], 2)
+        self.assertIn(f'desc="{record["queries"]} queries"', response['Server-Timing'])
+
+    def test_idempotency_keys_are_stored_with_the_bookings_of_their_site(self):
+        response = self.book(self.paris_room, self.start_time, HTTP_X_BOOKING_SITE='paris', HTTP_IDEMPOTENCY_KEY='book-1')
+        self.assertEqual(IdempotencyKey.objects.using('site_shard').get().response_body['id'], response.data['id'])
+        self.assertFalse(IdempotencyKey.objects.using('default').exists())
+
+        cache.clear()
+        replay = self.book(self.paris_room, self.start_time, HTTP_X_BOOKING_SITE='paris', HTTP_IDEMPOTENCY_KEY='book-1')
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        # Sites sharing a database share its keys, the site is part of the request
+        sites = {'paris': {'DATABASE': 'site_shard', 'ID_OFFSET': 10 ** 6}, 'lyon': {'DATABASE': 'site_shard', 'ID_OFFSET': 10 ** 6}}
+        with override_settings(BOOKING_SITES=sites):
+            response = self.book(self.paris_room, self.start_time, HTTP_X_BOOKING_SITE='lyon', HTTP_IDEMPOTENCY_KEY='book-1')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_deleting_a_user_deletes_their_site_bookings(self):
+        self.book(self.paris_room, self.start_time, HTTP_X_BOOKING_SITE='paris')
+        self.user.delete()
+        self.assertFalse(BookingHistory.objects.using('site_shard').exists())
+
+
+@override_settings(READ_REPLICAS={'DATABASES': {'default': ['replica']}, 'PIN_SECONDS': 10, 'CACHE_ALIAS': 'default'})
+class ReadReplicaTestCase(TransactionTestCase):
+    # 'replica' is a separate, empty database: it stands in for a replica that has not caught up yet
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        availability_index.reset()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.room = MeetingRoom.objects.create(room_name='Room', capacity=6)
+        self.start_time = timezone.now() + timezone.timedelta(days=1)
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self):
+        with use_replicas():
+            self.assertEqual(router.db_for_read(BookingHistory), 'replica')
+            self.assertEqual(router.db_for_read(CustomUser), 'replica')
+            self.assertEqual(router.db_for_write(BookingHistory), 'default')
+            # An instance loaded from the replica is saved on the primary
+            room = MeetingRoom(id=self.room.id)
+            room._state.db = 'replica'
+            self.assertEqual(router.db_for_write(MeetingRoom, instance=room), 'default')
+        self.assertEqual(router.db_for_read(BookingHistory), 'default')
+
+    def test_users_read_their_own_writes_from_the_primary(self):
+        response = self.client.post(reverse('book-meeting-room', kwargs={'room_id': self.room.id}), {
+            'start_time': self.start_time.isoformat(),
+            'end_time': (self.start_time + timezone.timedelta(hours=1)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # Pinned to the primary after booking
+        self.assertEqual(len(self.client.get(reverse('my-bookings')).data['results']), 1)
+        self.assertEqual(len(self.client.get(reverse('meeting-room-search')).data['rooms']), 1)
+
+        # Once the pin expires, reads go to the lagging replica
+        cache.delete(pin_key(self.user.pk))
+        self.assertEqual(self.client.get(reverse('my-bookings')).data['results'], [])
+        self.assertEqual(self.client.get(reverse('meeting-room-search')).data['rooms'], [])
+
+    def test_shared_caches_are_filled_from_the_primary(self):
+        response = self.client.get(reverse('meeting-room-list'), {
+            'start_time': self.start_time.isoformat(),
+            'end_time': (self.start_time + timezone.timedelta(hours=1)).isoformat(),
+        })
+        self.assertEqual([room['room_name'] for room in response.data], ['Room'])
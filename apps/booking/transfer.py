@@ -0,0 +1,537 @@
+import csv
+import hashlib
+import json
+import os
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.booking.analytics import record_usage
+from apps.booking.cache import bump_rooms_version
+from apps.booking.models import ArchivedBookingHistory, BookingHistory, Equipment, MeetingRoom
+from apps.booking.services import busy_intervals_for_rooms, room_lock, sweep_conflicts
+from apps.booking.signals import bookings_bulk_created, room_changed
+from apps.core.routers import booking_database, site_id_range
+from apps.member.models import CustomUser
+
+FORMATS = ('csv', 'ndjson')
+
+# Separator of the equipment codes of a room, as in the room search filter
+EQUIPMENT_SEPARATOR = ','
+
+# Columns of every kind of record, in export order; id is optional on import
+COLUMNS = {
+    'rooms': ('id', 'room_name', 'capacity', 'is_active', 'building', 'floor', 'equipment'),
+    'bookings': ('id', 'meeting_room_id', 'booked_by_email', 'start_time', 'end_time', 'no_of_persons'),
+}
+
+
+class ImportRowError(ValueError):
+    """
+    Raised for a record that cannot be imported; the record is skipped and reported.
+    """
+
+
+def detect_format(path):
+    """
+    Returns the format of a file from its extension, csv unless it is .ndjson or .jsonl.
+    """
+    return 'ndjson' if os.path.splitext(path)[1].lower() in ('.ndjson', '.jsonl') else 'csv'
+
+
+def read_records(stream, file_format):
+    """
+    Lazily yields the (line number, record dict) pairs of a CSV or NDJSON stream.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            yield line_number, ImportRowError(f"Invalid JSON: {error}")
+            continue
+        yield line_number, record if isinstance(record, dict) else ImportRowError("Expected a JSON object.")
+
+
+def write_records(stream, file_format, columns, rows):
+    """
+    Writes rows (tuples in the order of columns) to a CSV or NDJSON stream, one at a time.
+
+    Returns:
+    - int: Number of rows written.
+    """
+    written = 0
+    writer = None
+    if file_format == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(columns)
+    for row in rows:
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in row]
+        if writer is not None:
+            writer.writerow(values)
+        else:
+            stream.write(json.dumps(dict(zip(columns, values))) + '\n')
+        written += 1
+    return written
+
+
+def export_rows(kind, chunk_size=2000, start_time=None, end_time=None):
+    """
+    Returns an iterator over the rooms or bookings to export, as tuples in the order of COLUMNS[kind].
+
+    Rows are streamed from a server side cursor (or fetched chunk_size at a
+    time where the database has none) with QuerySet.iterator(), so exporting
+    millions of bookings keeps memory flat. Rooms are exported with their
+    building, floor and separated equipment codes. Bookings may be
+    restricted to those overlapping [start_time, end_time).
+    """
+    if kind == 'rooms':
+        fields = ('id', 'room_name', 'capacity', 'is_active', 'building', 'floor')
+        rows = MeetingRoom.objects.order_by('id').values_list(*fields).iterator(chunk_size=chunk_size)
+        return with_equipment_codes(rows, chunk_size)
+
+    queryset = BookingHistory.objects.order_by('id')
+    if start_time is not None:
+        queryset = queryset.filter(end_time__gt=start_time)
+    if end_time is not None:
+        queryset = queryset.filter(start_time__lt=end_time)
+    fields = ('id', 'meeting_room_id', 'booked_by_id', 'start_time', 'end_time', 'no_of_persons')
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    return with_booker_emails(rows, chunk_size)
+
+
+def with_equipment_codes(rows, chunk_size):
+    """
+    Appends the separated equipment codes of every room row, one query per chunk.
+    """
+    through = MeetingRoom.equipment.through
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        codes = {}
+        links = through.objects.filter(meetingroom_id__in=[row[0] for row in chunk]).order_by('equipment__code')
+        for room_id, code in links.values_list('meetingroom_id', 'equipment__code'):
+            codes.setdefault(room_id, []).append(code)
+        for row in chunk:
+            yield row + (EQUIPMENT_SEPARATOR.join(codes.get(row[0], [])),)
+
+
+def with_booker_emails(rows, chunk_size):
+    """
+    Replaces the booked_by_id of booking rows with the user's email, one query per chunk.
+
+    Users are not joined in SQL since they live on the default database while
+    the bookings may be on a site database.
+    """
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        emails = dict(CustomUser.objects.filter(id__in={row[2] for row in chunk}).values_list('id', 'email'))
+        for row in chunk:
+            yield row[:2] + (emails.get(row[2]),) + row[3:]
+
+
+def parse_int(value, name, minimum):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(f"{name} must be an integer.")
+    if number < minimum:
+        raise ImportRowError(f"{name} must be at least {minimum}.")
+    return number
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    if value in (None, ''):
+        return True
+    if str(value).strip().lower() in ('1', 'true', 'yes'):
+        return True
+    if str(value).strip().lower() in ('0', 'false', 'no'):
+        return False
+    raise ImportRowError("is_active must be a boolean.")
+
+
+def parse_time(value, name):
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ImportRowError(f"{name} must be an ISO 8601 datetime.")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_floor(value):
+    if value in (None, ''):
+        return None
+    try:
+        floor = int(value)
+    except (TypeError, ValueError):
+        raise ImportRowError("floor must be an integer.")
+    if not -32768 <= floor <= 32767:
+        raise ImportRowError("floor is out of range.")
+    return floor
+
+
+def parse_equipment_codes(value):
+    # A list in NDJSON, separated codes in CSV
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        value = value.split(EQUIPMENT_SEPARATOR)
+    if not isinstance(value, list):
+        raise ImportRowError("equipment must be a list of equipment codes.")
+    return sorted({str(code).strip() for code in value if str(code).strip()})
+
+
+def parse_optional_id(record):
+    value = record.get('id')
+    return None if value in (None, '') else parse_int(value, 'id', 1)
+
+
+def check_explicit_ids(items, models):
+    """
+    Rejects the explicit ids that cannot be inserted on the current site's database.
+
+    An id is rejected when it is outside the ID range of the site (see
+    site_id_range), already taken in the table of one of models or repeated
+    within the batch, so bulk_create never fails on a primary key clash.
+
+    Parameters:
+    - items (list): (line number, id or None, value) tuples.
+    - models (tuple): Models whose tables share the ID space.
+
+    Returns:
+    - tuple: The values of the accepted items and the (line number, message) errors.
+    """
+    lower, upper = site_id_range(booking_database())
+    explicit_ids = {item_id for _, item_id, _ in items if item_id is not None}
+    taken = set()
+    for model in models if explicit_ids else ():
+        taken.update(model.objects.filter(pk__in=explicit_ids).values_list('pk', flat=True))
+
+    accepted, errors, seen = [], [], set()
+    for line_number, item_id, value in items:
+        if item_id is not None:
+            if item_id <= lower or (upper is not None and item_id > upper):
+                errors.append((line_number, f"id {item_id} is outside the ID range of the current site."))
+                continue
+            if item_id in taken:
+                errors.append((line_number, f"id {item_id} already exists."))
+                continue
+            if item_id in seen:
+                errors.append((line_number, f"id {item_id} is repeated in the batch."))
+                continue
+            seen.add(item_id)
+        accepted.append(value)
+    return accepted, errors
+
+
+def build_rooms(records):
+    """
+    Validates a batch of room records.
+
+    The equipment codes of the batch are resolved with one query; the
+    Equipment of every room is kept in its imported_equipment attribute
+    until the room is inserted.
+
+    Returns:
+    - tuple: The MeetingRoom instances to insert and the (line number, message) errors.
+    """
+    parsed, errors = [], []
+    for line_number, record in records:
+        try:
+            if isinstance(record, ImportRowError):
+                raise record
+            room_name = str(record.get('room_name') or '').strip()
+            if not room_name:
+                raise ImportRowError("room_name is required.")
+            building = str(record.get('building') or '').strip()
+            if len(building) > MeetingRoom._meta.get_field('building').max_length:
+                raise ImportRowError("building is too long.")
+            room = MeetingRoom(
+                id=parse_optional_id(record),
+                room_name=room_name,
+                capacity=parse_int(record.get('capacity'), 'capacity', 1),
+                is_active=parse_bool(record.get('is_active')),
+                building=building,
+                floor=parse_floor(record.get('floor')),
+            )
+            parsed.append((line_number, room, parse_equipment_codes(record.get('equipment'))))
+        except ImportRowError as error:
+            errors.append((line_number, str(error)))
+
+    codes = {code for _, _, room_codes in parsed for code in room_codes}
+    equipment = Equipment.objects.filter(code__in=codes).in_bulk(field_name='code') if codes else {}
+    rooms = []
+    for line_number, room, room_codes in parsed:
+        unknown = [code for code in room_codes if code not in equipment]
+        if unknown:
+            errors.append((line_number, f"Unknown equipment: {', '.join(unknown)}."))
+            continue
+        room.imported_equipment = [equipment[code] for code in room_codes]
+        rooms.append((line_number, room.id, room))
+    rooms, id_errors = check_explicit_ids(rooms, (MeetingRoom,))
+    return rooms, sorted(errors + id_errors)
+
+
+def build_bookings(records):
+    """
+    Validates a batch of booking records.
+
+    Rooms and users are loaded with one query each. The accepted bookings of
+    every room are then checked against the existing bookings and each other
+    with a sort and sweep, as in create_bookings_bulk, so conflicts within the
+    file and with bookings imported by earlier batches are both rejected.
+    Input sorted by start time keeps the window loaded per batch small.
+
+    Returns:
+    - tuple: The BookingHistory instances to insert and the (line number, message) errors.
+    """
+    parsed, errors = [], []
+    for line_number, record in records:
+        try:
+            if isinstance(record, ImportRowError):
+                raise record
+            start_time = parse_time(record.get('start_time'), 'start_time')
+            end_time = parse_time(record.get('end_time'), 'end_time')
+            if start_time >= end_time:
+                raise ImportRowError("start_time must be before end_time.")
+            parsed.append({
+                'line_number': line_number,
+                'id': parse_optional_id(record),
+                'room_id': parse_int(record.get('meeting_room_id'), 'meeting_room_id', 1),
+                'email': str(record.get('booked_by_email') or '').strip(),
+                'start_time': start_time,
+                'end_time': end_time,
+                'no_of_persons': parse_int(record.get('no_of_persons'), 'no_of_persons', 1),
+            })
+        except ImportRowError as error:
+            errors.append((line_number, str(error)))
+    # Archived bookings keep their id, so it stays taken
+    parsed, id_errors = check_explicit_ids(
+        [(item['line_number'], item['id'], item) for item in parsed], (BookingHistory, ArchivedBookingHistory),
+    )
+    errors.extend(id_errors)
+    if not parsed:
+        return [], sorted(errors)
+
+    meeting_rooms = MeetingRoom.objects.in_bulk({item['room_id'] for item in parsed})
+    users = CustomUser.objects.filter(email__in={item['email'] for item in parsed}).in_bulk(field_name='email')
+
+    requests_by_room = {}
+    for item in parsed:
+        meeting_room = meeting_rooms.get(item['room_id'])
+        if meeting_room is None:
+            errors.append((item['line_number'], "Meeting room not found."))
+        elif item['email'] not in users:
+            errors.append((item['line_number'], "User not found."))
+        elif meeting_room.capacity < item['no_of_persons']:
+            errors.append((item['line_number'], "Insufficient capacity."))
+        else:
+            requests_by_room.setdefault(item['room_id'], []).append(item)
+
+    accepted = []
+    if requests_by_room:
+        busy = busy_intervals_for_rooms(
+            list(requests_by_room),
+            min(item['start_time'] for items in requests_by_room.values() for item in items),
+            max(item['end_time'] for items in requests_by_room.values() for item in items),
+        )
+        for room_id, items in requests_by_room.items():
+            conflicts = sweep_conflicts(
+                busy[room_id], [(item['start_time'], item['end_time'], item['line_number']) for item in items],
+            )
+            for item in items:
+                if item['line_number'] in conflicts:
+                    errors.append((item['line_number'], "Overlaps another booking of the meeting room."))
+                else:
+                    accepted.append(item)
+
+    bookings = [
+        BookingHistory(
+            id=item['id'],
+            meeting_room=meeting_rooms[item['room_id']],
+            booked_by=users[item['email']],
+            start_time=item['start_time'],
+            end_time=item['end_time'],
+            no_of_persons=item['no_of_persons'],
+        )
+        for item in sorted(accepted, key=lambda item: item['line_number'])
+    ]
+    return bookings, sorted(errors)
+
+
+def record_room_ids(records):
+    room_ids = set()
+    for _, record in records:
+        if isinstance(record, dict):
+            try:
+                room_ids.add(int(record.get('meeting_room_id')))
+            except (TypeError, ValueError):
+                continue
+    return room_ids
+
+
+def import_batch(kind, records):
+    """
+    Validates and inserts one batch of records in its own transaction.
+
+    Returns:
+    - tuple: Number of records inserted and the (line number, message) errors.
+    """
+    model = MeetingRoom if kind == 'rooms' else BookingHistory
+    room_ids = set() if kind == 'rooms' else record_room_ids(records)
+    using = booking_database()
+    with room_lock(*room_ids), transaction.atomic(using=using):
+        if kind == 'rooms':
+            objects, errors = build_rooms(records)
+        else:
+            # Like create_bookings_bulk, no booking of these rooms can slip in between the check and the insert
+            list(MeetingRoom.objects.select_for_update().filter(pk__in=room_ids).values_list('id', flat=True))
+            objects, errors = build_bookings(records)
+        if not objects:
+            return 0, errors
+
+        if kind == 'rooms' and not connections[using].features.can_return_rows_from_bulk_insert:
+            # The equipment links need the ids of the new rooms
+            for room in objects:
+                room.save(using=using)
+        else:
+            model.objects.bulk_create(objects)
+        if kind == 'rooms':
+            through = MeetingRoom.equipment.through
+            through.objects.bulk_create([
+                through(meetingroom_id=room.id, equipment_id=equipment.id)
+                for room in objects for equipment in room.imported_equipment
+            ])
+        else:
+            record_usage(objects)
+        if any(obj.id is not None for obj in objects):
+            # Explicit ids do not advance the primary key sequence (PostgreSQL, Oracle), like loaddata
+            with connections[using].cursor() as cursor:
+                for sql in connections[using].ops.sequence_reset_sql(no_style(), [model]):
+                    cursor.execute(sql)
+
+        # bulk_create skips the signals that keep the caches in sync
+        if kind == 'rooms':
+            bump_rooms_version()
+            transaction.on_commit(bump_rooms_version, using=using)
+            for room in objects:
+                if room.id is not None:
+                    room_changed(room.id)
+        elif all(booking.id is not None for booking in objects):
+            bookings_bulk_created.send(sender=BookingHistory, bookings=objects)
+        else:
+            # Without RETURNING the new ids are unknown, so the affected rooms are reloaded instead
+            for room_id in {booking.meeting_room_id for booking in objects}:
+                room_changed(room_id)
+    return len(objects), errors
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """
+    Returns the absolute path, size and SHA-256 of a file, recorded in import checkpoints.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            digest.update(chunk)
+    return {'path': os.path.abspath(path), 'size': os.path.getsize(path), 'sha256': digest.hexdigest()}
+
+
+def read_checkpoint(path):
+    try:
+        with open(path) as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, checkpoint):
+    # Replaced atomically, so a crash never leaves a truncated checkpoint
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w') as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(temporary_path, path)
+
+
+def import_records(kind, records, batch_size=1000, checkpoint_path=None, resume=False, on_batch=None, source=None):
+    """
+    Imports a stream of room or booking records in batches.
+
+    Every batch is validated and inserted with bulk_create in its own
+    transaction. Invalid and overlapping records are skipped and reported,
+    the others are kept. After each committed batch the number of records
+    consumed is written to the checkpoint file, so an import that failed
+    half way can be resumed without inserting the committed batches twice.
+    The checkpoint also records the source file, and resuming from a
+    checkpoint of another or a modified file is refused, as the count would
+    then skip the wrong records. The checkpoint is removed once the whole
+    stream is imported.
+
+    Parameters:
+    - kind (str): 'rooms' or 'bookings'.
+    - records (iterable): (line number, record dict) pairs, e.g. from read_records.
+    - batch_size (int): Records per transaction and INSERT.
+    - checkpoint_path (str, optional): File recording the progress of the import.
+    - resume (bool): Skip the records consumed according to the checkpoint.
+    - on_batch (callable, optional): Called after every batch with the running totals and the
+      (line number, message) errors of the batch.
+    - source (dict, optional): file_fingerprint of the file the records are read from.
+
+    Returns:
+    - dict: Numbers of records consumed, imported and skipped.
+
+    Raises:
+    - ValueError: When resuming an import of another kind or file, or a batch violates a database constraint.
+    """
+    totals = {'consumed': 0, 'imported': 0, 'skipped': 0}
+    records = iter(records)
+    if resume and checkpoint_path:
+        checkpoint = read_checkpoint(checkpoint_path)
+        if checkpoint is not None:
+            if checkpoint['kind'] != kind:
+                raise ValueError(f"The checkpoint belongs to an import of {checkpoint['kind']}.")
+            if checkpoint.get('source') != source:
+                raise ValueError(
+                    "The checkpoint belongs to an import of another file, or the file changed since: "
+                    "delete the checkpoint to start over."
+                )
+            totals['consumed'] = checkpoint['consumed']
+            # Consumes the records of the committed batches without validating them again
+            for _ in islice(records, checkpoint['consumed']):
+                pass
+
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        try:
+            imported, errors = import_batch(kind, batch)
+        except IntegrityError as error:
+            # e.g. an id inserted concurrently since the check; the batch was rolled back and can be resumed
+            raise ValueError(f"The batch of lines {batch[0][0]}-{batch[-1][0]} could not be inserted: {error}")
+        totals['consumed'] += len(batch)
+        totals['imported'] += imported
+        totals['skipped'] += len(errors)
+        if checkpoint_path:
+            write_checkpoint(checkpoint_path, {'kind': kind, 'source': source, 'consumed': totals['consumed']})
+        if on_batch is not None:
+            on_batch(totals, errors)
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return totals
@@ -1,17 +1,64 @@
 from django.urls import path
 
-from rest_api.booking.api import CancelMeetingRoomBookingView, MeetingRoomBookingView, MeetingRoomListView, MyBookingsView
+from rest_api.booking.api import AllocateMeetingRoomView, BookingCacheStatsView, ConfirmMeetingRoomHoldView, LeaveWaitlistView, MeetingRoomAnalyticsView, BulkMeetingRoomBookingView, CancelMeetingRoomBookingView, MeetingRoomBookingView, MeetingRoomFreeBusyView, MeetingRoomHoldView, MeetingRoomListView, MeetingRoomSearchView, MeetingRoomWaitlistView, MyBookingsView, MyWaitlistView, RecurringBookingOccurrencesView, RecurringMeetingRoomBookingView, ReleaseMeetingRoomHoldView
+from rest_api.booking.async_api import (
+    AsyncAvailabilityEventsView, AsyncAvailabilityPollView, AsyncMeetingRoomBookingView, AsyncMeetingRoomListView,
+    AsyncMyBookingsView,
+)
 
 urlpatterns = [
     # Endpoint for listing available meeting rooms
     path('available/', MeetingRoomListView.as_view(), name='meeting-room-list'),
 
+    # Endpoint for searching meeting rooms by attributes and availability
+    path('search/', MeetingRoomSearchView.as_view(), name='meeting-room-search'),
+
+    # Endpoint for the free/busy timeline of meeting rooms
+    path('free-busy/', MeetingRoomFreeBusyView.as_view(), name='meeting-room-free-busy'),
+
+    # Endpoint for the hit/miss counters of the booking read cache
+    path('cache-stats/', BookingCacheStatsView.as_view(), name='booking-cache-stats'),
+
+    # Endpoint for the room usage analytics, answered from the usage rollups
+    path('analytics/', MeetingRoomAnalyticsView.as_view(), name='meeting-room-analytics'),
+
     # Endpoint for booking a meeting room by room_id
     path('<int:room_id>/book/', MeetingRoomBookingView.as_view(), name='book-meeting-room'),
 
+    # Endpoints for tentatively holding a meeting room, confirming the hold into a booking and releasing it
+    path('<int:room_id>/hold/', MeetingRoomHoldView.as_view(), name='hold-meeting-room'),
+    path('holds/<int:hold_id>/confirm/', ConfirmMeetingRoomHoldView.as_view(), name='confirm-meeting-room-hold'),
+    path('holds/<int:hold_id>/', ReleaseMeetingRoomHoldView.as_view(), name='release-meeting-room-hold'),
+
+    # Endpoint for booking a meeting room on a recurring schedule by room_id
+    path('<int:room_id>/book-recurring/', RecurringMeetingRoomBookingView.as_view(), name='book-recurring-meeting-room'),
+
+    # Endpoint for the occurrences of a recurring booking within a time window
+    path('recurring-bookings/<int:recurring_booking_id>/occurrences/', RecurringBookingOccurrencesView.as_view(), name='recurring-booking-occurrences'),
+
+    # Endpoint for booking the smallest free meeting room that fits
+    path('allocate/', AllocateMeetingRoomView.as_view(), name='allocate-meeting-room'),
+
+    # Endpoint for booking many meeting room slots in one request
+    path('bulk-book/', BulkMeetingRoomBookingView.as_view(), name='bulk-book-meeting-rooms'),
+
+    # Endpoints for joining the waitlist of a meeting room, listing and leaving the user's waitlist entries
+    path('<int:room_id>/waitlist/', MeetingRoomWaitlistView.as_view(), name='join-meeting-room-waitlist'),
+    path('waitlist/', MyWaitlistView.as_view(), name='my-waitlist'),
+    path('waitlist/<int:entry_id>/', LeaveWaitlistView.as_view(), name='leave-meeting-room-waitlist'),
+
     # Endpoint for list of bookings booked by requested user
     path('my-bookings/', MyBookingsView.as_view(), name='my-bookings'),
 
+    # Async (ASGI) endpoints for listing available meeting rooms, booking and listing my bookings
+    path('async/available/', AsyncMeetingRoomListView.as_view(), name='async-meeting-room-list'),
+    path('async/<int:room_id>/book/', AsyncMeetingRoomBookingView.as_view(), name='async-book-meeting-room'),
+    path('async/my-bookings/', AsyncMyBookingsView.as_view(), name='async-my-bookings'),
+
+    # Async endpoints pushing the booking created/cancelled events, as server-sent events or by long-polling
+    path('async/events/', AsyncAvailabilityEventsView.as_view(), name='availability-events'),
+    path('async/events/poll/', AsyncAvailabilityPollView.as_view(), name='availability-events-poll'),
+
     # Endpoint for cancel a booking room_id
     path('<int:booking_id>/cancel-booking/', CancelMeetingRoomBookingView.as_view(), name='cancel-meeting-room-booking'),
 ]
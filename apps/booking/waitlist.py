@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from apps.booking.models import WaitlistEntry, WaitlistPromotion
+from apps.booking.services import BookingError, book_room
+from apps.member.models import CustomUser
+
+
+class WaitlistEntryGone(BookingError):
+    message = "The waitlist entry is no longer waiting."
+    outcome = 'waitlist_entry_gone'
+
+
+def waitlist_setting(name, default):
+    return getattr(settings, 'BOOKING_WAITLIST', {}).get(name, default)
+
+
+def claim_promotions(batch_size, lease_seconds):
+    """
+    Claims a batch of freed slots on the current site's database.
+
+    Claimed rows get their available_at pushed back by the lease, so other
+    workers skip them, and they become due again if this worker dies before
+    deleting them.
+    """
+    now = timezone.now()
+    using = router.db_for_write(WaitlistPromotion)
+    with transaction.atomic(using=using):
+        due = WaitlistPromotion.objects.filter(available_at__lte=now)
+        if connections[using].features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        promotions = list(due.order_by('available_at', 'id')[:batch_size])
+        if promotions:
+            WaitlistPromotion.objects.filter(pk__in=[promotion.pk for promotion in promotions]).update(
+                available_at=now + timedelta(seconds=lease_seconds)
+            )
+    return promotions
+
+
+def promote_slot(promotion):
+    """
+    Books a freed slot for the users waiting for it, first come first served.
+
+    Every waiting entry overlapping the slot is tried in order of joining
+    through book_room, which re-checks availability and capacity under the
+    room lock and marks the entry as promoted in the transaction of the
+    booking, so an entry is booked at most once even with concurrent workers.
+    Entries still blocked by another booking, or too large for the room,
+    keep waiting. The confirmation email is queued like for any booking.
+
+    Returns:
+    - list: The created bookings.
+    """
+    now = timezone.now()
+    entries = list(WaitlistEntry.objects.filter(
+        meeting_room_id=promotion.meeting_room_id,
+        status=WaitlistEntry.STATUS_WAITING,
+        start_time__gt=now,
+        start_time__lt=promotion.end_time,
+        end_time__gt=promotion.start_time,
+    ).order_by('created_at', 'id'))
+    # Users live on the default database, loaded in one query instead of a join
+    users = CustomUser.objects.in_bulk({entry.user_id for entry in entries})
+
+    bookings = []
+    for entry in entries:
+        user = users.get(entry.user_id)
+        # Skip entries overlapping a booking made by this promotion without asking the database
+        if user is None or any(booking.start_time < entry.end_time and booking.end_time > entry.start_time for booking in bookings):
+            continue
+
+        def claim_entry(entry=entry):
+            if not WaitlistEntry.objects.filter(pk=entry.pk, status=WaitlistEntry.STATUS_WAITING).update(status=WaitlistEntry.STATUS_PROMOTED):
+                raise WaitlistEntryGone()
+
+        try:
+            bookings.append(book_room(
+                entry.meeting_room_id, user, entry.start_time, entry.end_time, entry.no_of_persons,
+                operation='waitlist', before_insert=claim_entry,
+            ))
+        except BookingError:
+            # Still blocked by another booking, too large for the room or left the waitlist meanwhile
+            continue
+    return bookings
+
+
+def expire_waitlist():
+    """
+    Marks the entries whose start time passed while waiting as expired.
+
+    Returns:
+    - int: Number of entries expired.
+    """
+    return WaitlistEntry.objects.filter(
+        status=WaitlistEntry.STATUS_WAITING, start_time__lte=timezone.now()
+    ).update(status=WaitlistEntry.STATUS_EXPIRED)
+
+
+def promote_waitlist(batch_size=None, lease_seconds=None):
+    """
+    Processes one batch of freed slots of the current site's database.
+
+    Returns:
+    - dict: Number of slots processed and of users promoted.
+    """
+    batch_size = batch_size or waitlist_setting('BATCH_SIZE', 100)
+    lease_seconds = lease_seconds or waitlist_setting('LEASE_SECONDS', 300)
+
+    promotions = claim_promotions(batch_size, lease_seconds)
+    promoted = 0
+    for promotion in promotions:
+        promoted += len(promote_slot(promotion))
+        WaitlistPromotion.objects.filter(pk=promotion.pk).delete()
+    return {'slots': len(promotions), 'promoted': promoted}
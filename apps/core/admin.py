@@ -1,3 +1,15 @@
 from django.contrib import admin
+from .models import IdempotencyKey, OutboxEmail
 
-# Register your models here.
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'id', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    search_fields = ('recipient', 'subject')
+    list_filter = ('status',)
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'user', 'status_code', 'created_at', 'expires_at')
+    search_fields = ('key', 'user__email')
+    raw_id_fields = ('user',)
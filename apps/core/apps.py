@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
+
+    def ready(self):
+        # Site databases get their own range of primary keys once migrated
+        from apps.core.routers import reserve_site_id_ranges
+        post_migrate.connect(reserve_site_id_ranges, dispatch_uid='reserve_site_id_ranges')
+
+        # Queries of sampled requests are recorded on every connection, whichever thread or database runs them
+        from apps.core.instrumentation import install_query_hook
+        connection_created.connect(install_query_hook, dispatch_uid='install_query_hook')
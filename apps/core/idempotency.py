@@ -0,0 +1,256 @@
+import hashlib
+import json
+from contextvars import ContextVar
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.core.middleware import request_site
+from apps.core.models import IdempotencyKey
+from apps.core.routers import booking_database, site_databases
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# Key reserved by the request being handled, completed by the hook of response_hook
+_reserved_key = ContextVar('reserved_idempotency_key', default=None)
+
+
+class KeyReclaimed(Exception):
+    """
+    Raised in the transaction of a side effect whose key was reclaimed by a retry, so the side effect is rolled back.
+    """
+
+
+def idempotency_setting(name, default):
+    return getattr(settings, 'IDEMPOTENCY', {}).get(name, default)
+
+
+def cache_key(user_id, key, using):
+    # Hashed, so keys with spaces or non ASCII characters are valid cache keys
+    return f"idempotency:{using}:{user_id}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def request_fingerprint(request):
+    """
+    Returns a hash of the method, path, site and parsed body of a request, so a key reused for another request is detected.
+    """
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    site = request_site(request) or ''
+    return hashlib.sha256(f"{request.method} {request.path} {site}\n{body}".encode()).hexdigest()
+
+
+def cached_response(user_id, key):
+    """
+    Returns the stored response of a key of the current site from the cache front, None on a miss.
+    """
+    return caches[idempotency_setting('CACHE_ALIAS', 'default')].get(cache_key(user_id, key, booking_database()))
+
+
+def reserve_key(user_id, key, fingerprint):
+    """
+    Reserves a key for a request by inserting its row, on the database of the current site.
+
+    The unique (user, key) constraint makes the insert the lock: only one of
+    concurrent requests with the same key wins it. Expired rows, and rows of
+    requests still in progress after IDEMPOTENCY['LOCK_SECONDS'] (their
+    worker died or is stuck), are removed and the insert tried again. A row
+    still in progress proves that the side effect of its request did not
+    commit, since the response is stored in the same transaction (see
+    response_hook); once the row is removed, that side effect can no longer
+    commit either.
+
+    Returns:
+    - tuple: (reserved IdempotencyKey, None) or (None, existing IdempotencyKey).
+    """
+    now = timezone.now()
+    lock_seconds = idempotency_setting('LOCK_SECONDS', 60)
+    ttl = idempotency_setting('TTL_SECONDS', 86400)
+    existing = None
+    for _ in range(2):
+        try:
+            with transaction.atomic(using=booking_database()):
+                record = IdempotencyKey.objects.create(
+                    user_id=user_id, key=key, request_fingerprint=fingerprint,
+                    created_at=now, expires_at=now + timedelta(seconds=ttl),
+                )
+            return record, None
+        except IntegrityError:
+            pass
+        existing = IdempotencyKey.objects.filter(user_id=user_id, key=key).first()
+        if existing is None:
+            # Released by a failed request in between
+            continue
+        abandoned = existing.status_code is None and existing.created_at <= now - timedelta(seconds=lock_seconds)
+        if existing.expires_at > now and not abandoned:
+            return None, existing
+        # Conditioned on the state read, so a response committed in between is kept
+        stale = IdempotencyKey.objects.filter(pk=existing.pk, created_at=existing.created_at)
+        (stale.filter(status_code__isnull=True) if abandoned else stale).delete()
+    return None, existing
+
+
+def save_response(record, response):
+    """
+    Completes a reserved key with the response of its request in the database, unless a retry reclaimed it.
+
+    Returns:
+    - bool: Whether the key was completed.
+    """
+    status_code = response.status_code
+    response_body = json.loads(json.dumps(response.data, cls=DjangoJSONEncoder))
+    completed = IdempotencyKey.objects.using(record._state.db).filter(
+        pk=record.pk, created_at=record.created_at, status_code__isnull=True,
+    ).update(status_code=status_code, response_body=response_body)
+    if completed:
+        record.status_code, record.response_body = status_code, response_body
+    return bool(completed)
+
+
+def cache_response(record):
+    """
+    Copies the stored response of a completed key to the cache front.
+    """
+    timeout = max(1, int((record.expires_at - timezone.now()).total_seconds()))
+    caches[idempotency_setting('CACHE_ALIAS', 'default')].set(
+        cache_key(record.user_id, record.key, record._state.db),
+        {'fingerprint': record.request_fingerprint, 'status_code': record.status_code, 'body': record.response_body},
+        timeout,
+    )
+
+
+def response_hook(build_response):
+    """
+    Returns a hook storing the response of the request being handled in the transaction of its side effect.
+
+    Services call the hook (their before_commit parameter) with their result
+    inside their transaction on the booking database, where the key lives,
+    so the side effect and its response commit together: a crash before the
+    commit leaves the key in progress and nothing done, which is what makes
+    reclaiming it safe. When a retry already reclaimed the key, the hook
+    raises KeyReclaimed and the side effect is rolled back.
+
+    Parameters:
+    - build_response (callable): Builds the Response of the request from the result of the service.
+
+    Returns:
+    - callable: The hook, None for requests without an Idempotency-Key header.
+    """
+    record = _reserved_key.get()
+    if record is None:
+        return None
+
+    def before_commit(result):
+        if not save_response(record, build_response(result)):
+            raise KeyReclaimed()
+    return before_commit
+
+
+def replay_response(stored, fingerprint):
+    """
+    Builds the response of a request whose key was already used.
+
+    Parameters:
+    - stored (dict): fingerprint, status_code and body of the stored response, status_code None while in progress.
+    - fingerprint (str): Fingerprint of the retried request.
+    """
+    if stored['fingerprint'] != fingerprint:
+        return Response({"error": "Idempotency-Key has already been used for a different request."}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    if stored['status_code'] is None:
+        response = Response({"error": "A request with this Idempotency-Key is still in progress."}, status=status.HTTP_409_CONFLICT)
+        response['Retry-After'] = '1'
+        return response
+    response = Response(stored['body'], status=stored['status_code'])
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(handler):
+    """
+    Decorator making a DRF view handler replay its response to retries sent with the same Idempotency-Key header.
+
+    Requests without the header are handled as usual. The first request with
+    a key reserves it, runs the handler and stores its response for
+    IDEMPOTENCY['TTL_SECONDS']; retries get the stored response, from the
+    cache front or the database, without running the handler again. Handlers
+    with a side effect pass response_hook() to their service, so the response
+    of the side effect is stored in its transaction; other responses (e.g.
+    validation errors) are stored once the handler returns. Server errors
+    are not stored, so the request can be retried.
+
+    Returns:
+    - 400 Bad Request: The key is empty or too long.
+    - 409 Conflict: A request with the same key is still in progress.
+    - 422 Unprocessable Entity: The key was used for a different request.
+    """
+    @wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return handler(view, request, *args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response({"error": f"{IDEMPOTENCY_HEADER} must be between 1 and {MAX_KEY_LENGTH} characters."}, status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        stored = cached_response(request.user.pk, key)
+        if stored is not None:
+            return replay_response(stored, fingerprint)
+
+        record, existing = reserve_key(request.user.pk, key, fingerprint)
+        if record is None:
+            return replay_response({
+                'fingerprint': existing.request_fingerprint,
+                'status_code': existing.status_code,
+                'body': existing.response_body,
+            }, fingerprint)
+
+        in_progress = IdempotencyKey.objects.using(record._state.db).filter(
+            pk=record.pk, created_at=record.created_at, status_code__isnull=True,
+        )
+        token = _reserved_key.set(record)
+        try:
+            response = handler(view, request, *args, **kwargs)
+        except KeyReclaimed:
+            # A retry took the key over; its response is the one that counts
+            return replay_response({'fingerprint': fingerprint, 'status_code': None, 'body': None}, fingerprint)
+        except Exception:
+            in_progress.delete()
+            raise
+        finally:
+            _reserved_key.reset(token)
+        if record.status_code is None:
+            if response.status_code >= 500:
+                in_progress.delete()
+                return response
+            save_response(record, response)
+        if record.status_code is not None:
+            cache_response(record)
+        return response
+    return wrapper
+
+
+def purge_expired_keys(batch_size=1000):
+    """
+    Deletes the expired idempotency keys of every site database in batches.
+
+    Returns:
+    - int: Number of keys deleted.
+    """
+    total = 0
+    for alias in site_databases():
+        keys = IdempotencyKey.objects.using(alias)
+        while True:
+            ids = list(keys.filter(expires_at__lte=timezone.now()).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            total += keys.filter(id__in=ids).delete()[0]
+    return total
@@ -0,0 +1,175 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger(f'{__name__}.slow_queries')
+
+# Metrics of the sampled request being handled, None when the request is not sampled.
+# Context variables follow the request into sync_to_async and async ORM worker threads.
+current_metrics = ContextVar('request_metrics', default=None)
+
+STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def instrumentation_setting(name, default):
+    return getattr(settings, 'REQUEST_INSTRUMENTATION', {}).get(name, default)
+
+
+def normalize_sql(sql):
+    """
+    Reduces a SQL statement to its shape, so statements differing only by their values compare equal.
+
+    Literals and placeholders become ?, and IN lists of any length become IN (...).
+    """
+    sql = STRING_LITERAL_RE.sub('?', sql)
+    sql = NUMBER_LITERAL_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return WHITESPACE_RE.sub(' ', sql).strip()
+
+
+class RequestMetrics:
+    """
+    Query and timing metrics collected while handling one sampled request.
+
+    Queries of one request may run in several threads at once (e.g. the site
+    fan-out of My Bookings), so they are recorded under a lock.
+    """
+
+    def __init__(self, slow_query_ms):
+        self._lock = threading.Lock()
+        self.slow_query_ms = slow_query_ms
+        self.query_count = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+        self.slow_queries = []
+        self.timings = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # Wraps every query of the request, see instrument_queries
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            fingerprint = normalize_sql(sql)
+            with self._lock:
+                self.query_count += 1
+                self.db_time += duration
+                self.fingerprints[fingerprint] += 1
+                if duration * 1000 >= self.slow_query_ms:
+                    self.slow_queries.append((fingerprint, duration))
+
+    def duplicate_queries(self, threshold):
+        """
+        Returns the statements run at least threshold times, the usual sign of an N+1 query pattern.
+        """
+        return [
+            {'sql': fingerprint, 'count': count}
+            for fingerprint, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+
+def instrument_queries(execute, sql, params, many, context):
+    """
+    Execute wrapper of every database connection, recording the query in the metrics of the current request.
+
+    Costs a single context variable lookup per query when the request is not sampled.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_hook(sender, connection, **kwargs):
+    """
+    connection_created handler installing instrument_queries on the connection.
+
+    Connections are per thread and per alias, so installing the hook on each
+    of them covers the worker threads of async views and every database
+    (site databases and replicas included).
+    """
+    if instrument_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(instrument_queries)
+
+
+@contextmanager
+def timed(name):
+    """
+    Adds the time spent in the block to the named timing of the current request.
+
+    Costs a single context variable lookup when the request is not sampled.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - started
+
+
+def should_sample():
+    return random.random() < instrumentation_setting('SAMPLE_RATE', 0.01)
+
+
+def server_timing_header(metrics, view_time, total_time):
+    """
+    Formats the metrics of a request as a Server-Timing header value (durations in milliseconds).
+    """
+    entries = [
+        f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.query_count} queries"',
+        *(f'{name};dur={duration * 1000:.2f}' for name, duration in sorted(metrics.timings.items())),
+        f'view;dur={view_time * 1000:.2f}',
+        f'total;dur={total_time * 1000:.2f}',
+    ]
+    return ', '.join(entries)
+
+
+def log_request(request, response, metrics, view_time, total_time):
+    """
+    Emits the metrics of a sampled request as one JSON log line, plus one line per slow query.
+    """
+    resolver_match = getattr(request, 'resolver_match', None)
+    route = resolver_match.view_name if resolver_match else None
+    duplicates = metrics.duplicate_queries(instrumentation_setting('DUPLICATE_QUERY_THRESHOLD', 3))
+    record = {
+        'method': request.method,
+        'path': request.path,
+        'route': route,
+        'status': response.status_code,
+        'total_ms': round(total_time * 1000, 2),
+        'view_ms': round(view_time * 1000, 2),
+        'db_ms': round(metrics.db_time * 1000, 2),
+        'queries': metrics.query_count,
+        'timings_ms': {name: round(duration * 1000, 2) for name, duration in metrics.timings.items()},
+        'duplicate_queries': duplicates,
+    }
+    if duplicates:
+        logger.warning("request_metrics %s", json.dumps(record))
+    else:
+        logger.info("request_metrics %s", json.dumps(record))
+
+    max_slow_queries = instrumentation_setting('MAX_SLOW_QUERIES', 10)
+    for fingerprint, duration in metrics.slow_queries[:max_slow_queries]:
+        slow_query_logger.warning("slow_query %s", json.dumps({
+            'route': route,
+            'duration_ms': round(duration * 1000, 2),
+            'sql': fingerprint,
+        }))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.routers import UnknownSite, use_site
+
+
+class SiteCommand(BaseCommand):
+    """
+    Management command working on the meeting rooms and bookings of one site, selected with --site.
+    """
+
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        parser.add_argument('--site', help="Site whose database is used (see BOOKING_SITES), the default database by default.")
+        return parser
+
+    def execute(self, *args, **options):
+        try:
+            site = use_site(options.get('site'))
+        except UnknownSite as error:
+            raise CommandError(str(error))
+        with site:
+            return super().execute(*args, **options)
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.outbox import drain_outbox
+from apps.core.routers import site_databases, use_database
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails of every site database in batches, optionally polling in a loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Number of emails claimed per batch.")
+        parser.add_argument('--workers', type=int, help="Maximum number of concurrent email connections.")
+        parser.add_argument('--max-attempts', type=int, help="Attempts before an email is marked as failed.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling the outbox instead of exiting when it is empty.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds to sleep between polls when the outbox is empty.")
+
+    def handle(self, *args, **options):
+        totals = {'claimed': 0, 'sent': 0, 'failed': 0}
+        while True:
+            claimed = 0
+            # Emails are queued on the database of the site of their booking
+            for alias in site_databases():
+                with use_database(alias):
+                    result = drain_outbox(
+                        batch_size=options['batch_size'],
+                        workers=options['workers'],
+                        max_attempts=options['max_attempts'],
+                    )
+                claimed += result['claimed']
+                for key, value in result.items():
+                    totals[key] += value
+
+            if not claimed:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox drained: {totals['sent']} sent, {totals['failed']} failed permanently, "
+            f"{totals['claimed'] - totals['sent'] - totals['failed']} scheduled for retry."
+        ))
@@ -0,0 +1,279 @@
+import atexit
+import glob
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def metrics_setting(name, default):
+    return getattr(settings, 'METRICS', {}).get(name, default)
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Metric:
+    """
+    Base class of the metrics of the registry, holding one value per label combination.
+    """
+    type = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def label_values(self, labels):
+        return tuple(str(labels[labelname]) for labelname in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def samples(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def describe(self):
+        return {'type': self.type, 'help': self.documentation, 'labelnames': list(self.labelnames)}
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self.registry.changed()
+
+
+class Histogram(Metric):
+    """
+    Histogram storing, per label combination, the count of observations per bucket, their sum and count.
+    """
+    type = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.label_values(labels)
+        # Index of the smallest bucket holding the value, len(buckets) being +Inf
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+        self.registry.changed()
+
+    def samples(self):
+        with self._lock:
+            return [[list(key), [list(counts), total, count]] for key, (counts, total, count) in self._values.items()]
+
+    def describe(self):
+        return {**super().describe(), 'buckets': list(self.buckets)}
+
+
+class CallbackGauge(Metric):
+    """
+    Gauge whose values are read from a callback when the metrics are collected.
+
+    The callback returns a dict mapping label value tuples to values. Being
+    computed on demand (e.g. from the database), it is never aggregated across processes.
+    """
+    type = 'gauge'
+
+    def __init__(self, registry, name, documentation, labelnames=(), callback=None):
+        super().__init__(registry, name, documentation, labelnames)
+        self.callback = callback
+
+    def samples(self):
+        return [[list(key), value] for key, value in self.callback().items()]
+
+
+class MetricsRegistry:
+    """
+    In-process registry of counters, histograms and gauges rendered in the
+    Prometheus text exposition format.
+
+    With METRICS['MULTIPROCESS_DIR'] set, every process (e.g. gunicorn
+    worker) periodically writes its counters and histograms to a per-pid file
+    of that directory, and collect() sums the files of all processes, so any
+    worker can answer a scrape for the whole server.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._flush_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._flusher_pid = None
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None):
+        return self.register(CallbackGauge(self, name, documentation, labelnames, callback))
+
+    def reset(self):
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def multiprocess_dir(self):
+        return metrics_setting('MULTIPROCESS_DIR', None)
+
+    def local_snapshot(self):
+        """
+        Returns the counters and histograms of this process as a JSON serialisable dict.
+        """
+        return {
+            name: {**metric.describe(), 'samples': metric.samples()}
+            for name, metric in self._metrics.items() if not isinstance(metric, CallbackGauge)
+        }
+
+    def changed(self):
+        if self.multiprocess_dir() is None:
+            return
+        self._dirty.set()
+        # Started lazily, so each forked worker runs its own flusher
+        if self._flusher_pid != os.getpid():
+            with self._flush_lock:
+                if self._flusher_pid != os.getpid():
+                    self._flusher_pid = os.getpid()
+                    threading.Thread(target=self._flush_periodically, name='metrics-flusher', daemon=True).start()
+                    atexit.register(self.flush)
+
+    def _flush_periodically(self):
+        interval = metrics_setting('FLUSH_INTERVAL', 1.0)
+        while True:
+            self._dirty.wait()
+            self._dirty.clear()
+            try:
+                self.flush()
+            except OSError as error:
+                logger.warning("Writing the metrics of process %s failed: %s", os.getpid(), error)
+            time.sleep(interval)
+
+    def flush(self):
+        """
+        Atomically writes the snapshot of this process to its file of the multiprocess directory.
+        """
+        directory = self.multiprocess_dir()
+        if directory is None:
+            return
+        with self._flush_lock:
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(file_descriptor, 'w') as temporary_file:
+                json.dump(self.local_snapshot(), temporary_file)
+            os.replace(temporary_path, os.path.join(directory, f'metrics_{os.getpid()}.json'))
+
+    def collect(self):
+        """
+        Returns the metrics of every process merged together, plus the gauges computed now.
+        """
+        directory = self.multiprocess_dir()
+        if directory is None:
+            snapshots = [self.local_snapshot()]
+        else:
+            self.flush()
+            snapshots = []
+            for path in glob.glob(os.path.join(directory, 'metrics_*.json')):
+                try:
+                    with open(path) as snapshot_file:
+                        snapshots.append(json.load(snapshot_file))
+                except (OSError, ValueError):
+                    # The file of a process is replaced atomically, so this is a vanished process
+                    continue
+
+        merged = {}
+        for snapshot in snapshots:
+            for name, metric in snapshot.items():
+                target = merged.setdefault(name, {**metric, 'samples': {}})
+                for label_values, value in metric['samples']:
+                    key = tuple(label_values)
+                    if metric['type'] == 'histogram':
+                        current = target['samples'].get(key)
+                        if current is None:
+                            target['samples'][key] = [list(value[0]), value[1], value[2]]
+                        else:
+                            current[0] = [left + right for left, right in zip(current[0], value[0])]
+                            current[1] += value[1]
+                            current[2] += value[2]
+                    else:
+                        target['samples'][key] = target['samples'].get(key, 0) + value
+
+        for name, metric in self._metrics.items():
+            if isinstance(metric, CallbackGauge):
+                merged[name] = {**metric.describe(), 'samples': {tuple(key): value for key, value in metric.samples()}}
+        return merged
+
+    def render(self):
+        """
+        Renders the collected metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for label_values, value in sorted(metric['samples'].items()):
+                labels = list(zip(metric['labelnames'], label_values))
+                if metric['type'] != 'histogram':
+                    lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip([*metric['buckets'], math.inf], counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{format_labels([*labels, ('le', format_value(bound))])} {format_value(cumulative)}")
+                lines.append(f'{name}_sum{format_labels(labels)} {format_value(total)}')
+                lines.append(f'{name}_count{format_labels(labels)} {format_value(count)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds',
+    "Duration of HTTP requests by URL name.",
+    ('url_name', 'method', 'status'),
+)
@@ -0,0 +1,175 @@
+import json
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import JsonResponse
+
+from apps.core.instrumentation import (
+    RequestMetrics, current_metrics, instrumentation_setting, log_request, logger, server_timing_header,
+    should_sample,
+)
+from apps.core.metrics import http_request_duration
+from apps.core.routers import UnknownSite, site_database, use_database
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Middleware recording the SQL and timing cost of a sample of the requests.
+
+    Sampled requests (REQUEST_INSTRUMENTATION['SAMPLE_RATE']) set the
+    current_metrics context variable, through which the execute wrapper of
+    every connection (see instrument_queries) counts and times their
+    queries, on any database and in the worker threads of async views too.
+    They get a Server-Timing header and are logged as one JSON line,
+    together with the slow and duplicated (N+1) queries they ran. Other
+    requests only pay for a random draw, two clock reads and a context
+    variable lookup per query, and are logged when slower than SLOW_REQUEST_MS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        if not should_sample():
+            response = self.get_response(request)
+            self.log_slow_request(request, response, time.perf_counter() - started)
+            return response
+
+        metrics = RequestMetrics(instrumentation_setting('SLOW_QUERY_MS', 100))
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        if not should_sample():
+            response = await self.get_response(request)
+            self.log_slow_request(request, response, time.perf_counter() - started)
+            return response
+
+        metrics = RequestMetrics(instrumentation_setting('SLOW_QUERY_MS', 100))
+        token = current_metrics.set(metrics)
+        try:
+            # Async ORM and sync_to_async queries run in worker threads, which copy this context
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics, started)
+
+    def report(self, request, response, metrics, started):
+        total_time = time.perf_counter() - started
+        view_time = total_time - (getattr(request, '_instrumentation_view_started', started) - started)
+        if instrumentation_setting('SERVER_TIMING', True):
+            response['Server-Timing'] = server_timing_header(metrics, view_time, total_time)
+        log_request(request, response, metrics, view_time, total_time)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._instrumentation_view_started = time.perf_counter()
+
+    def log_slow_request(self, request, response, total_time):
+        if total_time * 1000 < instrumentation_setting('SLOW_REQUEST_MS', 1000):
+            return
+        resolver_match = getattr(request, 'resolver_match', None)
+        logger.warning("slow_request %s", json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'route': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'total_ms': round(total_time * 1000, 2),
+        }))
+
+
+class MetricsMiddleware:
+    """
+    Middleware recording the duration of every request in the
+    http_request_duration_seconds histogram, labelled by URL name.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, started)
+        return response
+
+    def observe(self, request, response, started):
+        resolver_match = getattr(request, 'resolver_match', None)
+        http_request_duration.observe(
+            time.perf_counter() - started,
+            url_name=(resolver_match.url_name if resolver_match else None) or 'unmatched',
+            method=request.method,
+            status=response.status_code,
+        )
+
+
+def request_site(request):
+    """
+    Returns the site named by the X-Booking-Site header or the site query parameter of a request, None without one.
+    """
+    return request.headers.get('X-Booking-Site') or request.GET.get('site') or None
+
+
+class BookingSiteMiddleware:
+    """
+    Middleware routing the meeting rooms and bookings of a request to the
+    database of the site named by the X-Booking-Site header or the site
+    query parameter (see apps.core.routers). Requests without a site use the
+    default database; an unknown site is answered with 400 Bad Request.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        try:
+            alias = self.database(request)
+        except UnknownSite as error:
+            return JsonResponse({"error": str(error)}, status=400)
+        with use_database(alias):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        try:
+            alias = self.database(request)
+        except UnknownSite as error:
+            return JsonResponse({"error": str(error)}, status=400)
+        # Sync views and ORM calls run through sync_to_async, which carries the context over
+        with use_database(alias):
+            return await self.get_response(request)
+
+    def database(self, request):
+        return site_database(request_site(request))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-18 15:01
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('subject', models.CharField(help_text='Subject of the email.', max_length=255)),
+                ('body', models.TextField(help_text='Plain text body of the email.')),
+                ('from_email', models.CharField(help_text='Sender address.', max_length=255)),
+                ('recipient', models.EmailField(help_text='Recipient address.', max_length=254)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', help_text='Delivery status.', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Number of delivery attempts made so far.')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time of the next delivery attempt.')),
+                ('last_error', models.TextField(blank=True, help_text='Error raised by the last failed attempt.')),
+                ('sent_at', models.DateTimeField(blank=True, help_text='Time the email was delivered.', null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='outboxemail',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='core_outbox_status_b2f640_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 15:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Value of the Idempotency-Key header.', max_length=255)),
+                ('request_fingerprint', models.CharField(help_text='Hash of the method, path and body of the request.', max_length=64)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, help_text='Status of the stored response, null while in progress.', null=True)),
+                ('response_body', models.JSONField(blank=True, help_text='Body of the stored response.', null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='When the key was reserved.')),
+                ('expires_at', models.DateTimeField(db_index=True, help_text='When the key expires.')),
+                ('user', models.ForeignKey(help_text='User who sent the request.', on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'key')},
+            },
+        ),
+    ]
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 class TimestampModel(models.Model):
@@ -9,4 +11,92 @@ class TimestampModel(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+
+class OutboxEmail(TimestampModel):
+    """
+    Model representing an email queued for delivery by the outbox worker.
+
+    Emails are written in the same transaction as the change they notify
+    about, so they are never lost when the process restarts and never sent
+    for a rolled back change. The ``send_outbox_emails`` management command
+    drains the table in batches.
+
+    Attributes:
+        subject (str): Subject of the email.
+        body (str): Plain text body of the email.
+        from_email (str): Sender address.
+        recipient (str): Recipient address.
+        status (str): Delivery status (pending, sent or failed).
+        attempts (int): Number of delivery attempts made so far.
+        next_attempt_at (datetime): Earliest time of the next delivery attempt.
+        last_error (str): Error raised by the last failed attempt.
+        sent_at (datetime): Time the email was delivered.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    subject = models.CharField(max_length=255, help_text="Subject of the email.")
+    body = models.TextField(help_text="Plain text body of the email.")
+    from_email = models.CharField(max_length=255, help_text="Sender address.")
+    recipient = models.EmailField(help_text="Recipient address.")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, help_text="Delivery status.")
+    attempts = models.PositiveIntegerField(default=0, help_text="Number of delivery attempts made so far.")
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text="Earliest time of the next delivery attempt.")
+    last_error = models.TextField(blank=True, help_text="Error raised by the last failed attempt.")
+    sent_at = models.DateTimeField(null=True, blank=True, help_text="Time the email was delivered.")
+
+    def __str__(self):
+        """
+        Returns a string representation of the queued email.
+        """
+        return f"{self.subject} to {self.recipient} ({self.status})"
+
+    class Meta:
+        # Database index for the outbox worker polling query
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    Model representing the stored response of a request sent with an Idempotency-Key header.
+
+    A row is inserted before the request is handled, which reserves the key
+    (status_code is null while the request is in progress), and completed
+    with the response. Retries with the same key get the stored response.
+    Keys live on the database of the site of the request, like its bookings,
+    so a response is stored in the transaction of its booking.
+
+    Attributes:
+        user (CustomUser): User who sent the request; keys are unique per user.
+        key (str): Value of the Idempotency-Key header.
+        request_fingerprint (str): Hash of the method, path and body of the request.
+        status_code (int): Status of the stored response, null while the request is in progress.
+        response_body (dict): Body of the stored response.
+        created_at (datetime): When the key was reserved.
+        expires_at (datetime): When the key can be reused and the row purged.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="idempotency_keys", db_constraint=False, help_text="User who sent the request.")
+    key = models.CharField(max_length=255, help_text="Value of the Idempotency-Key header.")
+    request_fingerprint = models.CharField(max_length=64, help_text="Hash of the method, path and body of the request.")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Status of the stored response, null while in progress.")
+    response_body = models.JSONField(null=True, blank=True, help_text="Body of the stored response.")
+    created_at = models.DateTimeField(default=timezone.now, help_text="When the key was reserved.")
+    expires_at = models.DateTimeField(db_index=True, help_text="When the key expires.")
+
+    def __str__(self):
+        """
+        Returns a string representation of the idempotency key.
+        """
+        return f"{self.key} of user {self.user_id} ({self.status_code or 'in progress'})"
+
+    class Meta:
+        unique_together = ('user', 'key')
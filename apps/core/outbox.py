@@ -0,0 +1,169 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections, router, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from apps.core.metrics import registry
+from apps.core.models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def outbox_depth():
+    """
+    Returns the number of outbox emails per status, with one grouped query.
+    """
+    depth = {(status,): 0 for status, _ in OutboxEmail.STATUS_CHOICES}
+    for row in OutboxEmail.objects.values('status').annotate(emails=Count('id')).order_by():
+        depth[(row['status'],)] = row['emails']
+    return depth
+
+
+email_outbox_emails = registry.gauge(
+    'email_outbox_emails', "Number of outbox emails by delivery status.", ('status',), callback=outbox_depth
+)
+
+
+def outbox_setting(name, default):
+    return getattr(settings, 'EMAIL_OUTBOX', {}).get(name, default)
+
+
+def enqueue_email(subject, body, recipient, from_email=None):
+    """
+    Queue an email for delivery by the outbox worker.
+
+    Call it inside the transaction of the change the email is about, so the
+    email is stored if and only if that change is committed.
+
+    Parameters:
+    - subject (str): Subject of the email.
+    - body (str): Plain text body of the email.
+    - recipient (str): Recipient address.
+    - from_email (str, optional): Sender address, defaults to DEFAULT_FROM_EMAIL.
+
+    Returns:
+    - OutboxEmail: The queued email.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        recipient=recipient,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def claim_batch(batch_size, lease_seconds):
+    """
+    Claim a batch of due emails.
+
+    Claimed rows get their next_attempt_at pushed back by the lease, so other
+    workers skip them, and they become due again if this worker dies before
+    recording the outcome.
+    """
+    now = timezone.now()
+    # The outbox lives next to the data its emails are about, e.g. on the database of a booking's site
+    using = router.db_for_write(OutboxEmail)
+    with transaction.atomic(using=using):
+        due = OutboxEmail.objects.filter(status=OutboxEmail.STATUS_PENDING, next_attempt_at__lte=now)
+        if connections[using].features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        emails = list(due.order_by('next_attempt_at', 'id')[:batch_size])
+        if emails:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                next_attempt_at=now + timedelta(seconds=lease_seconds)
+            )
+    return emails
+
+
+def send_chunk(emails):
+    """
+    Send a chunk of emails over a single connection.
+
+    Returns:
+    - list: (email id, error message or None) for every email of the chunk.
+    """
+    results = []
+    try:
+        with get_connection() as email_connection:
+            for email in emails:
+                message = EmailMessage(email.subject, email.body, email.from_email, [email.recipient])
+                try:
+                    email_connection.send_messages([message])
+                    results.append((email.pk, None))
+                except Exception as e:
+                    results.append((email.pk, str(e) or e.__class__.__name__))
+    except Exception as e:
+        # The connection itself failed, every email not yet attempted is retried
+        attempted = {email_id for email_id, _ in results}
+        results.extend((email.pk, str(e) or e.__class__.__name__) for email in emails if email.pk not in attempted)
+    return results
+
+
+def record_results(emails, results, max_attempts, backoff_seconds):
+    emails_by_id = {email.pk: email for email in emails}
+    now = timezone.now()
+    sent_ids = [email_id for email_id, error in results if error is None]
+    if sent_ids:
+        OutboxEmail.objects.filter(pk__in=sent_ids).update(
+            status=OutboxEmail.STATUS_SENT, sent_at=now, attempts=F('attempts') + 1, last_error=''
+        )
+
+    failed = 0
+    for email_id, error in results:
+        if error is None:
+            continue
+        email = emails_by_id[email_id]
+        attempts = email.attempts + 1
+        if attempts >= max_attempts:
+            status = OutboxEmail.STATUS_FAILED
+            failed += 1
+        else:
+            status = OutboxEmail.STATUS_PENDING
+        logger.warning("Sending outbox email %s failed (attempt %s): %s", email_id, attempts, error)
+        OutboxEmail.objects.filter(pk=email_id).update(
+            status=status,
+            attempts=attempts,
+            last_error=error,
+            # Exponential backoff: base, 2 x base, 4 x base, ...
+            next_attempt_at=now + timedelta(seconds=backoff_seconds * 2 ** (attempts - 1)),
+        )
+    return len(sent_ids), failed
+
+
+def drain_outbox(batch_size=None, workers=None, max_attempts=None, backoff_seconds=None, lease_seconds=None):
+    """
+    Deliver one batch of due outbox emails.
+
+    The batch is split into at most ``workers`` chunks sent concurrently, each
+    chunk reusing one email backend connection for all of its messages.
+    Failed emails are retried with exponential backoff until max_attempts is
+    reached, after which they are marked as failed.
+
+    Returns:
+    - dict: Number of claimed, sent and permanently failed emails.
+    """
+    batch_size = batch_size or outbox_setting('BATCH_SIZE', 100)
+    workers = workers or outbox_setting('WORKERS', 4)
+    max_attempts = max_attempts or outbox_setting('MAX_ATTEMPTS', 5)
+    backoff_seconds = backoff_seconds if backoff_seconds is not None else outbox_setting('BACKOFF_SECONDS', 30)
+    lease_seconds = lease_seconds or outbox_setting('LEASE_SECONDS', 300)
+
+    emails = claim_batch(batch_size, lease_seconds)
+    if not emails:
+        return {'claimed': 0, 'sent': 0, 'failed': 0}
+
+    chunk_count = min(workers, len(emails))
+    chunks = [emails[index::chunk_count] for index in range(chunk_count)]
+    if chunk_count == 1:
+        results = send_chunk(chunks[0])
+    else:
+        with ThreadPoolExecutor(max_workers=chunk_count) as executor:
+            results = [result for chunk_results in executor.map(send_chunk, chunks) for result in chunk_results]
+
+    sent, failed = record_results(emails, results, max_attempts, backoff_seconds)
+    return {'claimed': len(emails), 'sent': sent, 'failed': failed}
@@ -0,0 +1,202 @@
+import asyncio
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+
+class LocalPubSub:
+    """
+    In-process publish/subscribe hub.
+
+    Every channel keeps its last buffer_size events, numbered by an
+    increasing id, so a subscriber that reconnects with the last id it saw
+    gets the events it missed. Events are published from any thread (e.g. an
+    on_commit callback of a sync view) and wake up the coroutines waiting on
+    any event loop. Only subscribers of the same process see the events.
+
+    Parameters:
+    - buffer_size (int): Events kept per channel for catching up.
+    """
+
+    def __init__(self, buffer_size=1000):
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._events = {}
+        self._last_ids = {}
+        self._waiters = {}
+
+    def publish(self, channel, event):
+        """
+        Appends an event to a channel and wakes up its subscribers.
+
+        Returns:
+        - int: ID of the event.
+        """
+        with self._lock:
+            event_id = self._last_ids.get(channel, 0) + 1
+            self._last_ids[channel] = event_id
+            self._events.setdefault(channel, deque(maxlen=self.buffer_size)).append((event_id, event))
+            waiters = list(self._waiters.get(channel, ()))
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                # The loop of a disconnected subscriber is already closed
+                continue
+        return event_id
+
+    def last_event_id(self, channel):
+        with self._lock:
+            return self._last_ids.get(channel, 0)
+
+    def events_after(self, channel, after):
+        """
+        Returns the buffered (id, event) pairs of a channel with an id greater than after.
+        """
+        with self._lock:
+            # An id from before a restart of the process is ahead of the counter, start over
+            if after > self._last_ids.get(channel, 0):
+                after = 0
+            return [(event_id, event) for event_id, event in self._events.get(channel, ()) if event_id > after]
+
+    async def wait(self, channel, after, timeout):
+        """
+        Waits up to timeout seconds for events with an id greater than after.
+
+        Returns:
+        - list: The (id, event) pairs, empty when the timeout expired first.
+        """
+        events = self.events_after(channel, after)
+        if events:
+            return events
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.setdefault(channel, set()).add(waiter)
+        try:
+            # Published between the first check and the registration of the waiter
+            events = self.events_after(channel, after)
+            if events:
+                return events
+            try:
+                await asyncio.wait_for(waiter[1].wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+            return self.events_after(channel, after)
+        finally:
+            with self._lock:
+                self._waiters[channel].discard(waiter)
+
+
+class CachePubSub:
+    """
+    Publish/subscribe hub shared by every process through a Django cache.
+
+    Events are stored under per id keys and a per channel counter is
+    incremented atomically, so every worker using the same shared cache
+    (Redis, Memcached) sees the events of the others. Subscribers poll the
+    counter every poll_interval seconds, a trade-off between latency and the
+    number of cache reads of idle streams.
+
+    Parameters:
+    - cache_alias (str): Cache storing the events.
+    - buffer_size (int): Events a reconnecting subscriber can catch up on.
+    - poll_interval (float): Seconds between two checks of the counter.
+    - timeout (int): Seconds an event is kept in the cache.
+    """
+
+    def __init__(self, cache_alias='default', buffer_size=1000, poll_interval=0.5, timeout=300):
+        self.cache_alias = cache_alias
+        self.buffer_size = buffer_size
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def counter_key(self, channel):
+        return f'pubsub:{channel}:last_id'
+
+    def event_key(self, channel, event_id):
+        return f'pubsub:{channel}:{event_id}'
+
+    def publish(self, channel, event):
+        # add() is a no-op when the counter exists, incr() is atomic on shared backends
+        self.cache.add(self.counter_key(channel), 0, None)
+        try:
+            event_id = self.cache.incr(self.counter_key(channel))
+        except ValueError:
+            # The counter was evicted in between
+            self.cache.add(self.counter_key(channel), 0, None)
+            event_id = self.cache.incr(self.counter_key(channel))
+        self.cache.set(self.event_key(channel, event_id), event, self.timeout)
+        return event_id
+
+    def last_event_id(self, channel):
+        return self.cache.get(self.counter_key(channel)) or 0
+
+    def _collect(self, channel, after, last_id, found):
+        events = []
+        for event_id in range(after + 1, last_id + 1):
+            event = found.get(self.event_key(channel, event_id))
+            # Expired events, and events whose writer has not stored them yet, are skipped
+            if event is not None:
+                events.append((event_id, event))
+        return events
+
+    def _first_id(self, after, last_id):
+        if after > last_id:
+            after = 0
+        return max(after, last_id - self.buffer_size)
+
+    def events_after(self, channel, after):
+        last_id = self.last_event_id(channel)
+        after = self._first_id(after, last_id)
+        keys = [self.event_key(channel, event_id) for event_id in range(after + 1, last_id + 1)]
+        return self._collect(channel, after, last_id, self.cache.get_many(keys) if keys else {})
+
+    async def wait(self, channel, after, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            last_id = await self.cache.aget(self.counter_key(channel)) or 0
+            if last_id != after:
+                first_id = self._first_id(after, last_id)
+                keys = [self.event_key(channel, event_id) for event_id in range(first_id + 1, last_id + 1)]
+                events = self._collect(channel, first_id, last_id, await self.cache.aget_many(keys) if keys else {})
+                if events:
+                    return events
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return []
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_event_hub():
+    """
+    Returns the publish/subscribe hub configured in EVENT_HUB, created on first use.
+    """
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                config = getattr(settings, 'EVENT_HUB', {})
+                backend = import_string(config.get('BACKEND', 'apps.core.pubsub.LocalPubSub'))
+                _hub = backend(**config.get('OPTIONS', {}))
+    return _hub
+
+
+def reset_event_hub():
+    """
+    Drops the hub, so the next get_event_hub() creates it again from the settings.
+    """
+    global _hub
+    with _hub_lock:
+        _hub = None
@@ -0,0 +1,70 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+_bucket_lock = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter storing one bucket per key in the Django cache.
+
+    A bucket holds up to capacity tokens and refills continuously at
+    refill_rate tokens per second; every request takes one token and is
+    rejected when the bucket is empty. Buckets live in the cache, so they are
+    shared by every process using a shared backend (Redis, Memcached) and
+    per process with the local memory one. Updates are serialised within a
+    process; concurrent processes may let a few extra requests through.
+
+    Parameters:
+    - name (str): Namespace of the bucket keys.
+    - capacity (float): Maximum number of tokens, i.e. the allowed burst.
+    - refill_rate (float): Tokens added per second.
+    - cache_alias (str): Cache storing the buckets.
+    """
+
+    def __init__(self, name, capacity, refill_rate, cache_alias='default'):
+        self.name = name
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.cache_alias = cache_alias
+
+    def consume(self, key, tokens=1):
+        """
+        Takes tokens from the bucket of key.
+
+        Returns:
+        - tuple: (whether the request is allowed, seconds until enough tokens are available).
+        """
+        cache = caches[self.cache_alias]
+        cache_key = f'ratelimit:{self.name}:{key}'
+        # A bucket idle for this long is full again, so it can expire
+        timeout = math.ceil(self.capacity / self.refill_rate) + 1
+        with _bucket_lock:
+            now = time.time()
+            available, updated_at = cache.get(cache_key) or (self.capacity, now)
+            available = min(self.capacity, available + (now - updated_at) * self.refill_rate)
+            allowed = available >= tokens
+            if allowed:
+                available -= tokens
+            cache.set(cache_key, (available, now), timeout)
+        return allowed, 0.0 if allowed else (tokens - available) / self.refill_rate
+
+
+def login_rate_limits():
+    """
+    Returns the (scope, TokenBucket) pairs of the login endpoint configured in LOGIN_RATE_LIMIT.
+    """
+    config = getattr(settings, 'LOGIN_RATE_LIMIT', {})
+    cache_alias = config.get('CACHE_ALIAS', 'default')
+    buckets = []
+    for scope in ('IP', 'EMAIL'):
+        limit = config.get(scope)
+        if limit:
+            buckets.append((scope, TokenBucket(
+                f'login:{scope.lower()}', limit['CAPACITY'], limit['REFILL_PER_MINUTE'] / 60, cache_alias,
+            )))
+    return buckets
@@ -0,0 +1,304 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Apps and models whose rows live on the database of their office site
+SITE_APP_LABELS = {'booking'}
+SITE_MODELS = {'core.outboxemail', 'core.idempotencykey'}
+
+# Database of the site the current request or command works on, None for the default database
+_site_database = ContextVar('site_database', default=None)
+
+# Whether the reads of the current request may go to a replica, set by replica_reads views only
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+class UnknownSite(ValueError):
+    """
+    Raised for a site missing from BOOKING_SITES.
+    """
+
+    def __init__(self, site):
+        self.site = site
+        super().__init__(f"Unknown site: {site}.")
+
+
+def booking_sites():
+    return getattr(settings, 'BOOKING_SITES', {})
+
+
+def site_database(site):
+    """
+    Returns the database alias of a site, the default database when site is empty.
+
+    Raises:
+    - UnknownSite: If the site is not listed in BOOKING_SITES.
+    """
+    if not site:
+        return DEFAULT_DB_ALIAS
+    try:
+        return booking_sites()[site]['DATABASE']
+    except KeyError:
+        raise UnknownSite(site)
+
+
+def site_for_database(alias):
+    """
+    Returns the site stored on a database alias (or on its primary, for a replica), None for the default database.
+    """
+    alias = primary_database(alias)
+    for site, config in booking_sites().items():
+        if config['DATABASE'] == alias:
+            return site
+    return None
+
+
+def site_databases():
+    """
+    Returns the aliases of every database holding meeting rooms and bookings, the default database first.
+    """
+    aliases = [DEFAULT_DB_ALIAS]
+    for config in booking_sites().values():
+        if config['DATABASE'] not in aliases:
+            aliases.append(config['DATABASE'])
+    return aliases
+
+
+def booking_database():
+    """
+    Returns the database alias of the current site.
+    """
+    return _site_database.get() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_database(alias):
+    """
+    Routes the meeting rooms and bookings read and written in the block to a database alias.
+    """
+    token = _site_database.set(alias)
+    try:
+        yield alias
+    finally:
+        _site_database.reset(token)
+
+
+def use_site(site):
+    """
+    Routes the meeting rooms and bookings read and written in the block to the database of a site.
+
+    Raises:
+    - UnknownSite: If the site is not listed in BOOKING_SITES.
+    """
+    return use_database(site_database(site))
+
+
+def replica_setting(name, default):
+    return getattr(settings, 'READ_REPLICAS', {}).get(name, default)
+
+
+def primary_database(alias):
+    """
+    Returns the primary database of a replica alias, the alias itself for a primary.
+    """
+    for primary, replicas in replica_setting('DATABASES', {}).items():
+        if alias in replicas:
+            return primary
+    return alias
+
+
+def read_database(alias):
+    """
+    Returns the database the reads meant for a primary alias go to: one of its
+    replicas, picked at random, inside use_replicas(), the primary otherwise.
+    """
+    if not _replica_reads.get():
+        return alias
+    replicas = replica_setting('DATABASES', {}).get(alias)
+    return random.choice(replicas) if replicas else alias
+
+
+@contextmanager
+def use_replicas(enabled=True):
+    """
+    Sends the reads of the block to the replicas of their database (to the primaries when enabled is False).
+    """
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def use_primary():
+    """
+    Sends the reads of the block to the primaries, even inside use_replicas().
+    """
+    return use_replicas(False)
+
+
+def pin_cache():
+    return caches[replica_setting('CACHE_ALIAS', 'default')]
+
+
+def pin_key(user_id):
+    return f'replica:pin:{user_id}'
+
+
+def pin_to_primary(user_ids):
+    """
+    Sends the reads of users to the primaries for READ_REPLICAS['PIN_SECONDS'],
+    long enough for the replicas to catch up with their writes.
+    """
+    if not replica_setting('DATABASES', {}):
+        return
+    keys = {pin_key(user_id): True for user_id in user_ids if user_id is not None}
+    if keys:
+        pin_cache().set_many(keys, replica_setting('PIN_SECONDS', 10))
+
+
+def is_pinned(user_id):
+    return user_id is not None and bool(pin_cache().get(pin_key(user_id)))
+
+
+def replica_reads(handler):
+    """
+    Decorator sending the reads of a read-only view handler to the replicas.
+
+    Users who booked or cancelled within READ_REPLICAS['PIN_SECONDS'] (see
+    pin_to_primary) keep reading from the primaries, so they always see their
+    own changes; everybody else may read slightly stale data. Sync and async
+    handlers are supported.
+    """
+    if iscoroutinefunction(handler):
+        @wraps(handler)
+        async def async_wrapper(view, request, *args, **kwargs):
+            if not replica_setting('DATABASES', {}):
+                return await handler(view, request, *args, **kwargs)
+            pinned = request.user.pk is not None and bool(await pin_cache().aget(pin_key(request.user.pk)))
+            with use_replicas(not pinned):
+                return await handler(view, request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        if not replica_setting('DATABASES', {}):
+            return handler(view, request, *args, **kwargs)
+        with use_replicas(not is_pinned(request.user.pk)):
+            return handler(view, request, *args, **kwargs)
+    return wrapper
+
+
+def is_site_model(model):
+    return model._meta.app_label in SITE_APP_LABELS or model._meta.label_lower in SITE_MODELS
+
+
+class SiteRouter:
+    """
+    Database router sharding meeting rooms and bookings by office site.
+
+    Models of the booking app (and the email outbox and the idempotency keys,
+    so an email or a stored response is written in the transaction of its
+    booking) go to the database of the current site, selected with
+    use_site() or by the BookingSiteMiddleware. An instance stays on the
+    database it was loaded from. Users, authentication and every
+    other model stay on the default database, even when reached through a
+    booking; the foreign keys from bookings to users have no database
+    constraint for that reason.
+
+    Inside use_replicas() (views decorated with replica_reads), reads go to a
+    replica of their database listed in READ_REPLICAS['DATABASES']. Writes
+    always go to the primary, including writes of instances loaded from a replica.
+
+    Every database gets the full schema, so the same migrations run on all of them.
+    """
+
+    def _database(self, model, **hints):
+        if not is_site_model(model):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and is_site_model(type(instance)) and instance._state.db:
+            return instance._state.db
+        return booking_database()
+
+    def db_for_read(self, model, **hints):
+        return read_database(self._database(model, **hints))
+
+    def db_for_write(self, model, **hints):
+        return primary_database(self._database(model, **hints))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Bookings reference users across databases
+        if is_site_model(type(obj1)) or is_site_model(type(obj2)):
+            return True
+        if primary_database(obj1._state.db) == primary_database(obj2._state.db):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+def reserve_id_range(alias, model, offset):
+    """
+    Makes the auto-incremented primary keys of a model's table on a database start at offset.
+
+    Sites get disjoint ID ranges (BOOKING_SITES[site]['ID_OFFSET']), so room
+    and booking IDs stay unique across databases: cache keys, keyset cursors
+    and events keyed by ID need no site. Sequences already past the offset
+    are left alone. Supported on SQLite and PostgreSQL.
+    """
+    connection = connections[alias]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, offset])
+            elif row[0] < offset:
+                cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", [offset, table])
+        elif connection.vendor == 'postgresql':
+            cursor.execute("SELECT pg_get_serial_sequence(%s, %s)", [table, model._meta.pk.column])
+            sequence = cursor.fetchone()[0]
+            if sequence:
+                cursor.execute(f"SELECT last_value FROM {sequence}")
+                if cursor.fetchone()[0] < offset:
+                    cursor.execute("SELECT setval(%s, %s)", [sequence, offset])
+
+
+def site_id_range(alias):
+    """
+    Returns the range of primary keys reserved for the site stored on a database.
+
+    A site's range starts after its ID_OFFSET and ends at the next higher
+    ID_OFFSET of another site; the default database keeps the IDs below the
+    lowest offset.
+
+    Returns:
+    - tuple: The exclusive lower bound and the inclusive upper bound, None when unbounded.
+    """
+    site = site_for_database(alias)
+    lower = (booking_sites()[site].get('ID_OFFSET') or 0) if site else 0
+    higher = [config['ID_OFFSET'] for config in booking_sites().values() if (config.get('ID_OFFSET') or 0) > lower]
+    return lower, min(higher) if higher else None
+
+
+def reserve_site_id_ranges(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate handler reserving the ID range of the site stored on the migrated database.
+    """
+    site = site_for_database(using)
+    offset = booking_sites().get(site, {}).get('ID_OFFSET') if site else None
+    if not offset:
+        return
+    for model in apps.get_models(include_auto_created=True):
+        if is_site_model(model) and model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField'):
+            reserve_id_range(using, model, offset)
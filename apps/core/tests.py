@@ -1,3 +1,198 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+from io import StringIO
+from smtplib import SMTPException
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from .instrumentation import normalize_sql, timed
+from .metrics import MetricsRegistry
+from .middleware import RequestInstrumentationMiddleware
+from .models import OutboxEmail
+from .outbox import drain_outbox, enqueue_email
+from .pubsub import CachePubSub, LocalPubSub
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException("Connection unexpectedly closed")
+
+
+class OutboxTestCase(TestCase):
+    def test_drain_sends_pending_emails(self):
+        for index in range(5):
+            enqueue_email('Subject', 'Body', f'member{index}@example.com')
+
+        result = drain_outbox(batch_size=10, workers=2)
+
+        self.assertEqual(result, {'claimed': 5, 'sent': 5, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.STATUS_SENT).exists())
+
+    def test_drain_respects_batch_size(self):
+        for index in range(3):
+            enqueue_email('Subject', 'Body', f'member{index}@example.com')
+
+        self.assertEqual(drain_outbox(batch_size=2)['sent'], 2)
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.STATUS_PENDING).count(), 1)
+
+    @override_settings(EMAIL_BACKEND='apps.core.tests.FailingEmailBackend')
+    def test_failed_email_is_retried_with_backoff(self):
+        email = enqueue_email('Subject', 'Body', 'member@example.com')
+
+        with self.assertLogs('apps.core.outbox', 'WARNING'):
+            result = drain_outbox(max_attempts=2, backoff_seconds=60)
+        email.refresh_from_db()
+        self.assertEqual(result['sent'], 0)
+        self.assertEqual(email.status, OutboxEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now() + timezone.timedelta(seconds=50))
+
+        # Not due yet, so nothing is claimed
+        self.assertEqual(drain_outbox(max_attempts=2)['claimed'], 0)
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        with self.assertLogs('apps.core.outbox', 'WARNING'):
+            self.assertEqual(drain_outbox(max_attempts=2, backoff_seconds=60)['failed'], 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.STATUS_FAILED)
+
+    def test_management_command_drains_outbox(self):
+        enqueue_email('Subject', 'Body', 'member@example.com')
+        call_command('send_outbox_emails', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+
+
+def n_plus_one_view(request):
+    with timed('serializer'):
+        for email_id in range(4):
+            OutboxEmail.objects.filter(pk=email_id).exists()
+    return HttpResponse()
+
+
+class RequestInstrumentationTestCase(TestCase):
+    def setUp(self):
+        self.middleware = RequestInstrumentationMiddleware(n_plus_one_view)
+        self.request = RequestFactory().get('/api/v1/meeting-rooms/available/')
+
+    def test_normalize_sql(self):
+        self.assertEqual(
+            normalize_sql("SELECT *  FROM room\n WHERE id IN (%s, %s, %s) AND name = 'A''s' LIMIT 21"),
+            "SELECT * FROM room WHERE id IN (...) AND name = ? LIMIT ?",
+        )
+        self.assertEqual(normalize_sql("WHERE id IN (%s)"), normalize_sql("WHERE id IN (%s, %s)"))
+
+    @override_settings(REQUEST_INSTRUMENTATION={'SAMPLE_RATE': 1, 'SLOW_QUERY_MS': 0})
+    def test_sampled_request_is_instrumented(self):
+        with self.assertLogs('apps.core.instrumentation', level='INFO') as logs:
+            response = self.middleware(self.request)
+
+        server_timing = response['Server-Timing']
+        self.assertIn('db;dur=', server_timing)
+        self.assertIn('desc="4 queries"', server_timing)
+        self.assertIn('serializer;dur=', server_timing)
+        self.assertIn('total;dur=', server_timing)
+
+        record = json.loads(logs.records[0].getMessage().split(' ', 1)[1])
+        self.assertEqual(record['queries'], 4)
+        self.assertEqual(record['duplicate_queries'][0]['count'], 4)
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        slow_queries = [record for record in logs.records if record.name == 'apps.core.instrumentation.slow_queries']
+        self.assertEqual(len(slow_queries), 4)
+
+    @override_settings(REQUEST_INSTRUMENTATION={'SAMPLE_RATE': 0})
+    def test_unsampled_request_is_not_instrumented(self):
+        response = self.middleware(self.request)
+
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.counter('requests_total', "Requests.", ('view',))
+        self.latency = self.registry.histogram('latency_seconds', "Latency.", ('view',), buckets=(0.1, 1))
+
+    def test_render_text_exposition(self):
+        self.requests.inc(view='list')
+        self.requests.inc(2, view='list')
+        self.latency.observe(0.05, view='list')
+        self.latency.observe(5, view='list')
+
+        output = self.registry.render()
+
+        self.assertIn('# TYPE requests_total counter\nrequests_total{view="list"} 3.0\n', output)
+        self.assertIn('latency_seconds_bucket{view="list",le="0.1"} 1.0\n', output)
+        self.assertIn('latency_seconds_bucket{view="list",le="1.0"} 1.0\n', output)
+        self.assertIn('latency_seconds_bucket{view="list",le="+Inf"} 2.0\n', output)
+        self.assertIn('latency_seconds_sum{view="list"} 5.05\n', output)
+        self.assertIn('latency_seconds_count{view="list"} 2.0\n', output)
+
+    def test_multiprocess_files_are_aggregated(self):
+        self.requests.inc(view='list')
+        self.latency.observe(0.5, view='list')
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS={'MULTIPROCESS_DIR': directory}):
+            # Snapshot left by another worker
+            with open(os.path.join(directory, 'metrics_1.json'), 'w') as snapshot_file:
+                json.dump(self.registry.local_snapshot(), snapshot_file)
+
+            collected = self.registry.collect()
+
+        self.assertEqual(collected['requests_total']['samples'], {('list',): 2})
+        self.assertEqual(collected['latency_seconds']['samples'][('list',)], [[0, 2, 0], 1.0, 2])
+
+    def test_metrics_endpoint(self):
+        enqueue_email('Subject', 'Body', 'member@example.com')
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        content = response.content.decode()
+        self.assertIn('email_outbox_emails{status="pending"} 1.0', content)
+        self.assertIn('http_request_duration_seconds_bucket', content)
+
+
+class PubSubTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_local_hub_wakes_up_waiting_subscribers(self):
+        hub = LocalPubSub(buffer_size=2)
+
+        async def subscribe():
+            return await hub.wait('rooms', 0, timeout=5)
+
+        async def scenario():
+            subscriber = asyncio.ensure_future(subscribe())
+            await asyncio.sleep(0.01)
+            # Published from another thread, like an on_commit callback of a sync view
+            await asyncio.get_running_loop().run_in_executor(None, hub.publish, 'rooms', {'room_id': 1})
+            return await subscriber
+
+        self.assertEqual(async_to_sync(scenario)(), [(1, {'room_id': 1})])
+        hub.publish('rooms', {'room_id': 2})
+        hub.publish('rooms', {'room_id': 3})
+        # Only the last buffer_size events are kept, and ids from before a restart start over
+        self.assertEqual([event_id for event_id, _ in hub.events_after('rooms', 0)], [2, 3])
+        self.assertEqual([event_id for event_id, _ in hub.events_after('rooms', 10)], [2, 3])
+        self.assertEqual(async_to_sync(hub.wait)('rooms', 3, 0.01), [])
+
+    def test_cache_hub_shares_events_through_the_cache(self):
+        publisher, subscriber = CachePubSub(buffer_size=2, poll_interval=0.01), CachePubSub(buffer_size=2, poll_interval=0.01)
+        for room_id in (1, 2, 3):
+            publisher.publish('rooms', {'room_id': room_id})
+
+        self.assertEqual(subscriber.last_event_id('rooms'), 3)
+        self.assertEqual(subscriber.events_after('rooms', 0), [(2, {'room_id': 2}), (3, {'room_id': 3})])
+        self.assertEqual(async_to_sync(subscriber.wait)('rooms', 2, 1), [(3, {'room_id': 3})])
+        self.assertEqual(async_to_sync(subscriber.wait)('rooms', 3, 0.05), [])
@@ -1,3 +1,15 @@
-from django.shortcuts import render
+from django.http import HttpResponse
 
-# Create your views here.
+from apps.core.metrics import registry
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_view(request):
+    """
+    Exposes the metrics registry in the Prometheus text exposition format.
+
+    Returns:
+    - 200 OK: The metrics of every process of the server.
+    """
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MemberConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.member'
+
+    def ready(self):
+        # Connect the signal handlers invalidating the cached user state
+        from apps.member import signals  # noqa: F401
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from apps.member.models import CustomUser
+
+# Fields of the user needed to authorise a request, cached per user
+USER_STATE_FIELDS = ('id', 'email', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def user_state_key(user_id):
+    return f'member:user:{user_id}:state'
+
+
+def user_state_timeout():
+    return getattr(settings, 'MEMBER_AUTH_CACHE_TIMEOUT', 60)
+
+
+def get_user_state(user_id):
+    """
+    Returns the cached authorisation state of a user, loading it with one query on a miss.
+
+    Returns:
+    - dict: The USER_STATE_FIELDS of the user, or None if the user does not exist.
+    """
+    key = user_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = CustomUser.objects.filter(pk=user_id).values(*USER_STATE_FIELDS).first()
+        if state is not None:
+            cache.set(key, state, user_state_timeout())
+    return state
+
+
+async def aget_user_state(user_id):
+    """
+    Async version of get_user_state.
+    """
+    key = user_state_key(user_id)
+    state = await cache.aget(key)
+    if state is None:
+        state = await CustomUser.objects.filter(pk=user_id).values(*USER_STATE_FIELDS).afirst()
+        if state is not None:
+            await cache.aset(key, state, user_state_timeout())
+    return state
+
+
+def invalidate_user_state(user_id):
+    cache.delete(user_state_key(user_id))
+
+
+def build_user(state):
+    """
+    Builds a CustomUser from its cached state without touching the database.
+
+    The instance can be used wherever a user is compared or assigned (e.g.
+    booked_by=user), but lacks the other fields, so it must never be saved.
+    """
+    user = CustomUser(**state)
+    user._state.adding = False
+    user._state.db = 'default'
+    return user
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher whose iteration count comes from PASSWORD_HASH_ITERATIONS.
+
+    It keeps the pbkdf2_sha256 algorithm name, so existing hashes remain
+    valid. When the setting changes, must_update() reports hashes made with
+    another count and Django re-hashes the password on the next successful
+    login, moving every active user to the new cost.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASH_ITERATIONS', PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.member.auth_cache import invalidate_user_state
+from apps.member.models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    """
+    Drops the cached authorisation state of a saved or deleted user, right
+    away and once more on commit, so deactivation takes effect immediately.
+    """
+    invalidate_user_state(instance.pk)
+    transaction.on_commit(lambda: invalidate_user_state(instance.pk))
@@ -1,3 +1,92 @@
-from django.test import TestCase
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import CustomUser
+
+
+class UserLoginTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.credentials = {'email': 'member@example.com', 'password': 'password'}
+
+    @override_settings(MEMBER_STATELESS_LOGIN=True)
+    def test_stateless_login_does_not_write_a_session(self):
+        response = self.client.post(reverse('user-login'), self.credentials, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data['token'])
+        self.assertFalse(Session.objects.exists())
+
+    @override_settings(MEMBER_STATELESS_LOGIN=False)
+    def test_session_login(self):
+        response = self.client.post(reverse('user-login'), self.credentials, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(Session.objects.exists())
+
+    def test_invalid_credentials(self):
+        response = self.client.post(reverse('user-login'), {**self.credentials, 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(LOGIN_RATE_LIMIT={'EMAIL': {'CAPACITY': 2, 'REFILL_PER_MINUTE': 1}})
+    def test_login_attempts_are_rate_limited_per_email(self):
+        wrong_credentials = {**self.credentials, 'password': 'wrong'}
+        for _ in range(2):
+            response = self.client.post(reverse('user-login'), wrong_credentials, format='json')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Rejected before the password is checked, even when it is right
+        with patch('rest_api.member.api.authenticate') as authenticate:
+            response = self.client.post(reverse('user-login'), self.credentials, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '60')
+        authenticate.assert_not_called()
+
+        # Other emails have their own bucket
+        response = self.client.post(reverse('user-login'), {'email': 'other@example.com', 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_password_is_rehashed_when_the_iterations_change(self):
+        response = self.client.post(reverse('user-login'), self.credentials, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(self.user.check_password('password'))
+
+
+class CachedJWTAuthenticationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(email='member@example.com', password='password')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.url = reverse('my-bookings')
+
+    def test_user_state_is_cached(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as warm:
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(warm), len(cold) - 1)
+
+    def test_deactivated_user_is_rejected_immediately(self):
+        self.client.get(self.url)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
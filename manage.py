@@ -6,7 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'meeting_room_booking.settings')
+    # The test suite adds the site and replica databases of the routing tests
+    settings_module = 'test_settings' if sys.argv[1:2] == ['test'] else 'settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', f'meeting_room_booking.{settings_module}')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -50,6 +51,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.MetricsMiddleware',
+    'apps.core.middleware.RequestInstrumentationMiddleware',
+    'apps.core.middleware.BookingSiteMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,7 +91,37 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Database of an office site, used once listed in BOOKING_SITES
+    # 'site_shard': {
+    #     'ENGINE': 'django.db.backends.sqlite3',
+    #     'NAME': BASE_DIR / 'site_shard.sqlite3',
+    # },
+    # A read replica of 'default', used once listed in READ_REPLICAS
+    # 'replica': {
+    #     'ENGINE': 'django.db.backends.sqlite3',
+    #     'NAME': BASE_DIR / 'replica.sqlite3',
+    # },
+}
+
+# Meeting rooms and bookings of the sites listed in BOOKING_SITES are stored on the
+# site's database alias; users and every other model stay on 'default'. Requests
+# pick their site with the X-Booking-Site header or the site query parameter.
+# ID_OFFSET gives each site a disjoint range of primary keys, so IDs are unique
+# across databases. Migrate every site database: migrate --database <alias>.
+DATABASE_ROUTERS = ['apps.core.routers.SiteRouter']
+BOOKING_SITES = {
+    # 'paris': {'DATABASE': 'site_shard', 'ID_OFFSET': 10 ** 12},
+}
+
+# Read-only views (room listing and search, my bookings) read from a replica of
+# their database listed in DATABASES, e.g. {'default': ['replica']}. A user who
+# books or cancels is pinned to the primaries for PIN_SECONDS, a marker kept in
+# the CACHE_ALIAS cache, so they see their own changes despite replication lag.
+READ_REPLICAS = {
+    'DATABASES': {},
+    'PIN_SECONDS': 10,
+    'CACHE_ALIAS': 'default',
 }
 
 
@@ -109,6 +143,18 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing, the first hasher is used for new hashes and the others
+# still verify existing ones. PASSWORD_HASH_ITERATIONS tunes the CPU cost of a
+# login; changing it re-hashes passwords on the next successful login.
+PASSWORD_HASHERS = [
+    'apps.member.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = 600000
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -135,7 +181,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Use SimpleJWT's Token for authentication
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_api.member.authentication.CachedJWTAuthentication',
     ),
 }
 
@@ -150,6 +196,19 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = "member.CustomUser"
 
+# Seconds the active/staff state of a user is cached by CachedJWTAuthentication
+MEMBER_AUTH_CACHE_TIMEOUT = 60
+
+# The login endpoint only returns JWTs, without writing a session
+MEMBER_STATELESS_LOGIN = True
+
+# Token buckets of the login endpoint, checked before the password is hashed
+LOGIN_RATE_LIMIT = {
+    'CACHE_ALIAS': 'default',
+    'IP': {'CAPACITY': 20, 'REFILL_PER_MINUTE': 10},
+    'EMAIL': {'CAPACITY': 5, 'REFILL_PER_MINUTE': 1},
+}
+
 # Email configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -160,3 +219,120 @@ EMAIL_USE_TLS = True
 
 # Default "from" address for email messages sent by Django
 DEFAULT_FROM_EMAIL = 'no-reply@meetingroom.com' 
+
+# Seconds after which the in-process availability index is rebuilt from the database
+AVAILABILITY_INDEX_TTL = 300
+
+# Hub fanning the booking created/cancelled events out to the event streams.
+# LocalPubSub only reaches the clients of the same process; with several
+# workers use apps.core.pubsub.CachePubSub with a shared cache (Redis, Memcached).
+EVENT_HUB = {
+    'BACKEND': 'apps.core.pubsub.LocalPubSub',
+    'OPTIONS': {'buffer_size': 1000},
+}
+
+# Server-sent events and long-poll endpoints of the availability events
+AVAILABILITY_EVENTS = {
+    'HEARTBEAT_SECONDS': 15,
+    'STREAM_SECONDS': 300,
+    'RETRY_MS': 3000,
+    'POLL_TIMEOUT_SECONDS': 25,
+}
+
+# Stored responses of requests sent with an Idempotency-Key header (booking and cancellation).
+# Keys expire after TTL_SECONDS and are deleted by purge_idempotency_keys; a key
+# still in progress after LOCK_SECONDS is considered abandoned and can be reused
+# (its booking or cancellation did not commit, since the response is stored in its transaction).
+IDEMPOTENCY = {
+    'TTL_SECONDS': 86400,
+    'LOCK_SECONDS': 60,
+    'CACHE_ALIAS': 'default',
+}
+
+# Bookings that ended more than this many days ago are moved to the archive by archive_bookings
+BOOKING_ARCHIVE_AFTER_DAYS = 365
+
+# Waitlist: slots freed by cancellations are booked for the waiting users by the
+# promote_waitlist worker, BATCH_SIZE slots per batch, each claimed for LEASE_SECONDS
+BOOKING_WAITLIST = {
+    'BATCH_SIZE': 100,
+    'LEASE_SECONDS': 300,
+}
+
+# Tentative holds block their range for TTL_SECONDS unless confirmed; the
+# expire_holds sweeper deletes expired holds BATCH_SIZE rows per transaction
+BOOKING_HOLDS = {
+    'TTL_SECONDS': 300,
+    'BATCH_SIZE': 1000,
+}
+
+# Room usage analytics: default range of the report, and the rooms flagged as
+# no-show prone (average seat utilisation below the threshold over enough bookings)
+BOOKING_ANALYTICS = {
+    'DEFAULT_RANGE_DAYS': 7,
+    'NO_SHOW_SEAT_UTILISATION': 0.25,
+    'NO_SHOW_MIN_BOOKINGS': 5,
+}
+
+# Per request SQL/timing instrumentation (apps.core.middleware.RequestInstrumentationMiddleware)
+REQUEST_INSTRUMENTATION = {
+    'SAMPLE_RATE': 0.01,
+    'SLOW_QUERY_MS': 100,
+    'SLOW_REQUEST_MS': 1000,
+    'DUPLICATE_QUERY_THRESHOLD': 3,
+    'MAX_SLOW_QUERIES': 10,
+    'SERVER_TIMING': True,
+}
+
+# Prometheus metrics exposed at /metrics; set MULTIPROCESS_DIR (an empty directory
+# shared by the workers, cleared on deploy) when running several worker processes
+METRICS = {
+    'MULTIPROCESS_DIR': os.environ.get('METRICS_MULTIPROCESS_DIR'),
+    'FLUSH_INTERVAL': 1.0,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'apps.core.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Outbox worker (python manage.py send_outbox_emails) tuning
+EMAIL_OUTBOX = {
+    'BATCH_SIZE': 100,
+    'WORKERS': 4,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_SECONDS': 30,
+    'LEASE_SECONDS': 300,
+}
+
+# Maximum number of items accepted by the bulk booking endpoint
+BULK_BOOKING_MAX_ITEMS = 5000
+
+# Maximum number of occurrences of a recurring booking series
+RECURRING_BOOKING_MAX_OCCURRENCES = 1000
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Use 'django.core.cache.backends.redis.RedisCache' in production so every worker shares the version counters
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'meeting-room-booking',
+    }
+}
+
+# Cache alias and entry timeout (seconds) of the versioned room and availability read cache
+BOOKING_CACHE_ALIAS = 'default'
+BOOKING_CACHE_TIMEOUT = 3600
@@ -0,0 +1,20 @@
+"""
+Settings of the test suite: the project settings plus the databases of the routing tests.
+"""
+from meeting_room_booking.settings import *  # noqa: F401,F403
+from meeting_room_booking.settings import DATABASES
+
+# Stand-ins for an office site database and a read replica of 'default', used
+# by the site sharding and replica routing tests. SQLite test databases live in
+# memory, so no database file is created.
+DATABASES = {
+    **DATABASES,
+    'site_shard': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+}
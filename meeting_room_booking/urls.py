@@ -17,6 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from apps.core.views import metrics_view
+
 urlpatterns = [
     # Admin URLs
     path('admin/', admin.site.urls),
@@ -26,4 +28,7 @@ urlpatterns = [
 
     # Booking App URLs
     path('api/v1/meeting-rooms/', include('apps.booking.urls')),
+
+    # Prometheus metrics
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -1,45 +1,255 @@
 # imports
+import heapq
+import json
+from datetime import timedelta
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from rest_framework import generics
-from django.db.models import Q
-from apps.booking.models import BookingHistory, MeetingRoom
-from rest_api.booking.utils import is_meeting_room_available, send_cancellation_email, send_confirmation_email
+from apps.booking.analytics import PERIOD_STEPS, PERIODS, analytics_setting, room_usage
+from apps.booking.availability import availability_index
+from apps.booking.cache import cache_stats, cached_active_rooms, cached_busy_intervals
+from apps.booking.freebusy import busy_bitmap, free_intervals, merge_intervals
+from apps.booking.models import ArchivedBookingHistory, BookingHistory, BookingHold, MeetingRoom, RecurringBooking, WaitlistEntry
+from apps.booking.search import search_rooms
+from apps.booking.services import (
+    AlreadyWaitlisted, BookingConflict, BookingError, HoldExpired, HoldNotFound, InsufficientCapacity, MeetingRoomNotFound,
+    NoMeetingRoomAvailable, RecurrenceTooLong, RecurringBookingConflict, allocate_booking, cancel_booking, confirm_hold,
+    create_booking, create_bookings_bulk, create_hold, create_recurring_booking, join_waitlist, release_hold,
+)
+from apps.core.idempotency import idempotent, response_hook
+from apps.core.instrumentation import timed
+from apps.core.routers import read_database, replica_reads, site_databases
+from rest_api.booking.pagination import fanout_keyset_page
+from rest_api.booking.utils import (
+    filter_my_bookings, my_bookings_include_archive, parse_booking_window, parse_bulk_booking_item, parse_no_of_persons, parse_page_size,
+    parse_recurrence_rule, parse_room_search,
+)
 from .serializers import MeetingRoomSerializer
 from .serializers import BookingHistorySerializer
+from .serializers import WaitlistEntrySerializer
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
-import threading
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_api.member.authentication import CachedJWTAuthentication
 from django.utils import timezone
-from datetime import datetime
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
+
+
+# Responses of the idempotent views, also built in the transaction of their side effect (see response_hook)
+def booked_response(booking):
+    return Response({"message": "Meeting room booked successfully.", "id": booking.id}, status=status.HTTP_201_CREATED)
+
+
+def cancelled_response(booking):
+    return Response({"message": "Your Meeting Room Booking has been cancelled!"}, status=status.HTTP_204_NO_CONTENT)
+
+
+def waitlisted_response(entry):
+    return Response(WaitlistEntrySerializer(entry).data, status=status.HTTP_201_CREATED)
 
 
 class MeetingRoomListView(generics.ListCreateAPIView):
     """
     API View to list available meeting rooms during a specific time range.
+
+    Room metadata is served from the versioned read cache and availability
+    from the availability index, so a warm listing does not hit the database.
+    Reads are sent to the replicas (READ_REPLICAS), the shared cache entries
+    and index excepted.
     """
     serializer_class = MeetingRoomSerializer
 
     def get_queryset(self):
-        start_time = self.request.query_params.get('start_time', None)
-        end_time = self.request.query_params.get('end_time', None)
+        return MeetingRoom.objects.filter(is_active=True)
+
+    @replica_reads
+    def list(self, request, *args, **kwargs):
+        rooms = cached_active_rooms()
 
         # Check if start_time and end_time are provided in the request
-        if start_time or end_time:
-            # Filter meeting rooms based on availability during the specified time range
-            queryset = MeetingRoom.objects.filter(
-                Q(booking_histories__end_time__lte=start_time) | Q(booking_histories__start_time__gte=end_time) | Q(booking_histories__isnull=True),
-                is_active=True
-            ).distinct()
-        else:
-            # If start_time and end_time are not provided, return all meeting rooms
-            queryset = MeetingRoom.objects.filter(is_active=True)
+        if 'start_time' in request.query_params or 'end_time' in request.query_params:
+            start_time, end_time = parse_booking_window(request.query_params)
+
+            # Exclude the rooms the availability index reports as busy during the time range
+            busy_room_ids = availability_index.busy_room_ids(start_time, end_time, [room['id'] for room in rooms])
+            rooms = [room for room in rooms if room['id'] not in busy_room_ids]
+
+        with timed('serializer'):
+            data = self.get_serializer(rooms, many=True).data
+        return Response(data)
+
+
+class MeetingRoomSearchView(APIView):
+    """
+    API View searching meeting rooms by attributes and availability, ranked by best fit.
+
+    Query Parameters:
+    - min_capacity (int, optional): Number of persons the room must seat (default 1).
+    - max_capacity (int, optional): Largest capacity to return.
+    - building (str, optional): Building the room must be in.
+    - floor (str, optional): Comma separated floors the room may be on.
+    - equipment (str, optional): Comma separated equipment codes the room must all have, e.g. projector,vc.
+    - start_time (str, optional): Start of the range the room must be free during.
+    - end_time (str, optional): End of the range.
+    - page_size (int, optional): Maximum number of rooms (default 50).
+
+    Returns:
+    - 200 OK: The matching rooms, fewest spare seats first.
+    - 400 Bad Request: Invalid filters.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    default_page_size = 50
+    max_page_size = 500
+
+    @replica_reads
+    def get(self, request, *args, **kwargs):
+        filters = parse_room_search(request.query_params)
+        limit = parse_page_size(request.query_params.get('page_size'), self.default_page_size, self.max_page_size)
+        return Response({"rooms": search_rooms(limit=limit, **filters)}, status=status.HTTP_200_OK)
+
+
+class MeetingRoomFreeBusyView(APIView):
+    """
+    API View returning the free/busy timeline of many meeting rooms over a time window.
+
+    Query Parameters:
+    - start_time (str): Start of the window.
+    - end_time (str): End of the window, at most 31 days after start_time.
+    - granularity (int, optional): Slot length in minutes (default 15, at most a day).
+    - rooms (str, optional): Comma separated meeting room IDs, all active rooms by default.
 
-        return queryset
+    The bookings of every requested room are loaded with a single range query
+    (or served from the per room/day read cache) and converted to per room
+    bitmaps in memory.
 
+    Returns:
+    - 200 OK: For every room a busy bitmap ('1' per busy slot) and the exact free intervals.
+    - 400 Bad Request: Invalid window, granularity or room IDs.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    default_granularity = 15
+    max_granularity = 1440
+    max_slots = 10080
+    # Bounds the per room/day cache entries read by one request
+    max_window = timedelta(days=31)
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        start_time, end_time = parse_booking_window(params)
+        try:
+            granularity = int(params.get('granularity', self.default_granularity))
+        except ValueError:
+            raise ValidationError({"granularity": "A valid integer is required."})
+        if granularity < 1:
+            raise ValidationError({"granularity": "Ensure this value is greater than or equal to 1."})
+        # Larger values would overflow timedelta. Coarse slots make max_slots
+        # cover a long window, so the window length is bounded on its own too
+        if granularity > self.max_granularity:
+            raise ValidationError({"granularity": f"Ensure this value is less than or equal to {self.max_granularity}."})
+        if end_time - start_time > self.max_window:
+            raise ValidationError({"end_time": f"The window can be at most {self.max_window.days} days long."})
+        slot = timedelta(minutes=granularity)
+        slot_count = -((start_time - end_time) // slot)
+        if slot_count > self.max_slots:
+            raise ValidationError({"granularity": f"The window can contain at most {self.max_slots} slots."})
+
+        meeting_rooms = MeetingRoom.objects.filter(is_active=True).order_by('id')
+        if params.get('rooms'):
+            try:
+                room_ids = [int(room_id) for room_id in params['rooms'].split(',')]
+            except ValueError:
+                raise ValidationError({"rooms": "Expected comma separated meeting room IDs."})
+            meeting_rooms = meeting_rooms.filter(id__in=room_ids)
+        meeting_rooms = list(meeting_rooms)
+
+        busy_by_room = cached_busy_intervals([room.id for room in meeting_rooms], start_time, end_time)
+        rooms = []
+        for meeting_room in meeting_rooms:
+            busy = merge_intervals(busy_by_room[meeting_room.id], start_time, end_time)
+            rooms.append({
+                "id": meeting_room.id,
+                "room_name": meeting_room.room_name,
+                "capacity": meeting_room.capacity,
+                "busy": busy_bitmap(busy, start_time, slot_count, slot),
+                "free": [
+                    {"start_time": free_start, "end_time": free_end}
+                    for free_start, free_end in free_intervals(busy, start_time, end_time)
+                ],
+            })
+
+        return Response({
+            "start_time": start_time,
+            "end_time": end_time,
+            "granularity": granularity,
+            "rooms": rooms,
+        }, status=status.HTTP_200_OK)
+
+
+class BookingCacheStatsView(APIView):
+    """
+    API View exposing the hit/miss counters of the booking read cache of this process.
+
+    Returns:
+    - 200 OK: Hits and misses per cache namespace.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(cache_stats.snapshot(), status=status.HTTP_200_OK)
 
 
+class MeetingRoomAnalyticsView(APIView):
+    """
+    API View reporting the usage of meeting rooms, answered from the precomputed usage rollups.
+
+    Query Parameters:
+    - period (str, optional): hour, day (default) or week.
+    - start_time (str, optional): Start of the range, BOOKING_ANALYTICS['DEFAULT_RANGE_DAYS'] days ago by default.
+    - end_time (str, optional): End of the range, now by default.
+    - rooms (str, optional): Comma separated meeting room IDs, all active rooms by default.
+    - series (str, optional): true to include the metrics of every period of the range.
+
+    Returns:
+    - 200 OK: Booked minutes, bookings, occupancy, seat utilisation and no-show flag of every room.
+    - 400 Bad Request: Invalid period, range or room IDs.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    max_periods = 10000
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        period = params.get('period', 'day')
+        if period not in PERIODS:
+            raise ValidationError({"period": f"Must be one of {', '.join(PERIODS)}."})
+        if 'start_time' in params or 'end_time' in params:
+            start_time, end_time = parse_booking_window(params)
+        else:
+            end_time = timezone.now()
+            start_time = end_time - timedelta(days=analytics_setting('DEFAULT_RANGE_DAYS', 7))
+        series = params.get('series') == 'true'
+        if series and (end_time - start_time) / PERIOD_STEPS[period] > self.max_periods:
+            raise ValidationError({"period": f"The range can contain at most {self.max_periods} periods."})
+
+        room_ids = None
+        if params.get('rooms'):
+            try:
+                room_ids = [int(room_id) for room_id in params['rooms'].split(',')]
+            except ValueError:
+                raise ValidationError({"rooms": "Expected comma separated meeting room IDs."})
+
+        return Response(room_usage(period, start_time, end_time, room_ids, series=series), status=status.HTTP_200_OK)
+
 
 class MeetingRoomBookingView(generics.CreateAPIView):
     """
@@ -57,74 +267,377 @@ class MeetingRoomBookingView(generics.CreateAPIView):
     - 201 Created: Meeting room successfully booked.
     - 400 Bad Request: Invalid input or meeting room is not available.
     - 404 Not Found: Meeting room with the given ID does not exist.
+
+    Retries sent with the same Idempotency-Key header get the original response without booking again.
     """
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = BookingHistorySerializer
 
-
+    @idempotent
     def create(self, request, *args, **kwargs):
         room_id = self.kwargs.get('room_id')
-        start_time_str = request.data.get('start_time')
-        end_time_str = request.data.get('end_time')
-        no_of_persons = request.data.get('no_of_persons', 1)  # Default to 1 person if not provided
-        
-        # Convert to datetime objects
-        start_time = datetime.strptime(start_time_str, '%Y-%m-%d %I:%M %p')
-        end_time = datetime.strptime(end_time_str, '%Y-%m-%d %I:%M %p')
-        
+        start_time, end_time = parse_booking_window(request.data)
+        no_of_persons = parse_no_of_persons(request.data.get('no_of_persons'))  # Default to 1 person if not provided
+
+        # Check availability and capacity and save the booking in a single transaction locking the room
+        try:
+            booking = create_booking(
+                room_id, request.user, start_time, end_time, no_of_persons, before_commit=response_hook(booked_response),
+            )
+        except MeetingRoomNotFound as e:
+            return Response({"error": e.message}, status=status.HTTP_404_NOT_FOUND)
+        except (BookingConflict, InsufficientCapacity):
+            return Response({"error": "Meeting room is not available or does not have sufficient capacity for the specified time range and number of persons."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return booked_response(booking)
+
+
+
+class MeetingRoomHoldView(APIView):
+    """
+    API View for tentatively holding a meeting room while the user fills in the booking details.
+
+    The hold blocks the time range for other users like a booking, without
+    sending any email, until it is confirmed, released or expires
+    (BOOKING_HOLDS['TTL_SECONDS']).
+
+    Parameters:
+    - room_id (int): The ID of the meeting room to hold.
+
+    Request Body:
+    - start_time (str): Start time of the hold in ISO 8601 format.
+    - end_time (str): End time of the hold in ISO 8601 format.
+    - no_of_persons (int): Number of persons for the booking.
+
+    Returns:
+    - 201 Created: The ID of the hold and when it expires.
+    - 400 Bad Request: Invalid input or meeting room is not available.
+    - 404 Not Found: Meeting room with the given ID does not exist.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        start_time, end_time = parse_booking_window(request.data)
+        no_of_persons = parse_no_of_persons(request.data.get('no_of_persons'))
+
         try:
-            meeting_room = MeetingRoom.objects.get(pk=room_id, is_active=True)
-        except MeetingRoom.DoesNotExist:
-            return Response({"error": "Meeting room not found."}, status=status.HTTP_404_NOT_FOUND)
-
-        # Use ISO 8601 format when saving to serializer
-        serializer = self.get_serializer(data={
-            "meeting_room": meeting_room.id,
-            "start_time": start_time.isoformat(),
-            "end_time": end_time.isoformat(),
-            "no_of_persons": no_of_persons,
-        })
-        serializer.is_valid(raise_exception=True)
-
-        # Check if the meeting room is available for booking and has sufficient capacity
-        if not is_meeting_room_available(meeting_room, start_time, end_time) or meeting_room.capacity < no_of_persons:
+            hold = create_hold(self.kwargs.get('room_id'), request.user, start_time, end_time, no_of_persons)
+        except MeetingRoomNotFound as e:
+            return Response({"error": e.message}, status=status.HTTP_404_NOT_FOUND)
+        except (BookingConflict, InsufficientCapacity):
             return Response({"error": "Meeting room is not available or does not have sufficient capacity for the specified time range and number of persons."}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer.save(meeting_room=meeting_room, booked_by=request.user, no_of_persons=no_of_persons)
+        return Response({"id": hold.id, "expires_at": hold.expires_at}, status=status.HTTP_201_CREATED)
+
+
+class ConfirmMeetingRoomHoldView(APIView):
+    """
+    API View turning a hold into a booking, without checking availability again.
+
+    Parameters:
+    - hold_id (int): The ID of the hold.
+
+    Returns:
+    - 201 Created: Meeting room successfully booked.
+    - 404 Not Found: The user has no hold with the given ID.
+    - 410 Gone: The hold expired before being confirmed.
+
+    Retries sent with the same Idempotency-Key header get the original response without booking again.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        try:
+            booking = confirm_hold(self.kwargs.get('hold_id'), request.user, before_commit=response_hook(booked_response))
+        except HoldNotFound as e:
+            return Response({"error": e.message}, status=status.HTTP_404_NOT_FOUND)
+        except HoldExpired as e:
+            return Response({"error": e.message}, status=status.HTTP_410_GONE)
+        except BookingConflict as e:
+            return Response({"error": e.message}, status=status.HTTP_400_BAD_REQUEST)
+
+        return booked_response(booking)
+
+
+class ReleaseMeetingRoomHoldView(APIView):
+    """
+    API View releasing a hold before it expires.
+
+    Parameters:
+    - hold_id (int): The ID of the hold.
+
+    Returns:
+    - 204 No Content: The hold was released.
+    - 404 Not Found: The user has no hold with the given ID.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, *args, **kwargs):
+        hold = BookingHold.objects.filter(pk=self.kwargs.get('hold_id'), held_by=request.user).first()
+        if hold is None:
+            return Response({"error": "Meeting room hold not found."}, status=status.HTTP_404_NOT_FOUND)
+        release_hold(hold)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class RecurringMeetingRoomBookingView(APIView):
+    """
+    API View for booking a meeting room on a recurring schedule.
 
-        # Create a thread to send the confirmation email with necessary data
-        thread = threading.Thread(
-            target=send_confirmation_email,
-            args=(
-                meeting_room.room_name,
-                serializer.instance.start_time,
-                serializer.instance.end_time,
-                request.user.email,
+    Parameters:
+    - room_id (int): The ID of the meeting room to be booked.
+
+    Request Body:
+    - start_time (str): Start time of the first occurrence.
+    - end_time (str): End time of the first occurrence.
+    - no_of_persons (int): Number of persons for the booking (default is 1).
+    - frequency (str): daily, weekly or monthly.
+    - interval (int, optional): Days/weeks/months between occurrences (default is 1).
+    - until (str) or count (int): Last possible occurrence start or number of occurrences.
+    - exception_dates (list, optional): Start times of occurrences to skip.
+
+    Returns:
+    - 201 Created: The recurring booking was created.
+    - 400 Bad Request: Invalid input, insufficient capacity or too many occurrences.
+    - 404 Not Found: Meeting room with the given ID does not exist.
+    - 409 Conflict: Some occurrences overlap existing bookings, listed in conflicts.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        start_time, end_time = parse_booking_window(request.data)
+        no_of_persons = parse_no_of_persons(request.data.get('no_of_persons'))
+        rule = parse_recurrence_rule(request.data, start_time)
+
+        try:
+            recurring_booking = create_recurring_booking(
+                self.kwargs.get('room_id'), request.user, start_time, end_time, no_of_persons, **rule
             )
-        )
-        thread.start()
+        except MeetingRoomNotFound as e:
+            return Response({"error": e.message}, status=status.HTTP_404_NOT_FOUND)
+        except RecurringBookingConflict as e:
+            return Response({"error": e.message, "conflicts": e.conflicting_starts}, status=status.HTTP_409_CONFLICT)
+        except (InsufficientCapacity, RecurrenceTooLong) as e:
+            return Response({"error": e.message}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": "Recurring meeting room booking created successfully.",
+            "id": recurring_booking.id,
+            "ends_at": recurring_booking.ends_at,
+        }, status=status.HTTP_201_CREATED)
+
+
+class RecurringBookingOccurrencesView(APIView):
+    """
+    API View listing the occurrences of one of the user's recurring bookings within a time window.
+
+    Query Parameters:
+    - start_time (str): Start of the window.
+    - end_time (str): End of the window.
+
+    Returns:
+    - 200 OK: The occurrences overlapping the window.
+    - 404 Not Found: The recurring booking does not exist or belongs to another user.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    max_occurrences = 1000
+
+    def get(self, request, *args, **kwargs):
+        start_time, end_time = parse_booking_window(request.query_params)
+        try:
+            recurring_booking = RecurringBooking.objects.select_related('meeting_room').get(
+                pk=self.kwargs.get('recurring_booking_id'), booked_by=request.user
+            )
+        except RecurringBooking.DoesNotExist:
+            return Response({"error": "Recurring booking not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        occurrences = islice(recurring_booking.occurrences(start_time, end_time), self.max_occurrences)
+        return Response({
+            "id": recurring_booking.id,
+            "meeting_room": MeetingRoomSerializer(recurring_booking.meeting_room).data,
+            "occurrences": [
+                {"start_time": occurrence_start, "end_time": occurrence_end}
+                for occurrence_start, occurrence_end in occurrences
+            ],
+        }, status=status.HTTP_200_OK)
+
+
+class AllocateMeetingRoomView(APIView):
+    """
+    API View booking the smallest free meeting room that fits the requested number of persons.
+
+    Request Body:
+    - start_time (str): Start time of the booking.
+    - end_time (str): End time of the booking.
+    - no_of_persons (int): Number of persons for the booking (default is 1).
+
+    Returns:
+    - 201 Created: A meeting room was allocated and booked.
+    - 400 Bad Request: Invalid input or no fitting meeting room is free.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        start_time, end_time = parse_booking_window(request.data)
+        no_of_persons = parse_no_of_persons(request.data.get('no_of_persons'))
+
+        try:
+            booking = allocate_booking(request.user, start_time, end_time, no_of_persons)
+        except NoMeetingRoomAvailable as e:
+            return Response({"error": e.message}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": "Meeting room booked successfully.",
+            "id": booking.id,
+            "meeting_room": MeetingRoomSerializer(booking.meeting_room).data,
+        }, status=status.HTTP_201_CREATED)
+
+
+class BulkMeetingRoomBookingView(APIView):
+    """
+    API View for booking many meeting room slots in one request.
+
+    Request Body:
+    - bookings (list): Items with room_id, start_time, end_time and no_of_persons (optional, default 1).
+      A bare list of items is accepted as well.
+
+    All items are checked against existing bookings and against each other in a
+    single transaction; the accepted ones are inserted together.
+
+    Returns:
+    - 200 OK: Per item results, each with the item index and a status of
+      booked, conflict, insufficient_capacity, room_not_found or invalid.
+    - 400 Bad Request: The body is not a list of items or has too many items.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
 
-        return Response({"message": "Meeting room booked successfully."}, status=status.HTTP_201_CREATED)
+    result_statuses = {
+        BookingConflict: 'conflict',
+        InsufficientCapacity: 'insufficient_capacity',
+        MeetingRoomNotFound: 'room_not_found',
+    }
+
+    def post(self, request, *args, **kwargs):
+        raw_items = request.data.get('bookings') if isinstance(request.data, dict) else request.data
+        if not isinstance(raw_items, list):
+            return Response({"error": "Expected a list of bookings."}, status=status.HTTP_400_BAD_REQUEST)
+        max_items = getattr(settings, 'BULK_BOOKING_MAX_ITEMS', 5000)
+        if len(raw_items) > max_items:
+            return Response({"error": f"A batch can contain at most {max_items} bookings."}, status=status.HTTP_400_BAD_REQUEST)
+
+        items, results = [], {}
+        for index, raw_item in enumerate(raw_items):
+            try:
+                items.append(parse_bulk_booking_item(index, raw_item))
+            except ValidationError as e:
+                results[index] = {"index": index, "status": "invalid", "error": e.detail}
 
+        try:
+            outcomes = create_bookings_bulk(request.user, items)
+        except BookingConflict as e:
+            return Response({"error": e.message}, status=status.HTTP_409_CONFLICT)
+
+        for index, outcome in outcomes.items():
+            if isinstance(outcome, BookingError):
+                results[index] = {"index": index, "status": self.result_statuses[type(outcome)], "error": outcome.message}
+            else:
+                results[index] = {"index": index, "status": "booked", "id": outcome.id}
+
+        booked = sum(1 for result in results.values() if result['status'] == 'booked')
+        return Response({
+            "booked": booked,
+            "rejected": len(results) - booked,
+            "results": [results[index] for index in sorted(results)],
+        }, status=status.HTTP_200_OK)
 
 
 class MyBookingsView(APIView):
     """
     API View to retrieve a list of bookings made by the authenticated user.
 
+    Past bookings moved to ArchivedBookingHistory by the archive_bookings
+    command are merged back in, with one more query, whenever the requested
+    scope and dates may include them.
+
+    With several site databases (BOOKING_SITES), the bookings of every site
+    are fetched in parallel and merged, so travelling users see them all.
+    Bookings are read from the replicas (READ_REPLICAS) unless the user
+    booked or cancelled in the last few seconds.
+
+    Query Parameters:
+    - scope (str, optional): upcoming (ordered earliest first), past (latest first) or all (default, earliest first).
+    - start_date (str, optional): Only bookings starting at or after this date/datetime.
+    - end_date (str, optional): Only bookings starting before this date/datetime.
+    - page_size (int, optional): Number of bookings per page (default 50, at most 200).
+    - cursor (str, optional): The next_cursor returned with the previous page.
+    - stream (str, optional): ndjson to stream every matching booking as newline delimited JSON instead of pages.
+
     Returns:
-    - 200 OK: List of bookings for the authenticated user.
+    - 200 OK: A page of bookings for the authenticated user and the cursor of the next page.
     """
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    default_page_size = 50
+    max_page_size = 200
+    stream_chunk_size = 500
+
+    def get_querysets(self):
+        """
+        Returns the live bookings to list, preceded by the archived ones when
+        the requested range may include archived bookings, on every site
+        database, and whether they are walked from the latest to the earliest.
+        """
+        params = self.request.query_params
+        bookings, descending = filter_my_bookings(
+            BookingHistory.objects.filter(booked_by=self.request.user).select_related('meeting_room'), params
+        )
+        querysets = [bookings]
+        if my_bookings_include_archive(params):
+            archived, _ = filter_my_bookings(
+                ArchivedBookingHistory.objects.filter(booked_by=self.request.user).select_related('meeting_room'), params
+            )
+            querysets.insert(0, archived)
+        return [queryset.using(read_database(alias)) for alias in site_databases() for queryset in querysets], descending
+
+    def get_page_size(self):
+        return parse_page_size(self.request.query_params.get('page_size'), self.default_page_size, self.max_page_size)
+
+    @replica_reads
     def get(self, request, *args, **kwargs):
-        user = self.request.user
-        bookings = BookingHistory.objects.filter(booked_by=user)
-        serializer = BookingHistorySerializer(bookings, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    
+        querysets, descending = self.get_querysets()
+
+        if request.query_params.get('stream') == 'ndjson':
+            ordering = ('-start_time', '-id') if descending else ('start_time', 'id')
+            return StreamingHttpResponse(
+                self.stream_rows([queryset.order_by(*ordering) for queryset in querysets], descending),
+                content_type='application/x-ndjson',
+            )
+
+        rows, next_cursor = fanout_keyset_page(querysets, request.query_params.get('cursor'), self.get_page_size(), descending)
+        with timed('serializer'):
+            data = BookingHistorySerializer(rows, many=True).data
+        return Response({"results": data, "next_cursor": next_cursor}, status=status.HTTP_200_OK)
+
+    def stream_rows(self, querysets, descending):
+        # Rows are fetched chunk by chunk and serialised one at a time, never building the full list
+        bookings = heapq.merge(
+            *(queryset.iterator(chunk_size=self.stream_chunk_size) for queryset in querysets),
+            key=lambda booking: (booking.start_time, booking.id),
+            reverse=descending,
+        )
+        for booking in bookings:
+            yield json.dumps(BookingHistorySerializer(booking).data, cls=DjangoJSONEncoder) + '\n'
 
 
 class CancelMeetingRoomBookingView(generics.DestroyAPIView):
@@ -138,38 +651,125 @@ class CancelMeetingRoomBookingView(generics.DestroyAPIView):
     - 204 No Content: Meeting room booking successfully canceled.
     - 400 Bad Request: Invalid input or unable to cancel the booking.
     - 404 Not Found: Meeting room booking with the given ID does not exist.
+
+    Retries sent with the same Idempotency-Key header get the original response instead of a 404.
     """
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = BookingHistorySerializer
 
+    @idempotent
     def destroy(self, request, *args, **kwargs):
         booking_id = self.kwargs.get('booking_id')
-        print(request.user)
 
         try:
-            booking = BookingHistory.objects.get(pk=booking_id, booked_by=request.user)
+            booking = BookingHistory.objects.select_related('meeting_room').get(pk=booking_id, booked_by=request.user)
         except BookingHistory.DoesNotExist:
             return Response({"error": "Meeting room booking not found or you are not authorized to cancel this booking."}, status=status.HTTP_404_NOT_FOUND)
+        # Users are not joined in SQL, they may live on another database than the booking
+        booking.booked_by = request.user
 
         # Check if cancellation is allowed based on start time
         current_time = timezone.now()
         if booking.start_time <= current_time:
             return Response({"error": "Meeting room booking cannot be canceled as the start time has already passed."}, status=status.HTTP_400_BAD_REQUEST)
 
-        booking.delete()
+        # Delete the booking and queue the cancellation email atomically, with the stored response of a retried request
+        cancel_booking(booking, before_commit=response_hook(cancelled_response))
+
+        return cancelled_response(booking)
+    
+
+class MeetingRoomWaitlistView(APIView):
+    """
+    API View for joining the waitlist of a meeting room.
 
-        # Create a thread to send the cancellation email with necessary data
-        thread = threading.Thread(
-            target=send_cancellation_email,
-            args=(
-                booking.meeting_room.room_name,
-                booking.start_time,
-                booking.end_time,
-                request.user.email,
+    Instead of retrying the booking endpoint until a cancellation frees the
+    room, the user queues once: the promote_waitlist worker books the room
+    for the first waiting user that fits when a cancellation frees the time
+    range, and sends the usual confirmation email.
+
+    Parameters:
+    - room_id (int): The ID of the meeting room waited for.
+
+    Request Body:
+    - start_time (str): Start time of the wanted booking in ISO 8601 format.
+    - end_time (str): End time of the wanted booking in ISO 8601 format.
+    - no_of_persons (int): Number of persons for the wanted booking.
+
+    Returns:
+    - 201 Created: The waitlist entry.
+    - 400 Bad Request: Invalid input, a time range in the past or a room too small.
+    - 404 Not Found: Meeting room with the given ID does not exist.
+    - 409 Conflict: The user already waits for the room during the time range.
+
+    Retries sent with the same Idempotency-Key header get the original response without queueing again.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        start_time, end_time = parse_booking_window(request.data)
+        no_of_persons = parse_no_of_persons(request.data.get('no_of_persons'))
+        if start_time <= timezone.now():
+            return Response({"error": "Cannot join the waitlist of a time range that has already started."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            entry = join_waitlist(
+                self.kwargs.get('room_id'), request.user, start_time, end_time, no_of_persons,
+                before_commit=response_hook(waitlisted_response),
             )
-        )
-        thread.start()
+        except MeetingRoomNotFound as e:
+            return Response({"error": e.message}, status=status.HTTP_404_NOT_FOUND)
+        except InsufficientCapacity as e:
+            return Response({"error": e.message}, status=status.HTTP_400_BAD_REQUEST)
+        except AlreadyWaitlisted as e:
+            return Response({"error": e.message}, status=status.HTTP_409_CONFLICT)
+
+        return waitlisted_response(entry)
+
+
+class MyWaitlistView(APIView):
+    """
+    API View listing the waitlist entries of the authenticated user that are still waiting, on every site.
+
+    Returns:
+    - 200 OK: The waiting entries, earliest start time first.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        entries = [
+            entry
+            for alias in site_databases()
+            for entry in WaitlistEntry.objects.using(alias).filter(
+                user=request.user, status=WaitlistEntry.STATUS_WAITING
+            ).select_related('meeting_room')
+        ]
+        entries.sort(key=lambda entry: (entry.start_time, entry.id))
+        return Response({"results": WaitlistEntrySerializer(entries, many=True).data}, status=status.HTTP_200_OK)
+
+
+class LeaveWaitlistView(APIView):
+    """
+    API View for leaving the waitlist of a meeting room.
+
+    Parameters:
+    - entry_id (int): The ID of the waitlist entry.
+
+    Returns:
+    - 204 No Content: The entry was removed.
+    - 404 Not Found: No waiting entry of the user has the given ID.
+    """
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
 
-        return Response({"message": "Your Meeting Room Booking has been cancelled!"}, status=status.HTTP_204_NO_CONTENT)
-    
\ No newline at end of file
+    def delete(self, request, *args, **kwargs):
+        deleted, _ = WaitlistEntry.objects.filter(
+            pk=self.kwargs.get('entry_id'), user=request.user, status=WaitlistEntry.STATUS_WAITING
+        ).delete()
+        if not deleted:
+            return Response({"error": "Waitlist entry not found or no longer waiting."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,295 @@
+import asyncio
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from apps.booking.availability import availability_index
+from apps.booking.cache import cached_active_rooms
+from apps.booking.events import AVAILABILITY_CHANNEL
+from apps.booking.metrics import booking_attempts
+from apps.booking.models import ArchivedBookingHistory, BookingHistory, MeetingRoom
+from apps.booking.services import BookingConflict, BookingError, InsufficientCapacity, MeetingRoomNotFound, create_booking
+from apps.core.instrumentation import timed
+from apps.core.pubsub import get_event_hub
+from apps.core.routers import read_database, replica_reads, site_databases
+from rest_api.booking.pagination import amerged_keyset_page, fanout_keyset_page
+from rest_api.booking.serializers import BookingHistorySerializer, MeetingRoomSerializer
+from rest_api.booking.utils import (
+    filter_my_bookings, my_bookings_include_archive, parse_booking_window, parse_event_id, parse_no_of_persons,
+    parse_page_size, parse_room_ids,
+)
+from rest_api.member.authentication import AsyncCachedJWTAuthentication
+
+
+class AsyncAPIView(View):
+    """
+    Base class of the async endpoints, served on the event loop under ASGI.
+
+    Requests are authenticated with a JWT bearer token and validation errors
+    of the shared parsing helpers become 400 responses, like in the DRF views.
+    """
+    authentication = AsyncCachedJWTAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Token authenticated, like the DRF views
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await self.authentication.aauthenticate(request)
+        except InvalidToken:
+            return JsonResponse({"error": "Given token not valid for any token type."}, status=401)
+        except AuthenticationFailed as e:
+            return JsonResponse({"error": str(e.detail)}, status=401)
+        if request.user is None:
+            return JsonResponse({"error": "Authentication credentials were not provided."}, status=401)
+
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except ValidationError as e:
+            return JsonResponse(e.detail, status=400, safe=False)
+
+    def parse_json(self, request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ValidationError({"error": "Invalid JSON body."})
+        if not isinstance(data, dict):
+            raise ValidationError({"error": "Expected a JSON object."})
+        return data
+
+
+class AsyncMeetingRoomListView(AsyncAPIView):
+    """
+    Async version of MeetingRoomListView.
+
+    Query Parameters:
+    - start_time (str, optional): Start of the time range.
+    - end_time (str, optional): End of the time range, required together with start_time.
+
+    Returns:
+    - 200 OK: The active meeting rooms, free during the time range when one is given.
+    """
+
+    @replica_reads
+    async def get(self, request, *args, **kwargs):
+        # Served from the read cache and the availability index, which only hit the database when cold
+        rooms = await sync_to_async(cached_active_rooms)()
+
+        if 'start_time' in request.GET or 'end_time' in request.GET:
+            start_time, end_time = parse_booking_window(request.GET)
+            busy_room_ids = await sync_to_async(availability_index.busy_room_ids)(
+                start_time, end_time, [room['id'] for room in rooms]
+            )
+            rooms = [room for room in rooms if room['id'] not in busy_room_ids]
+
+        with timed('serializer'):
+            data = MeetingRoomSerializer(rooms, many=True).data
+        return JsonResponse(data, safe=False)
+
+
+class AsyncMeetingRoomBookingView(AsyncAPIView):
+    """
+    Async version of MeetingRoomBookingView.
+
+    Requests that cannot succeed (unknown room, too many persons, overlapping
+    booking) are rejected with async queries on the event loop. The others
+    are booked by create_booking in a worker thread, since the transaction
+    holding the room lock cannot run on the async ORM. The confirmation email
+    is queued in the outbox by that transaction and sent by the outbox
+    worker, off the request path.
+
+    Parameters:
+    - room_id (int): The ID of the meeting room to be booked.
+
+    Returns:
+    - 201 Created: Meeting room successfully booked.
+    - 400 Bad Request: Invalid input or meeting room is not available.
+    - 404 Not Found: Meeting room with the given ID does not exist.
+    """
+    unavailable_message = "Meeting room is not available or does not have sufficient capacity for the specified time range and number of persons."
+
+    async def post(self, request, room_id, *args, **kwargs):
+        data = self.parse_json(request)
+        start_time, end_time = parse_booking_window(data)
+        no_of_persons = parse_no_of_persons(data.get('no_of_persons'))
+
+        try:
+            meeting_room = await MeetingRoom.objects.aget(pk=room_id, is_active=True)
+        except MeetingRoom.DoesNotExist:
+            return self.rejected(MeetingRoomNotFound())
+        if meeting_room.capacity < no_of_persons:
+            return self.rejected(InsufficientCapacity())
+        if await BookingHistory.objects.filter(
+            meeting_room_id=room_id, start_time__lt=end_time, end_time__gt=start_time
+        ).aexists():
+            return self.rejected(BookingConflict())
+
+        try:
+            booking = await sync_to_async(create_booking)(room_id, request.user, start_time, end_time, no_of_persons)
+        except MeetingRoomNotFound as e:
+            return JsonResponse({"error": e.message}, status=404)
+        except BookingError:
+            return JsonResponse({"error": self.unavailable_message}, status=400)
+
+        return JsonResponse({"message": "Meeting room booked successfully.", "id": booking.id}, status=201)
+
+    def rejected(self, error):
+        # Counted like the rejections of create_booking, which these requests never reach
+        booking_attempts.inc(operation='book', outcome=error.outcome)
+        if isinstance(error, MeetingRoomNotFound):
+            return JsonResponse({"error": error.message}, status=404)
+        return JsonResponse({"error": self.unavailable_message}, status=400)
+
+
+class AsyncMyBookingsView(AsyncAPIView):
+    """
+    Async version of MyBookingsView, paging with async iteration and merging the archive like it.
+    With several site databases, the databases are paged in parallel by fanout_keyset_page in worker threads.
+
+    Query Parameters:
+    - scope, start_date, end_date, page_size, cursor: As for MyBookingsView.
+
+    Returns:
+    - 200 OK: A page of bookings for the authenticated user and the cursor of the next page.
+    """
+    default_page_size = 50
+    max_page_size = 200
+
+    @replica_reads
+    async def get(self, request, *args, **kwargs):
+        bookings = BookingHistory.objects.filter(booked_by=request.user).select_related('meeting_room')
+        bookings, descending = filter_my_bookings(bookings, request.GET)
+        querysets = [bookings]
+        if my_bookings_include_archive(request.GET):
+            archived = ArchivedBookingHistory.objects.filter(booked_by=request.user).select_related('meeting_room')
+            querysets.insert(0, filter_my_bookings(archived, request.GET)[0])
+        page_size = parse_page_size(request.GET.get('page_size'), self.default_page_size, self.max_page_size)
+
+        databases = site_databases()
+        if len(databases) > 1:
+            querysets = [queryset.using(read_database(alias)) for alias in databases for queryset in querysets]
+            rows, next_cursor = await sync_to_async(fanout_keyset_page, thread_sensitive=False)(
+                querysets, request.GET.get('cursor'), page_size, descending,
+            )
+        else:
+            rows, next_cursor = await amerged_keyset_page(querysets, request.GET.get('cursor'), page_size, descending)
+        with timed('serializer'):
+            data = BookingHistorySerializer(rows, many=True).data
+        return JsonResponse({"results": data, "next_cursor": next_cursor})
+
+
+def events_setting(name, default):
+    return getattr(settings, 'AVAILABILITY_EVENTS', {}).get(name, default)
+
+
+class AsyncAvailabilityEventsView(AsyncAPIView):
+    """
+    Server-sent events stream of the booking created and cancelled events, a
+    push alternative to polling the available rooms listing.
+
+    Events come from the event hub (EVENT_HUB), fed by the BookingHistory
+    signals once their transaction commits. Each connection waits on the
+    event loop without holding a thread, gets a keepalive comment every
+    HEARTBEAT_SECONDS and is closed after STREAM_SECONDS; EventSource clients
+    then reconnect with the Last-Event-ID header and receive the events they
+    missed, as long as the hub still buffers them.
+
+    Query Parameters:
+    - rooms (str, optional): Comma separated meeting room IDs, every room by default.
+    - last_event_id (int, optional): Like the Last-Event-ID header, for clients that cannot set it.
+
+    Returns:
+    - 200 OK: A text/event-stream of booking.created and booking.cancelled events.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        room_ids = parse_room_ids(request.GET.get('rooms'))
+        after = parse_event_id(
+            request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'), 'last_event_id'
+        )
+        hub = get_event_hub()
+        if after is None:
+            # A new client loads the listing once and only needs the events from now on
+            after = hub.last_event_id(AVAILABILITY_CHANNEL)
+
+        response = StreamingHttpResponse(self.stream(hub, after, room_ids), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stops nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, hub, after, room_ids):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + events_setting('STREAM_SECONDS', 300)
+        heartbeat = events_setting('HEARTBEAT_SECONDS', 15)
+        yield f"retry: {events_setting('RETRY_MS', 3000)}\n\n"
+        while (remaining := deadline - loop.time()) > 0:
+            events = await hub.wait(AVAILABILITY_CHANNEL, after, min(heartbeat, remaining))
+            if not events:
+                yield ": keepalive\n\n"
+                continue
+            for event_id, event in events:
+                after = event_id
+                if room_ids is None or event['room_id'] in room_ids:
+                    yield f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+class AsyncAvailabilityPollView(AsyncAPIView):
+    """
+    Long-poll version of AsyncAvailabilityEventsView, for clients that cannot use server-sent events.
+
+    The request is answered as soon as matching events are published, or
+    with no events after the timeout; the client then polls again with the
+    returned last_event_id.
+
+    Query Parameters:
+    - after (int, optional): last_event_id of the previous response. Without it the
+      current last_event_id is returned right away.
+    - rooms (str, optional): Comma separated meeting room IDs, every room by default.
+    - timeout (float, optional): Seconds to wait for events, at most POLL_TIMEOUT_SECONDS (the default).
+
+    Returns:
+    - 200 OK: The events after the given ID and the ID to poll from next.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        room_ids = parse_room_ids(request.GET.get('rooms'))
+        after = parse_event_id(request.GET.get('after'), 'after')
+        max_timeout = events_setting('POLL_TIMEOUT_SECONDS', 25)
+        try:
+            timeout = float(request.GET.get('timeout', max_timeout))
+        except ValueError:
+            raise ValidationError({"timeout": "A valid number is required."})
+        # nan would slip through min() and max()
+        if not math.isfinite(timeout):
+            raise ValidationError({"timeout": "A valid number is required."})
+        timeout = min(max(timeout, 0), max_timeout)
+
+        hub = get_event_hub()
+        if after is None:
+            return JsonResponse({"events": [], "last_event_id": hub.last_event_id(AVAILABILITY_CHANNEL)})
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        matching = []
+        remaining = timeout
+        while True:
+            for event_id, event in await hub.wait(AVAILABILITY_CHANNEL, after, remaining):
+                after = event_id
+                if room_ids is None or event['room_id'] in room_ids:
+                    matching.append({"id": event_id, **event})
+            # Events of other rooms do not end the wait
+            remaining = deadline - loop.time()
+            if matching or remaining <= 0:
+                break
+        return JsonResponse({"events": matching, "last_event_id": after})
@@ -0,0 +1,174 @@
+import base64
+import binascii
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def encode_cursor(start_time, booking_id):
+    """
+    Encode the (start_time, id) position of the last row of a page as an opaque cursor.
+    """
+    payload = json.dumps([start_time.isoformat(), booking_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Returns:
+    - tuple: (start_time, id) of the last row of the previous page.
+
+    Raises:
+    - ValidationError: If the cursor is malformed.
+    """
+    try:
+        start_time, booking_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        start_time = parse_datetime(start_time)
+        booking_id = int(booking_id)
+    except (binascii.Error, TypeError, ValueError, UnicodeError):
+        raise ValidationError({"cursor": "Invalid cursor."})
+    if start_time is None:
+        raise ValidationError({"cursor": "Invalid cursor."})
+    return start_time, booking_id
+
+
+def keyset_queryset(queryset, cursor, descending=False):
+    """
+    Restrict bookings to the rows after the cursor position, ordered by (start_time, id).
+    """
+    if cursor:
+        start_time, booking_id = decode_cursor(cursor)
+        if descending:
+            queryset = queryset.filter(Q(start_time__lt=start_time) | Q(start_time=start_time, id__lt=booking_id))
+        else:
+            queryset = queryset.filter(Q(start_time__gt=start_time) | Q(start_time=start_time, id__gt=booking_id))
+
+    ordering = ('-start_time', '-id') if descending else ('start_time', 'id')
+    return queryset.order_by(*ordering)
+
+
+def split_page(rows, page_size):
+    """
+    Split the page_size + 1 rows fetched for a page into the page and the cursor of the next page.
+    """
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id)
+    return rows, next_cursor
+
+
+def keyset_page(queryset, cursor, page_size, descending=False):
+    """
+    Fetch one page of bookings ordered by (start_time, id) using keyset pagination.
+
+    Rather than an OFFSET, the page starts right after the (start_time, id)
+    position stored in the cursor, so every page costs one index range scan
+    no matter how deep the client has paged.
+
+    Parameters:
+    - queryset (QuerySet): Bookings to paginate.
+    - cursor (str): Cursor returned with the previous page, or None for the first page.
+    - page_size (int): Maximum number of rows of the page.
+    - descending (bool): Walk from the latest to the earliest booking.
+
+    Returns:
+    - tuple: (rows of the page, cursor of the next page or None).
+    """
+    rows = list(keyset_queryset(queryset, cursor, descending)[:page_size + 1])
+    return split_page(rows, page_size)
+
+
+async def akeyset_page(queryset, cursor, page_size, descending=False):
+    """
+    Async version of keyset_page, fetching the rows with async iteration.
+    """
+    rows = [row async for row in keyset_queryset(queryset, cursor, descending)[:page_size + 1]]
+    return split_page(rows, page_size)
+
+
+def merge_pages(pages, page_size, descending=False):
+    """
+    Merge the rows fetched for one page from several tables into a single (start_time, id) ordered page.
+    """
+    rows = sorted(
+        (row for rows in pages for row in rows),
+        key=lambda row: (row.start_time, row.id),
+        reverse=descending,
+    )
+    return split_page(rows[:page_size + 1], page_size)
+
+
+def merged_keyset_page(querysets, cursor, page_size, descending=False):
+    """
+    Fetch one page of bookings spread over several querysets (e.g. live and archived bookings).
+
+    Every queryset is paged from the same cursor with one query, and the
+    page is the first page_size rows of their merge. This works because a
+    (start_time, id) position means the same thing in every table.
+    """
+    pages = [list(keyset_queryset(queryset, cursor, descending)[:page_size + 1]) for queryset in querysets]
+    return merge_pages(pages, page_size, descending)
+
+
+async def amerged_keyset_page(querysets, cursor, page_size, descending=False):
+    """
+    Async version of merged_keyset_page.
+    """
+    pages = [
+        [row async for row in keyset_queryset(queryset, cursor, descending)[:page_size + 1]]
+        for queryset in querysets
+    ]
+    return merge_pages(pages, page_size, descending)
+
+
+_fanout_executor = None
+
+
+def fanout_executor():
+    global _fanout_executor
+    if _fanout_executor is None:
+        _fanout_executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BOOKING_SITE_FANOUT_WORKERS', 8), thread_name_prefix='site-fanout',
+        )
+    return _fanout_executor
+
+
+def fanout_keyset_page(querysets, cursor, page_size, descending=False):
+    """
+    Fetch one page of bookings spread over several databases, e.g. the bookings of a user on every site.
+
+    The querysets are grouped by database and every database is paged from
+    the same cursor in its own worker thread, so the page costs the latency
+    of the slowest database rather than the sum. IDs are unique across
+    databases, so the pages merge like those of merged_keyset_page.
+    """
+    groups = {}
+    for queryset in querysets:
+        groups.setdefault(queryset.db, []).append(queryset)
+    if len(groups) == 1:
+        return merged_keyset_page(querysets, cursor, page_size, descending)
+
+    def fetch(group):
+        try:
+            return [list(keyset_queryset(queryset, cursor, descending)[:page_size + 1]) for queryset in group]
+        finally:
+            # Worker threads are reused, their connections are not kept between requests
+            connections[group[0].db].close()
+
+    # Copied per task, so the workers see the request's context (e.g. its instrumentation metrics)
+    contexts = [copy_context() for _ in groups]
+    pages = [
+        page
+        for group_pages in fanout_executor().map(lambda context, group: context.run(fetch, group), contexts, groups.values())
+        for page in group_pages
+    ]
+    return merge_pages(pages, page_size, descending)
@@ -1,17 +1,36 @@
 # serializers.py
 from rest_framework import serializers
 
-from apps.booking.models import BookingHistory, MeetingRoom
+from apps.booking.models import BookingHistory, MeetingRoom, WaitlistEntry
+from apps.core.routers import site_for_database
 
 
 class MeetingRoomSerializer(serializers.ModelSerializer):
     class Meta:
         model = MeetingRoom
-        fields = ['id', 'room_name', 'capacity']
+        fields = ['id', 'room_name', 'capacity', 'building', 'floor']
 
 
 class BookingHistorySerializer(serializers.ModelSerializer):
     meeting_room = MeetingRoomSerializer()
+    # Site of the database the booking was read from, None for the default database
+    site = serializers.SerializerMethodField()
+
     class Meta:
         model = BookingHistory
-        fields = ['id', 'meeting_room', 'start_time', 'end_time']
+        fields = ['id', 'meeting_room', 'start_time', 'end_time', 'site']
+
+    def get_site(self, booking):
+        return site_for_database(booking._state.db)
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    meeting_room = MeetingRoomSerializer()
+    site = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'meeting_room', 'start_time', 'end_time', 'no_of_persons', 'status', 'created_at', 'site']
+
+    def get_site(self, entry):
+        return site_for_database(entry._state.db)
@@ -1,86 +1,299 @@
+from datetime import datetime
 
-from django.conf import settings
-from django.core.mail import send_mail
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
 
+from apps.booking import recurrence
 
-def is_meeting_room_available(booking, start_time, end_time):
+
+def parse_booking_datetime(value, field_name):
     """
-    Checks if the meeting room is available for the current booking.
+    Parse a booking datetime sent by a client.
+
+    Parameters:
+    - value (str): Datetime in ISO 8601 or 'YYYY-MM-DD HH:MM AM/PM' format.
+    - field_name (str): Name of the field, used in the error message.
 
     Returns:
-        bool: True if the meeting room is available, False otherwise.
+    - datetime: Timezone aware datetime.
+
+    Raises:
+    - ValidationError: If the value is missing or cannot be parsed.
     """
-    return not booking.booking_histories.filter(
-        start_time__lt=end_time,
-        end_time__gt=start_time
-    ).exists()
+    if not value:
+        raise ValidationError({field_name: "This field is required."})
+    try:
+        parsed = parse_datetime(value)
+    except (TypeError, ValueError):
+        parsed = None
+    if parsed is None:
+        try:
+            parsed = datetime.strptime(value, '%Y-%m-%d %I:%M %p')
+        except (TypeError, ValueError):
+            raise ValidationError({field_name: "Invalid datetime format."})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
 
 
-def send_confirmation_email(room_name, start_time, end_time, booked_by_email):
+def parse_booking_window(data):
     """
-    Send a confirmation email for a meeting room booking.
+    Parse and validate the start_time/end_time pair of a request.
 
-    Parameters:
-    - room_name (str): The name of the booked meeting room.
-    - start_time (datetime): The start time of the booking.
-    - end_time (datetime): The end time of the booking.
-    - booked_by_email (str): The email address of the user who made the booking.
-
-    The email will contain details of the booking, including the meeting room name, date, and time.
-
-    Example:
-    send_confirmation_email('Conference Room A', datetime(2023, 12, 15, 10, 0), datetime(2023, 12, 15, 12, 0), 'user@example.com')
-    """
-    subject = 'Meeting Room Booking Confirmation'
-    formatted_start_time = start_time.strftime("%d-%B-%Y %I:%M %p")
-    formatted_end_time = end_time.strftime("%I:%M %p")
-    message = f'You have successfully booked meeting room {room_name}. Your booking details:\nDate & Time: {formatted_start_time}  -  {formatted_end_time}.'
-    from_email = settings.DEFAULT_FROM_EMAIL
-    to_email = booked_by_email
+    Returns:
+    - tuple: (start_time, end_time) as timezone aware datetimes.
+
+    Raises:
+    - ValidationError: If a value is invalid or end_time is not after start_time.
+    """
+    start_time = parse_booking_datetime(data.get('start_time'), 'start_time')
+    end_time = parse_booking_datetime(data.get('end_time'), 'end_time')
+    if end_time <= start_time:
+        raise ValidationError({"end_time": "end_time must be after start_time."})
+    return start_time, end_time
+
+
+def parse_no_of_persons(value):
+    """
+    Parse the number of persons of a booking, defaulting to 1 person.
+
+    Raises:
+    - ValidationError: If the value is not a positive integer.
+    """
+    if value in (None, ''):
+        return 1
+    # int() would truncate 2.7 to 2 and accept true as 1
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValidationError({"no_of_persons": "A valid integer is required."})
     try:
-        send_mail(subject, message, from_email, [to_email])
-    except Exception as e:
-        print(f"Error sending confirmation email: {e}")
+        no_of_persons = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({"no_of_persons": "A valid integer is required."})
+    if no_of_persons < 1:
+        raise ValidationError({"no_of_persons": "Ensure this value is greater than or equal to 1."})
+    return no_of_persons
 
 
-def send_cancellation_email(room_name, start_time, end_time, booked_by_email):
+def parse_bulk_booking_item(index, data):
     """
-    Send a cancellation email for a meeting room booking.
+    Parse one item of a bulk booking request.
 
-    Parameters:
-    - room_name (str): The name of the canceled meeting room booking.
-    - start_time (datetime): The start time of the canceled booking.
-    - end_time (datetime): The end time of the canceled booking.
-    - booked_by_email (str): The email address of the user who made the canceled booking.
-
-    The email will notify the user about the cancellation and include details such as the meeting room name, date, and time.
-
-    Example:
-    send_cancellation_email('Conference Room A', datetime(2023, 12, 15, 10, 0), datetime(2023, 12, 15, 12, 0), 'user@example.com')
-    """
-    subject = 'Meeting Room Booking Cancellation'
-    formatted_start_time = start_time.strftime("%d-%B-%Y %I:%M %p")
-    formatted_end_time = end_time.strftime("%I:%M %p")
-    message = f'Your booking for meeting room {room_name} from {formatted_start_time} to {formatted_end_time} has been canceled.'
-    from_email = settings.DEFAULT_FROM_EMAIL
-    to_email = booked_by_email
+    Returns:
+    - dict: index, room_id, start_time, end_time and no_of_persons of the item.
+
+    Raises:
+    - ValidationError: If the item is not a valid booking.
+    """
+    if not isinstance(data, dict):
+        raise ValidationError({"non_field_errors": "Expected an object."})
     try:
-        send_mail(subject, message, from_email, [to_email])
-    except Exception as e:
-        print(f"Error sending cancellation email: {e}")
+        room_id = int(data.get('room_id'))
+    except (TypeError, ValueError):
+        raise ValidationError({"room_id": "A valid integer is required."})
+    start_time, end_time = parse_booking_window(data)
+    return {
+        "index": index,
+        "room_id": room_id,
+        "start_time": start_time,
+        "end_time": end_time,
+        "no_of_persons": parse_no_of_persons(data.get('no_of_persons')),
+    }
+
+
+def parse_recurrence_rule(data, start_time):
+    """
+    Parse the recurrence rule of a recurring booking request.
+
+    Returns:
+    - dict: frequency, interval, until, count and exception_dates of the rule.
+
+    Raises:
+    - ValidationError: If the rule is invalid or has neither or both of until and count.
+    """
+    frequency = data.get('frequency')
+    if frequency not in (recurrence.DAILY, recurrence.WEEKLY, recurrence.MONTHLY):
+        raise ValidationError({"frequency": "Must be one of daily, weekly or monthly."})
+    try:
+        interval = int(data.get('interval') or 1)
+    except (TypeError, ValueError):
+        raise ValidationError({"interval": "A valid integer is required."})
+    if interval < 1:
+        raise ValidationError({"interval": "Ensure this value is greater than or equal to 1."})
+    if interval > recurrence.MAX_INTERVAL:
+        raise ValidationError({"interval": f"Ensure this value is less than or equal to {recurrence.MAX_INTERVAL}."})
+
+    until, count = data.get('until'), data.get('count')
+    if bool(until) == (count not in (None, '')):
+        raise ValidationError({"non_field_errors": "Exactly one of until and count is required."})
+    if until:
+        until = parse_booking_datetime(until, 'until')
+        if until < start_time:
+            raise ValidationError({"until": "until must not be before start_time."})
+    else:
+        try:
+            count = int(count)
+        except (TypeError, ValueError):
+            raise ValidationError({"count": "A valid integer is required."})
+        if count < 1:
+            raise ValidationError({"count": "Ensure this value is greater than or equal to 1."})
 
+    exception_dates = data.get('exception_dates') or []
+    if not isinstance(exception_dates, list):
+        raise ValidationError({"exception_dates": "Expected a list of occurrence start times."})
+    return {
+        "frequency": frequency,
+        "interval": interval,
+        "until": until or None,
+        "count": count if not until else None,
+        "exception_dates": [parse_booking_datetime(value, 'exception_dates') for value in exception_dates],
+    }
 
 
+MY_BOOKINGS_SCOPES = ('all', 'upcoming', 'past')
 
 
-def send_cancellation_email(room_name, start_time, end_time, booked_by_email):
-    subject = 'Meeting Room Booking Cancellation'
-    formatted_start_time = start_time.strftime("%d-%B-%Y %I:%M %p")
-    formatted_end_time = end_time.strftime("%I:%M %p")
-    message = f'Your booking for meeting room {room_name} from {formatted_start_time} to {formatted_end_time} has been canceled.'
-    from_email = settings.DEFAULT_FROM_EMAIL
-    to_email = booked_by_email
+def filter_my_bookings(bookings, params):
+    """
+    Apply the scope, start_date and end_date query parameters of the my-bookings endpoints.
+
+    Returns:
+    - tuple: (filtered bookings, whether they are walked from the latest to the earliest).
+
+    Raises:
+    - ValidationError: If the scope or a date is invalid.
+    """
+    scope = params.get('scope', 'all')
+    if scope not in MY_BOOKINGS_SCOPES:
+        raise ValidationError({"scope": f"Must be one of {', '.join(MY_BOOKINGS_SCOPES)}."})
+
+    now = timezone.now()
+    if scope == 'upcoming':
+        bookings = bookings.filter(start_time__gte=now)
+    elif scope == 'past':
+        bookings = bookings.filter(start_time__lt=now)
+    if params.get('start_date'):
+        bookings = bookings.filter(start_time__gte=parse_booking_datetime(params['start_date'], 'start_date'))
+    if params.get('end_date'):
+        bookings = bookings.filter(start_time__lt=parse_booking_datetime(params['end_date'], 'end_date'))
+    return bookings, scope == 'past'
+
+
+def my_bookings_include_archive(params):
+    """
+    Tells whether the archived bookings may match the scope and start_date query parameters.
+
+    Only bookings that have ended are archived, so requests for upcoming
+    bookings (or starting from a future date) never read the archive.
+    """
+    if params.get('scope') == 'upcoming':
+        return False
+    if params.get('start_date'):
+        return parse_booking_datetime(params['start_date'], 'start_date') < timezone.now()
+    return True
+
+
+def parse_room_ids(value):
+    """
+    Parse a comma separated list of meeting room IDs.
+
+    Returns:
+    - set: The IDs, or None when no value is given.
+
+    Raises:
+    - ValidationError: If an ID is not an integer.
+    """
+    if not value:
+        return None
+    try:
+        return {int(room_id) for room_id in value.split(',')}
+    except ValueError:
+        raise ValidationError({"rooms": "Expected comma separated meeting room IDs."})
+
+
+def parse_optional_int(value, field_name, minimum=None):
+    """
+    Parse an optional integer query parameter, None when no value is given.
+
+    Raises:
+    - ValidationError: If the value is not an integer or is below minimum.
+    """
+    if value in (None, ''):
+        return None
+    try:
+        parsed = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({field_name: "A valid integer is required."})
+    if minimum is not None and parsed < minimum:
+        raise ValidationError({field_name: f"Ensure this value is greater than or equal to {minimum}."})
+    return parsed
+
+
+def parse_room_search(params):
+    """
+    Parse the filters of a meeting room search.
+
+    Returns:
+    - dict: Keyword arguments of apps.booking.search.search_rooms, without limit.
+
+    Raises:
+    - ValidationError: If a filter is invalid.
+    """
+    filters = {
+        'min_capacity': parse_optional_int(params.get('min_capacity'), 'min_capacity', minimum=1) or 1,
+        'max_capacity': parse_optional_int(params.get('max_capacity'), 'max_capacity', minimum=1),
+        'building': params.get('building') or None,
+        'equipment': [code.strip() for code in params.get('equipment', '').split(',') if code.strip()],
+    }
+    if filters['max_capacity'] is not None and filters['max_capacity'] < filters['min_capacity']:
+        raise ValidationError({"max_capacity": "max_capacity must not be below min_capacity."})
+    if params.get('floor'):
+        try:
+            filters['floors'] = [int(floor) for floor in params['floor'].split(',')]
+        except ValueError:
+            raise ValidationError({"floor": "Expected comma separated floor numbers."})
+    if 'start_time' in params or 'end_time' in params:
+        filters['start_time'], filters['end_time'] = parse_booking_window(params)
+    return filters
+
+
+def parse_event_id(value, field_name):
+    """
+    Parse the ID of the last event a client received, None when no value is given.
+
+    Raises:
+    - ValidationError: If the value is not a non negative integer.
+    """
+    if value in (None, ''):
+        return None
     try:
-        send_mail(subject, message, from_email, [to_email])
-    except Exception as e:
-        print(f"Error sending cancellation email: {e}")
\ No newline at end of file
+        event_id = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({field_name: "A valid integer is required."})
+    if event_id < 0:
+        raise ValidationError({field_name: "Ensure this value is greater than or equal to 0."})
+    return event_id
+
+
+def parse_page_size(value, default, maximum):
+    """
+    Parse a page_size query parameter, clamped to [1, maximum].
+    """
+    try:
+        page_size = int(value if value is not None else default)
+    except (TypeError, ValueError):
+        raise ValidationError({"page_size": "A valid integer is required."})
+    return max(1, min(page_size, maximum))
+
+
+def is_meeting_room_available(booking, start_time, end_time):
+    """
+    Checks if the meeting room is available for the current booking.
+
+    Returns:
+        bool: True if the meeting room is available, False otherwise.
+    """
+    return not booking.booking_histories.filter(
+        start_time__lt=end_time,
+        end_time__gt=start_time
+    ).exists()
@@ -1,7 +1,11 @@
+import math
+
+from django.conf import settings
 from django.contrib.auth import authenticate, login
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from apps.core.ratelimit import login_rate_limits
 from apps.core.utils import is_valid_email
 from rest_framework_simplejwt.tokens import RefreshToken
 
@@ -9,6 +13,13 @@ from rest_framework_simplejwt.tokens import RefreshToken
 class UserLoginView(APIView):
     """
     API View for user login with email and password, returning a JWT token on success.
+
+    With MEMBER_STATELESS_LOGIN on, no session is created (and last_login is
+    not updated): the API only authenticates with the returned JWT.
+
+    Attempts are rate limited per client IP and per email (LOGIN_RATE_LIMIT)
+    before the password is hashed, so bursts of guesses are rejected cheaply
+    with 429 Too Many Requests.
     """
     def post(self, request, *args, **kwargs):
         email = request.data.get('email')
@@ -18,10 +29,22 @@ class UserLoginView(APIView):
         if not is_valid_email(email):
             return Response({"error": "Invalid email!"}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Rate limit before authenticate(), which spends most of the request hashing the password
+        keys = {'IP': request.META.get('REMOTE_ADDR', ''), 'EMAIL': email.lower()}
+        for scope, bucket in login_rate_limits():
+            allowed, retry_after = bucket.consume(keys[scope])
+            if not allowed:
+                return Response(
+                    {"error": "Too many login attempts, please try again later."},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={'Retry-After': str(math.ceil(retry_after))},
+                )
+
         user = authenticate(request, email=email, password=password)
 
         if user is not None:
-            login(request, user)
+            if not getattr(settings, 'MEMBER_STATELESS_LOGIN', False):
+                login(request, user)
 
             # Generate JWT token
             refresh = RefreshToken.for_user(user)
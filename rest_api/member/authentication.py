@@ -0,0 +1,51 @@
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from apps.member.auth_cache import aget_user_state, build_user, get_user_state
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication building the user from a short lived cache of its
+    authorisation state (MEMBER_AUTH_CACHE_TIMEOUT) instead of loading it
+    from the database on every request.
+
+    The cached state is dropped whenever the user is saved or deleted.
+    """
+
+    def get_user(self, validated_token):
+        # Revocation checks need the password hash, which is never cached
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        return self.user_from_state(get_user_state(self.get_user_id(validated_token)))
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+    def user_from_state(self, state):
+        if state is None:
+            raise AuthenticationFailed("User not found", code='user_not_found')
+        if not state['is_active']:
+            raise AuthenticationFailed("User is inactive", code='user_inactive')
+        return build_user(state)
+
+
+class AsyncCachedJWTAuthentication(CachedJWTAuthentication):
+    """
+    CachedJWTAuthentication for the async views, reading the user state with the async cache and ORM.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return self.user_from_state(await aget_user_state(self.get_user_id(validated_token)))